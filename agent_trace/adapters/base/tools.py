@@ -4,12 +4,19 @@ from abc import ABC, abstractmethod
 from functools import wraps
 from typing import Any, Callable, Dict, Optional
 from agent_trace.logging.logger import file_logger
+from agent_trace.adapters import patches
+from agent_trace.core import metrics
+from agent_trace.core.overhead import capture
+from agent_trace.core.replay import get_active_replay, replay_result
 from agent_trace.core.trace import log_tool_step, update_tool_step
 
 logger = file_logger("BASE_TOOLS_ADAPTER")
 
 class ToolTrace(ABC):
     """Abstract base class for tracing tool execution."""
+
+    # Whether recorded outputs can stand in for real calls under replay
+    replayable = True
     
     @abstractmethod
     def get_tool_name(self, tool) -> str:
@@ -31,61 +38,96 @@ class ToolTrace(ABC):
         """Set the new execution method on the tool."""
         pass
 
+    def capture_inputs(self, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Inputs recorded for a call: positional arguments as ``arg_N``, plus keywords."""
+        return {
+            **{f"arg_{i}": arg for i, arg in enumerate(args)},
+            **kwargs
+        }
+
+    def capture_output(self, result: Any) -> Any:
+        """Output recorded for a call."""
+        return result
+
     def create_traced_execute(self, tool, original_execute: Callable) -> Callable:
         """Create a traced version of the execute method."""
         tool_name = self.get_tool_name(tool)
 
         @wraps(original_execute)
         def traced_execute(*args, **kwargs):
-            trace_id = str(uuid.uuid4())
-            started_at = datetime.datetime.now().isoformat()
-            
-            logger.debug(f"[agent-trace] TOOL_START: {tool_name} | trace_id={trace_id} | started_at={started_at}")
-
-            # Create the step at the beginning
-            step = log_tool_step(
-                tool_name=tool_name,
-                inputs={
-                    **{f"arg_{i}": arg for i, arg in enumerate(args)},
-                    **kwargs
-                },
-                output=None,  # Will be updated after execution
-                duration_ms=0  # Will be updated after execution
-            )
+            if not patches.patches_enabled():
+                return original_execute(*args, **kwargs)
+            with capture():
+                trace_id = str(uuid.uuid4())
+                started_at = datetime.datetime.now().isoformat()
+                
+                logger.debug(f"[agent-trace] TOOL_START: {tool_name} | trace_id={trace_id} | started_at={started_at}")
+
+                inputs = self.capture_inputs(args, kwargs)
+                # Create the step at the beginning
+                step = log_tool_step(
+                    tool_name=tool_name,
+                    inputs=inputs,
+                    output=None,  # Will be updated after execution
+                    duration_ms=0  # Will be updated after execution
+                )
+
+            session = get_active_replay() if self.replayable else None
+            recorded = session.lookup(tool_name, inputs) if session else None
+            if recorded is not None:
+                # Answer from the replayed trace instead of running the tool
+                metrics.observe("tool", tool_name, 0.0, recorded.error is not None)
+                if step:
+                    update_tool_step(step=step, output=recorded.output, error=recorded.error)
+                    step.metadata["replay"] = {
+                        "trace_id": str(session.trace.trace_id),
+                        "recorded_duration_ms": recorded.duration_ms,
+                    }
+                logger.debug(f"[agent-trace] TOOL_REPLAYED: {tool_name} | trace_id={trace_id}")
+                return replay_result(recorded)
 
             try:
                 start_time = datetime.datetime.now()
                 result = original_execute(*args, **kwargs)
                 duration_ms = (datetime.datetime.now() - start_time).total_seconds() * 1000
 
-                # Update the step with the result and duration
-                if step:  # step might be None if no active trace
-                    update_tool_step(
-                        step=step,
-                        output=result,
-                        duration_ms=duration_ms
-                    )
+                with capture():
+                    metrics.observe("tool", tool_name, duration_ms)
+                    # Update the step with the result and duration
+                    if step:  # step might be None if no active trace
+                        update_tool_step(
+                            step=step,
+                            output=self.capture_output(result),
+                            duration_ms=duration_ms
+                        )
 
-                logger.debug(f"[agent-trace] TOOL_END: {tool_name} | result='{str(result)[:100]}...' | trace_id={trace_id}")
+                    logger.debug(f"[agent-trace] TOOL_END: {tool_name} | result='{str(result)[:100]}...' | trace_id={trace_id}")
                 return result
             except Exception as e:
-                # Update the step with the error and duration
-                if step:  # step might be None if no active trace
-                    update_tool_step(
-                        step=step,
-                        error=str(e),
-                        duration_ms=(datetime.datetime.now() - start_time).total_seconds() * 1000
-                    )
-                logger.error(f"[agent-trace] TOOL_ERROR: {tool_name} | error={str(e)} | trace_id={trace_id}")
+                with capture():
+                    duration_ms = (datetime.datetime.now() - start_time).total_seconds() * 1000
+                    metrics.observe("tool", tool_name, duration_ms, error=True)
+                    # Update the step with the error and duration
+                    if step:  # step might be None if no active trace
+                        update_tool_step(
+                            step=step,
+                            error=str(e),
+                            duration_ms=duration_ms
+                        )
+                    logger.error(f"[agent-trace] TOOL_ERROR: {tool_name} | error={str(e)} | trace_id={trace_id}")
                 raise
 
+        setattr(traced_execute, patches.PATCHED_ATTR, f"tool:{tool_name}")
         return traced_execute
 
     def trace(self, tool: Any) -> Any:
         """
         Trace a single tool's execution.
-        Returns the tool with its execution method traced.
+        Returns the tool with its execution method traced; a tool that
+        already is is returned as is.
         """
         original_execute = self.get_original_execute_method(tool)
+        if patches.is_patched(original_execute):
+            return tool
         traced_execute = self.create_traced_execute(tool, original_execute)
         return self.set_execute_method(tool, traced_execute)
\ No newline at end of file
@@ -3,6 +3,7 @@ import contextlib
 
 from crewai import Crew
 from functools import wraps
+from agent_trace.adapters.patches import patch_attribute
 from agent_trace.logging.logger import console_logger, file_logger
 logger = file_logger("CREW_CAPTURE")
 # console_logger = console_logger("CREW_CAPTURE_OUT")
@@ -15,16 +16,16 @@ def get_stdout_for_crew(crew_id):
 
 
 def patch_crewai_capture():
-    original_kickoff = Crew.kickoff
-
-    @wraps(original_kickoff)
-    def wrapped_kickoff(self, *args, **kwargs):
-        crew_id = getattr(self, "id", "default")
-        logger.info(f"Wrapping kickoff for crew {crew_id}")
-        with io.StringIO() as buf, contextlib.redirect_stdout(buf):
-            result = original_kickoff(self, *args, **kwargs)
-            _stdout_buffer[crew_id] = buf.getvalue()
-            return result
-
-    Crew.kickoff = wrapped_kickoff
-    logger.info("Crew.kickoff has been patched to capture stdout")
\ No newline at end of file
+    def make_wrapper(original_kickoff):
+        @wraps(original_kickoff)
+        def wrapped_kickoff(self, *args, **kwargs):
+            crew_id = getattr(self, "id", "default")
+            logger.info(f"Wrapping kickoff for crew {crew_id}")
+            with io.StringIO() as buf, contextlib.redirect_stdout(buf):
+                result = original_kickoff(self, *args, **kwargs)
+                _stdout_buffer[crew_id] = buf.getvalue()
+                return result
+        return wrapped_kickoff
+
+    if patch_attribute(Crew, "kickoff", make_wrapper):
+        logger.info("Crew.kickoff has been patched to capture stdout")
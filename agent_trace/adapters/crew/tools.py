@@ -1,6 +1,8 @@
+from functools import wraps
 from crewai import Agent
 from agent_trace.logging.logger import file_logger
 from agent_trace.adapters.base.tools import ToolTrace
+from agent_trace.adapters.patches import patch_attribute
 
 logger = file_logger("CREW_TOOLS_ADAPTER")
 
@@ -36,19 +38,21 @@ class CrewToolTrace(ToolTrace):
 def patch_crewai_tools():
     """Patch CrewAI Agent so all tools get traced automatically."""
     logger.info("Patching CrewAI tools")
-    original_init = Agent.__init__
     tool_tracer = CrewToolTrace()
 
-    def wrapped_init(self, *args, tools=None, **kwargs):
-        if tools:
-            traced_tools = []
-            for tool in tools:
-                logger.debug(f"Processing tool: {tool}")
-                traced_tool = tool_tracer.trace(tool)
-                traced_tools.append(traced_tool)
-            tools = traced_tools
-            logger.debug(f"Final traced tools: {tools}")
-        original_init(self, *args, tools=tools, **kwargs)
-
-    Agent.__init__ = wrapped_init
-    logger.info("Successfully patched CrewAI Agent initialization")
\ No newline at end of file
+    def make_wrapper(original_init):
+        @wraps(original_init)
+        def wrapped_init(self, *args, tools=None, **kwargs):
+            if tools:
+                traced_tools = []
+                for tool in tools:
+                    logger.debug(f"Processing tool: {tool}")
+                    traced_tool = tool_tracer.trace(tool)
+                    traced_tools.append(traced_tool)
+                tools = traced_tools
+                logger.debug(f"Final traced tools: {tools}")
+            original_init(self, *args, tools=tools, **kwargs)
+        return wrapped_init
+
+    if patch_attribute(Agent, "__init__", make_wrapper):
+        logger.info("Successfully patched CrewAI Agent initialization")
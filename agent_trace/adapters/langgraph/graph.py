@@ -0,0 +1,311 @@
+"""One adapter for LangGraph: traced nodes and a run per graph invocation.
+
+``patch_langgraph()`` wraps every node added to a ``StateGraph`` (sync or
+async, in any ``add_node`` call form) in an agent step that records the
+graph state as deltas (see ``state``), and wraps ``Pregel.stream`` and
+``astream``, which ``invoke`` and ``ainvoke`` go through, so each graph
+invocation opens a run unless one is already active. The run is only current
+while the graph runs, not while the caller holds a suspended stream, so
+concurrent invocations (``asyncio.gather`` of ``ainvoke`` calls) record
+separate runs. When an invocation ends, the time spent in each superstep is
+added to the run's metadata.
+"""
+import datetime
+import inspect
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+from agent_trace.adapters import patches
+from agent_trace.adapters.langgraph import state as graph_state
+from agent_trace.core import metrics
+from agent_trace.core.config import CAPTURE_FULL, get_config
+from agent_trace.core.schema import AgentStep, Trace
+from agent_trace.core.trace import (
+    RunState, active_run, current_trace, log_agent_step, resume_run, start_run, update_agent_step,
+)
+from agent_trace.logging.logger import file_logger
+
+logger = file_logger("LANGGRAPH_ADAPTER")
+
+# Trace metadata key of the per-invocation superstep timings
+GRAPHS_KEY = "langgraph"
+# Step metadata keys of a node's superstep and checkpoint namespace
+SUPERSTEP_KEY = "superstep"
+NAMESPACE_KEY = "namespace"
+DEFAULT_RUN_NAME = "LangGraph"
+# End of a stream, see _patch_stream
+_DONE = object()
+
+
+def _task_metadata(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """LangGraph's metadata of the task running a node (superstep, namespace...)."""
+    config = kwargs.get("config")
+    if config is None:
+        try:
+            from langgraph.config import get_config
+            config = get_config()
+        except (ImportError, RuntimeError):
+            return {}
+    return (config or {}).get("metadata") or {}
+
+
+def _namespace(checkpoint_ns: str) -> str:
+    """The graph a task runs in: its checkpoint namespace minus the task itself."""
+    return checkpoint_ns.rpartition("|")[0]
+
+
+class _NodeCall:
+    """Bookkeeping of one node call shared by the sync and async wrappers."""
+    __slots__ = ("name", "step", "inputs", "start", "full")
+
+    def __init__(self, name: str, args: tuple, kwargs: Dict[str, Any]):
+        self.name = name
+        self.start = datetime.datetime.now()
+        self.step = log_agent_step(agent_name=name, started_at=self.start.isoformat())
+        self.inputs = None
+        self.full = False
+        if self.step is not None:
+            task = _task_metadata(kwargs)
+            if "langgraph_step" in task:
+                self.step.metadata[SUPERSTEP_KEY] = task["langgraph_step"]
+                self.step.metadata[NAMESPACE_KEY] = _namespace(task.get("langgraph_checkpoint_ns", ""))
+            # The state is recorded as a delta, not in full, and only when
+            # payloads are captured at all
+            self.full = get_config().decide("agent", name).capture == CAPTURE_FULL
+            if self.full and args:
+                self.inputs = graph_state.input_delta(args[0])
+
+    def finish(self, result: Any = None, error: Optional[BaseException] = None) -> None:
+        duration_ms = (datetime.datetime.now() - self.start).total_seconds() * 1000
+        metrics.observe("agent", self.name, duration_ms, error=error is not None)
+        if self.step is None:
+            return
+        outputs = graph_state.output_delta(result) if self.full and error is None and result else None
+        update_agent_step(
+            step=self.step,
+            result=str(error) if error is not None else outputs,
+            duration_ms=duration_ms,
+        )
+        self.step.metadata[graph_state.STATE_KEY] = graph_state.state_metadata(self.inputs, outputs)
+        if self.inputs and self.inputs["changed"]:
+            self.step.metadata["inputs"] = self.inputs["changed"]
+
+
+def wrap_node(name: str, func: Callable) -> Callable:
+    """Trace calls to a node function, keeping it async if it was.
+
+    ``functools.wraps`` keeps the signature and annotations LangGraph
+    inspects to infer the node's input schema and which of ``config``,
+    ``writer``, ``store``... to pass it.
+    """
+    if patches.is_patched(func):
+        return func
+
+    if inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, "__call__", None)):
+        @wraps(func)
+        async def traced_node(*args, **kwargs):
+            if not patches.patches_enabled():
+                return await func(*args, **kwargs)
+            call = _NodeCall(name, args, kwargs)
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                call.finish(error=e)
+                logger.error(f"[agent-trace] NODE_ERROR: {name} | error={e}")
+                raise
+            call.finish(result)
+            return result
+    else:
+        @wraps(func)
+        def traced_node(*args, **kwargs):
+            if not patches.patches_enabled():
+                return func(*args, **kwargs)
+            call = _NodeCall(name, args, kwargs)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                call.finish(error=e)
+                logger.error(f"[agent-trace] NODE_ERROR: {name} | error={e}")
+                raise
+            call.finish(result)
+            return result
+
+    setattr(traced_node, patches.PATCHED_ATTR, f"node:{name}")
+    return traced_node
+
+
+def node_name(action: Any) -> str:
+    """The name LangGraph gives a node added without one."""
+    return getattr(action, "name", None) or getattr(action, "__name__", action.__class__.__name__)
+
+
+def is_traceable_node(action: Any) -> bool:
+    """Plain callables are wrapped; runnables and compiled subgraphs (which
+    have ``invoke``) are left alone, subgraphs open their own invocation."""
+    return callable(action) and not hasattr(action, "invoke")
+
+
+def superstep_timings(steps: List[Any], started_at: datetime.datetime, ended_at: datetime.datetime) -> Dict[str, Any]:
+    """Where one graph invocation's time went, superstep by superstep.
+
+    Only nodes of the outermost graph among ``steps`` count; subgraph nodes
+    are part of their parent node's time. ``between_ms`` is the time spent
+    outside any superstep: checkpointing, scheduling and the caller
+    consuming a stream.
+    """
+    nodes = [
+        step for step in steps
+        if isinstance(step, AgentStep) and SUPERSTEP_KEY in step.metadata and step.duration_ms is not None
+    ]
+    duration_ms = (ended_at - started_at).total_seconds() * 1000
+    if not nodes:
+        return {"duration_ms": round(duration_ms, 3), "supersteps": [], "between_ms": round(duration_ms, 3)}
+    root = min((step.metadata.get(NAMESPACE_KEY, "") for step in nodes), key=lambda ns: ns.count("|"))
+    groups = defaultdict(list)
+    for step in nodes:
+        if step.metadata.get(NAMESPACE_KEY, "") == root:
+            groups[step.metadata[SUPERSTEP_KEY]].append(step)
+
+    supersteps = []
+    for number, members in sorted(groups.items()):
+        first = min(step.started_at for step in members)
+        last = max(step.started_at + datetime.timedelta(milliseconds=step.duration_ms) for step in members)
+        slowest = max(members, key=lambda step: step.duration_ms)
+        supersteps.append({
+            "step": number,
+            "offset_ms": round((first - started_at).total_seconds() * 1000, 3),
+            "duration_ms": round((last - first).total_seconds() * 1000, 3),
+            "nodes": [step.agent_name for step in members],
+            "node_ms": round(sum(step.duration_ms for step in members), 3),
+            "slowest": slowest.agent_name,
+        })
+    inside_ms = sum(s["duration_ms"] for s in supersteps)
+    return {
+        "duration_ms": round(duration_ms, 3),
+        "supersteps": supersteps,
+        "between_ms": round(max(duration_ms - inside_ms, 0.0), 3),
+    }
+
+
+class _Invocation:
+    """Opens a run for a graph invocation unless one is active, and records
+    its superstep timings when it ends.
+
+    Between ``__enter__`` and ``__exit__`` the caller's run stays current;
+    the graph's own code runs inside ``resume()``.
+    """
+
+    def __init__(self, graph: Any):
+        self.name = getattr(graph, "name", None) or DEFAULT_RUN_NAME
+        self.run = None
+        self.trace: Optional[Trace] = None
+        self.state: Optional[RunState] = None
+        self.tracker = graph_state.StateTracker()
+        self.first_step = 0
+        self.started_at: Optional[datetime.datetime] = None
+
+    def __enter__(self):
+        # Open the run, then put the caller's back
+        with resume_run(active_run()):
+            self.trace = current_trace()
+            if self.trace is None:
+                self.run = start_run(self.name, metadata={"framework": "langgraph"})
+                self.trace = self.run.__enter__()
+            self.state = active_run()
+        self.first_step = len(self.trace.steps)
+        self.started_at = datetime.datetime.now()
+        return self
+
+    @contextmanager
+    def resume(self):
+        """Make this invocation's run and state tracker current for a block."""
+        with resume_run(self.state), graph_state.tracking(self.tracker):
+            yield
+
+    def __exit__(self, *exc_info):
+        timings = superstep_timings(self.trace.steps[self.first_step:], self.started_at, datetime.datetime.now())
+        self.trace.metadata.setdefault(GRAPHS_KEY, []).append({"graph": self.name, **timings})
+        if self.run is not None:
+            # start_run restores the caller's run when it exits
+            with resume_run(self.state):
+                return self.run.__exit__(*exc_info)
+        return False
+
+
+def _patch_add_node(state_graph: type) -> bool:
+    def make_wrapper(original_add_node):
+        @wraps(original_add_node)
+        def wrapped_add_node(self, node, action=None, **kwargs):
+            name, target = node, action
+            if action is None and not isinstance(node, str):
+                # add_node(func): LangGraph names the node after the function
+                name, target = node_name(node), node
+            if not is_traceable_node(target):
+                logger.debug(f"Not wrapping LangGraph node {name}: {type(target).__name__}")
+                return original_add_node(self, node, action, **kwargs)
+            logger.debug(f"Wrapping LangGraph node: {name}")
+            return original_add_node(self, name, wrap_node(name, target), **kwargs)
+        return wrapped_add_node
+
+    return patches.patch_attribute(state_graph, "add_node", make_wrapper)
+
+
+def _patch_stream(pregel: type) -> bool:
+    def make_stream(original_stream):
+        @wraps(original_stream)
+        def traced_stream(self, *args, **kwargs):
+            with _Invocation(self) as invocation:
+                with invocation.resume():
+                    chunks = original_stream(self, *args, **kwargs)
+                try:
+                    while True:
+                        with invocation.resume():
+                            chunk = next(chunks, _DONE)
+                        if chunk is _DONE:
+                            return
+                        yield chunk
+                finally:
+                    with invocation.resume():
+                        chunks.close()
+        return traced_stream
+
+    def make_astream(original_astream):
+        @wraps(original_astream)
+        async def traced_astream(self, *args, **kwargs):
+            with _Invocation(self) as invocation:
+                with invocation.resume():
+                    chunks = original_astream(self, *args, **kwargs)
+                try:
+                    while True:
+                        with invocation.resume():
+                            # Tasks the graph creates copy the context here
+                            try:
+                                chunk = await chunks.__anext__()
+                            except StopAsyncIteration:
+                                return
+                        yield chunk
+                finally:
+                    with invocation.resume():
+                        await chunks.aclose()
+        return traced_astream
+
+    patched = patches.patch_attribute(pregel, "stream", make_stream)
+    return patches.patch_attribute(pregel, "astream", make_astream) or patched
+
+
+def patch_langgraph() -> None:
+    """Trace LangGraph nodes and open a run per graph invocation.
+
+    Safe to call more than once; undo with ``patches.unpatch("langgraph")``.
+    """
+    try:
+        from langgraph.graph import StateGraph
+        from langgraph.pregel import Pregel
+    except ImportError:
+        logger.error("LangGraph not installed. Please install langgraph to use this patch.")
+        return
+
+    if _patch_add_node(StateGraph) | _patch_stream(Pregel):
+        logger.info("LangGraph StateGraph.add_node and Pregel.stream/astream have been patched for tracing.")
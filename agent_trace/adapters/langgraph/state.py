@@ -0,0 +1,182 @@
+"""Record LangGraph state as deltas instead of full copies.
+
+Every node receives the whole graph state, so capturing it per node
+serializes a growing state over and over. Instead each top-level key is
+fingerprinted (serialized size and a short hash) and only keys that changed
+since the last state seen in the same graph invocation (or, for nodes called
+outside one, the same run) are kept, as a size and a bounded preview. This
+module doesn't import langgraph.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Tuple
+
+from agent_trace.core.serialize import dumps
+from agent_trace.core.trace import current_trace
+
+# Characters of each changed value's JSON kept in the trace
+PREVIEW_CHARS = 200
+# Runs whose last state is remembered at once
+MAX_TRACKED_RUNS = 64
+# Metadata key of the state size and changed keys on node steps
+STATE_KEY = "state"
+
+Fingerprint = Tuple[int, bytes]  # (serialized size, digest)
+
+
+def _encode(value: Any) -> Tuple[bytes, Fingerprint]:
+    data = dumps(value)
+    return data, (len(data), hashlib.blake2b(data, digest_size=8).digest())
+
+
+def _entry(data: bytes, limit: int = PREVIEW_CHARS) -> Dict[str, Any]:
+    """Size and bounded preview of one serialized value."""
+    # A character is at most four bytes of UTF-8
+    text = data[:limit * 4].decode("utf-8", errors="ignore")
+    truncated = len(text) > limit or len(data) > limit * 4
+    preview = text[:limit] + "…" if truncated else text
+    return {"bytes": len(data), "preview": preview}
+
+
+class StateTracker:
+    """Fingerprints of the last graph state seen in one run.
+
+    Stacked wrappers (the node and tool patches) see the same state and
+    update objects for one call; the last delta of each is memoized by
+    identity so the state is only serialized once per node.
+    """
+
+    def __init__(self, preview_chars: int = PREVIEW_CHARS):
+        self.preview_chars = preview_chars
+        self.fingerprints: Dict[str, Fingerprint] = {}
+        self._lock = threading.Lock()
+        self._last_input: Tuple[Any, Optional[Dict]] = (None, None)
+        self._last_output: Tuple[Any, Optional[Dict]] = (None, None)
+
+    def input_delta(self, state: Mapping) -> Dict[str, Any]:
+        """Keys of ``state`` changed or removed since the last state seen,
+        plus the size of the whole state."""
+        with self._lock:
+            seen, delta = self._last_input
+            if seen is state:
+                return delta
+            fingerprints = {}
+            changed = {}
+            for key, value in state.items():
+                data, fingerprint = _encode(value)
+                fingerprints[str(key)] = fingerprint
+                if self.fingerprints.get(str(key)) != fingerprint:
+                    changed[str(key)] = _entry(data, self.preview_chars)
+            removed = [key for key in self.fingerprints if key not in fingerprints]
+            self.fingerprints = fingerprints
+            delta = {
+                "changed": changed,
+                "removed": removed,
+                "state_bytes": sum(size for size, _ in fingerprints.values()),
+                "state_keys": len(fingerprints),
+            }
+            self._last_input = (state, delta)
+            return delta
+
+    def output_delta(self, update: Any) -> Dict[str, Any]:
+        """Keys of a node's return value that differ from the current state.
+
+        Anything but a mapping (a ``Command``, a list of sends...) is kept
+        whole as a single bounded entry.
+        """
+        with self._lock:
+            seen, delta = self._last_output
+            if seen is update:
+                return delta
+            if isinstance(update, Mapping):
+                changed = {}
+                update_bytes = 0
+                for key, value in update.items():
+                    data, fingerprint = _encode(value)
+                    update_bytes += len(data)
+                    if self.fingerprints.get(str(key)) != fingerprint:
+                        changed[str(key)] = _entry(data, self.preview_chars)
+                delta = {"changed": changed, "update_bytes": update_bytes}
+            else:
+                data, _ = _encode(update)
+                delta = {"value": _entry(data, self.preview_chars), "update_bytes": len(data)}
+            self._last_output = (update, delta)
+            return delta
+
+
+_trackers: "OrderedDict[str, StateTracker]" = OrderedDict()
+_trackers_lock = threading.Lock()
+# Tracker of the graph invocation running in this context, see ``tracking``
+_invocation_tracker: ContextVar[Optional[StateTracker]] = ContextVar(
+    "agent_trace_state_tracker", default=None
+)
+
+
+@contextmanager
+def tracking(tracker: StateTracker):
+    """Compare states against ``tracker`` in the block: graph invocations
+    each get their own, so concurrent ones in a run don't see each other's."""
+    token = _invocation_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _invocation_tracker.reset(token)
+
+
+def get_tracker() -> Optional[StateTracker]:
+    """Tracker of the graph invocation or else the run being recorded, or
+    ``None`` outside a run."""
+    trace = current_trace()
+    if trace is None:
+        return None
+    tracker = _invocation_tracker.get()
+    if tracker is not None:
+        return tracker
+    key = str(trace.trace_id)
+    with _trackers_lock:
+        tracker = _trackers.get(key)
+        if tracker is None:
+            tracker = _trackers[key] = StateTracker()
+            while len(_trackers) > MAX_TRACKED_RUNS:
+                _trackers.popitem(last=False)
+        else:
+            _trackers.move_to_end(key)
+        return tracker
+
+
+def input_delta(state: Any) -> Optional[Dict[str, Any]]:
+    """Delta of a node's input state in the current run, or ``None`` when
+    nothing is being recorded or the state isn't a mapping."""
+    if not isinstance(state, Mapping):
+        return None
+    tracker = get_tracker()
+    return tracker.input_delta(state) if tracker else None
+
+
+def output_delta(update: Any) -> Optional[Dict[str, Any]]:
+    """Delta of a node's return value in the current run, or ``None`` when
+    nothing is being recorded."""
+    tracker = get_tracker()
+    return tracker.output_delta(update) if tracker else None
+
+
+def state_metadata(inputs: Optional[Dict], outputs: Optional[Dict]) -> Dict[str, Any]:
+    """Compact summary of a node's deltas for ``step.metadata[STATE_KEY]``."""
+    summary: Dict[str, Any] = {}
+    if inputs:
+        summary.update(
+            bytes=inputs["state_bytes"],
+            keys=inputs["state_keys"],
+            changed=[*inputs["changed"]],
+            removed=inputs["removed"],
+        )
+    if outputs:
+        summary.update(
+            update_bytes=outputs["update_bytes"],
+            updated=[*outputs.get("changed", ())],
+        )
+    return summary
@@ -1,16 +1,41 @@
-from langgraph.graph import StateGraph
 from agent_trace.logging.logger import file_logger
 from agent_trace.adapters.base.tools import ToolTrace
+from agent_trace.adapters.langgraph import state as graph_state
+from agent_trace.adapters.langgraph.graph import patch_langgraph
 
 logger = file_logger("LANGGRAPH_TOOLS_ADAPTER")
 
 class LangGraphToolTrace(ToolTrace):
-    """Implementation of ToolTrace for LangGraph tools."""
+    """Implementation of ToolTrace for LangGraph tools.
+
+    Nodes get the whole graph state as their first argument, so it is
+    recorded as a delta against the last state seen in the run; their
+    return value likewise. Deltas only hold previews, so recorded nodes
+    can't be replayed.
+    """
+
+    replayable = False
     
     def get_tool_name(self, tool) -> str:
         """Get the name/identifier of the LangGraph tool."""
         return getattr(tool, '__name__', tool.__class__.__name__)
 
+    def capture_inputs(self, args, kwargs):
+        """The state delta as ``state``, then any further arguments."""
+        delta = graph_state.input_delta(args[0]) if args else None
+        if delta is None:
+            return super().capture_inputs(args, kwargs)
+        return {
+            "state": delta,
+            **{f"arg_{i}": arg for i, arg in enumerate(args) if i},
+            **kwargs
+        }
+
+    def capture_output(self, result):
+        """The keys of the node's update that change the state."""
+        delta = graph_state.output_delta(result)
+        return result if delta is None else delta
+
     def is_class_based_tool(self, tool) -> bool:
         """Determine if the tool is class-based (has __call__ method) or function-based."""
         return hasattr(tool, '__call__') and not callable(tool)
@@ -32,15 +57,9 @@ class LangGraphToolTrace(ToolTrace):
             return new_method
 
 def patch_langgraph_tools():
-    """Patch LangGraph StateGraph so all tools get traced automatically."""
-    logger.info("Patching LangGraph tools")
-    original_add_node = StateGraph.add_node
-    tool_tracer = LangGraphToolTrace()
-
-    def wrapped_add_node(self, node_name, node_func):
-        logger.debug(f"Processing node: {node_name}")
-        traced_node = tool_tracer.trace(node_func)
-        return original_add_node(self, node_name, traced_node)
-
-    StateGraph.add_node = wrapped_add_node
-    logger.info("Successfully patched LangGraph StateGraph.add_node for tool tracing")
+    """Legacy function for backward compatibility, see ``patch_langgraph``.
+
+    Nodes used to be traced twice, once here as tools and once as agents;
+    the unified adapter records each node once.
+    """
+    patch_langgraph()
@@ -0,0 +1,179 @@
+"""Central registry of the methods adapters replace on framework classes.
+
+Every ``patch_*`` function goes through ``patch_attribute`` (or
+``apply``), which records the original next to its replacement. Patching
+the same target again is a no-op, ``unpatch()`` puts the originals back,
+and ``set_patches_enabled(False)`` swaps them back in while keeping the
+registrations, so disabled instrumentation costs nothing and re-enabling
+restores it. Wrappers created per object (traced nodes and tools) can't be
+swapped out and check ``patches_enabled()`` instead. The ``enabled`` flag
+of the runtime configuration (see ``core.config``) drives the same switch.
+"""
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from agent_trace.core import config
+from agent_trace.logging.logger import file_logger
+
+logger = file_logger("PATCHES")
+
+# Set on every replacement so a target patched outside the registry (or
+# by an older copy of it) is still recognized
+PATCHED_ATTR = "__agent_trace_patch__"
+
+_MISSING = object()
+
+
+def is_patched(value: Any) -> bool:
+    """Whether ``value`` is a replacement installed by agent-trace."""
+    return getattr(value, PATCHED_ATTR, None) is not None
+
+
+class Patch:
+    """One replaced target: how to install the replacement and restore the original."""
+    __slots__ = ("name", "original", "replacement", "_install", "_restore")
+
+    def __init__(self, name: str, original: Any, replacement: Any,
+                 install: Callable[[], None], restore: Callable[[], None]):
+        self.name = name
+        self.original = original
+        self.replacement = replacement
+        self._install = install
+        self._restore = restore
+
+    def install(self) -> None:
+        self._install()
+
+    def restore(self) -> None:
+        self._restore()
+
+
+class PatchRegistry:
+    """Patches by name, in the order they were applied."""
+
+    def __init__(self, enabled: bool = True):
+        self._patches: Dict[str, Patch] = {}
+        self._lock = threading.RLock()
+        self._enabled = enabled
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return [*self._patches]
+
+    def apply(self, name: str, original: Any, setter: Callable[[Any], None],
+              make_wrapper: Callable[[Any], Any], restore: Optional[Callable[[], None]] = None) -> bool:
+        """Replace ``original`` with ``make_wrapper(original)`` through ``setter``.
+
+        ``restore`` puts the original back (default: ``setter(original)``).
+        Returns ``False`` without doing anything if ``name`` is already
+        registered or ``original`` is itself a replacement.
+        """
+        with self._lock:
+            if name in self._patches or is_patched(original):
+                logger.debug(f"Already patched: {name}")
+                return False
+            replacement = make_wrapper(original)
+            setattr(replacement, PATCHED_ATTR, name)
+            patch = Patch(
+                name, original, replacement,
+                install=lambda: setter(replacement),
+                restore=restore or (lambda: setter(original)),
+            )
+            self._patches[name] = patch
+            if self._enabled:
+                patch.install()
+            logger.info(f"Patched {name}")
+            return True
+
+    def patch_attribute(self, owner: type, attribute: str, make_wrapper: Callable[[Any], Any],
+                        name: Optional[str] = None) -> bool:
+        """Replace ``owner.attribute`` with ``make_wrapper(original)``.
+
+        An attribute the class inherits is restored by deleting the override
+        rather than copying the inherited one onto the class.
+        """
+        name = name or f"{owner.__module__}.{owner.__qualname__}.{attribute}"
+        own = owner.__dict__.get(attribute, _MISSING)
+        original = getattr(owner, attribute)
+
+        def restore():
+            if own is _MISSING:
+                if attribute in owner.__dict__:
+                    delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, own)
+
+        return self.apply(name, original, lambda value: setattr(owner, attribute, value), make_wrapper, restore)
+
+    def unpatch(self, name: Optional[str] = None) -> List[str]:
+        """Restore the originals of ``name`` (a patch name or prefix, e.g.
+        ``"crewai"``), or of everything, and forget them. Returns the names
+        unpatched."""
+        with self._lock:
+            names = [
+                n for n in self._patches
+                if name is None or n == name or n.startswith(name + ".")
+            ]
+            for patch_name in reversed(names):
+                patch = self._patches.pop(patch_name)
+                if self._enabled:
+                    patch.restore()
+                logger.info(f"Unpatched {patch_name}")
+            return names
+
+    def set_enabled(self, enabled: bool) -> None:
+        """Install (``True``) or restore the originals of (``False``) every
+        registered patch, keeping them registered."""
+        with self._lock:
+            if enabled == self._enabled:
+                return
+            patches = [*self._patches.values()]
+            if enabled:
+                for patch in patches:
+                    patch.install()
+            else:
+                for patch in reversed(patches):
+                    patch.restore()
+            self._enabled = enabled
+            logger.info(f"Patches {'enabled' if enabled else 'disabled'} ({len(patches)} targets)")
+
+
+_registry = PatchRegistry(enabled=config.enabled())
+
+
+def _follow_kill_switch(previous: config.TracingConfig, current: config.TracingConfig) -> None:
+    # The runtime configuration's enable flag installs and removes patches
+    if previous.enabled != current.enabled:
+        _registry.set_enabled(current.enabled)
+
+
+config.subscribe(_follow_kill_switch)
+
+
+def get_patch_registry() -> PatchRegistry:
+    """The process-wide registry."""
+    return _registry
+
+
+def patch_attribute(owner: type, attribute: str, make_wrapper: Callable[[Any], Any],
+                    name: Optional[str] = None) -> bool:
+    """Patch ``owner.attribute`` in the process-wide registry."""
+    return _registry.patch_attribute(owner, attribute, make_wrapper, name)
+
+
+def unpatch(name: Optional[str] = None) -> List[str]:
+    """Restore patched originals (all, or those under ``name``)."""
+    return _registry.unpatch(name)
+
+
+def patches_enabled() -> bool:
+    return _registry.enabled
+
+
+def set_patches_enabled(enabled: bool) -> None:
+    """Turn all framework instrumentation on or off at runtime."""
+    _registry.set_enabled(enabled)
@@ -0,0 +1 @@
+"""Analyses over stored traces."""
\ No newline at end of file
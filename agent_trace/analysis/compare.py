@@ -0,0 +1,283 @@
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from agent_trace.core.backends.base import TraceDocument, document_started_at
+from agent_trace.core.store import iter_trace_documents
+
+DEFAULT_QUANTILES = (50, 95, 99)
+
+# Bootstrap resamples are drawn in chunks of at most this many values, so
+# large selections don't allocate an (n_boot x n) matrix in one go.
+BOOTSTRAP_CHUNK_VALUES = 4_000_000
+
+
+class Selection(BaseModel):
+    """Which traces make up one side of a comparison."""
+    name: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    tags: Dict[str, str] = Field(default_factory=dict)
+    limit: Optional[int] = None
+
+    def describe(self) -> str:
+        """Short human readable description of the selection."""
+        parts = []
+        if self.name:
+            parts.append(f"name~{self.name}")
+        if self.since:
+            parts.append(f"since {self.since.isoformat()}")
+        if self.until:
+            parts.append(f"until {self.until.isoformat()}")
+        parts.extend(f"{k}={v}" for k, v in self.tags.items())
+        return ", ".join(parts) or "all traces"
+
+
+class GroupComparison(BaseModel):
+    """Latency and error-rate comparison for one tool, agent, task or the run."""
+    kind: str
+    name: str
+    n_base: int
+    n_cand: int
+    base_ms: Dict[str, Optional[float]]
+    cand_ms: Dict[str, Optional[float]]
+    delta_pct: Dict[str, Optional[float]]
+    base_error_rate: float
+    cand_error_rate: float
+    p_value: Optional[float] = None
+    ci_pct: Optional[Tuple[float, float]] = None
+
+    @property
+    def error_rate_delta(self) -> float:
+        """Change in error rate (candidate - baseline), as a fraction."""
+        return self.cand_error_rate - self.base_error_rate
+
+
+def select_documents(selection: Selection) -> List[TraceDocument]:
+    """Load the raw trace documents matching a selection.
+
+    Tags are matched before ``limit`` applies, so the limit counts matching runs.
+    """
+    def tagged(doc: TraceDocument) -> bool:
+        metadata = doc.get("metadata", {})
+        return all(str(metadata.get(k)) == v for k, v in selection.tags.items())
+
+    return list(iter_trace_documents(
+        limit=selection.limit,
+        name_filter=selection.name,
+        since=selection.since,
+        until=selection.until,
+        where=tagged if selection.tags else None,
+    ))
+
+
+def step_key(step: dict) -> Optional[Tuple[str, str]]:
+    """(kind, name) of a raw tool, agent or task step; ``None`` for others."""
+    step_type = step.get("step_type")
+    if step_type == "tool":
+        return "tool", step.get("tool_name") or "?"
+    if step_type == "agent":
+        return "agent", step.get("agent_name") or "?"
+    if step_type == "task":
+        return "task", step.get("task_name") or "?"
+    return None
+
+
+def collect_samples(docs: Sequence[TraceDocument]) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+    """Group step durations (ms) and error flags by (kind, name).
+
+    The ``("run", "total")`` group holds end-to-end run durations, with a run
+    counted as failed if any of its tool steps failed.
+    """
+    keys: List[Tuple[str, str]] = []
+    durations: List[float] = []
+    errors: List[bool] = []
+    for doc in docs:
+        steps = doc.get("steps", [])
+        for step in steps:
+            key = step_key(step)
+            if key is None or step.get("duration_ms") is None:
+                continue
+            keys.append(key)
+            durations.append(step["duration_ms"])
+            errors.append(bool(step.get("error")))
+        if doc.get("ended_at"):
+            ended_at = doc["ended_at"]
+            if isinstance(ended_at, str):
+                ended_at = datetime.fromisoformat(ended_at)
+            keys.append(("run", "total"))
+            durations.append((ended_at - document_started_at(doc)).total_seconds() * 1000)
+            errors.append(any(s.get("error") for s in steps))
+
+    if not keys:
+        return {}
+    all_durations = np.asarray(durations, dtype=np.float64)
+    all_errors = np.asarray(errors, dtype=bool)
+    labels = np.array([f"{kind}\x00{name}" for kind, name in keys])
+    unique, codes = np.unique(labels, return_inverse=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(unique) + 1))
+    groups = {}
+    for i, label in enumerate(unique):
+        idx = order[bounds[i]:bounds[i + 1]]
+        kind, name = label.split("\x00", 1)
+        groups[(kind, name)] = (all_durations[idx], all_errors[idx])
+    return groups
+
+
+def rankdata(values: np.ndarray) -> np.ndarray:
+    """1-based ranks with ties given their average rank."""
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    ends = np.cumsum(counts)
+    return (ends - (counts - 1) / 2.0)[inverse]
+
+
+def mann_whitney_p(a: np.ndarray, b: np.ndarray) -> float:
+    """Two-sided Mann–Whitney U p-value (normal approximation, tie corrected)."""
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return 1.0
+    combined = np.concatenate([a, b])
+    ranks = rankdata(combined)
+    u1 = ranks[:n1].sum() - n1 * (n1 + 1) / 2.0
+    mu = n1 * n2 / 2.0
+    n = n1 + n2
+    _, counts = np.unique(combined, return_counts=True)
+    tie_term = float((counts ** 3 - counts).sum()) / (n * (n - 1)) if n > 1 else 0.0
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term)
+    if variance <= 0:
+        return 1.0
+    # Continuity correction towards the mean
+    z = (abs(u1 - mu) - 0.5) / math.sqrt(variance)
+    return float(min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2))))
+
+
+def bootstrap_delta_ci(
+    a: np.ndarray,
+    b: np.ndarray,
+    q: float,
+    n_boot: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = 0,
+) -> Tuple[float, float]:
+    """Bootstrap CI of the relative change (%) in the q-th percentile from a to b."""
+    rng = np.random.default_rng(seed)
+
+    def resampled_quantiles(x: np.ndarray) -> np.ndarray:
+        out = np.empty(n_boot)
+        chunk = max(1, BOOTSTRAP_CHUNK_VALUES // len(x))
+        for start in range(0, n_boot, chunk):
+            rows = min(chunk, n_boot - start)
+            idx = rng.integers(0, len(x), size=(rows, len(x)))
+            out[start:start + rows] = np.percentile(x[idx], q, axis=1)
+        return out
+
+    qa = resampled_quantiles(a)
+    qb = resampled_quantiles(b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deltas = np.where(qa > 0, (qb - qa) / qa * 100.0, 0.0)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(deltas, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def _finite(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def compare_samples(
+    kind: str,
+    name: str,
+    base: Tuple[np.ndarray, np.ndarray],
+    cand: Tuple[np.ndarray, np.ndarray],
+    quantiles: Sequence[int] = DEFAULT_QUANTILES,
+    min_samples: int = 5,
+    bootstrap: int = 0,
+    bootstrap_quantile: int = 95,
+) -> GroupComparison:
+    """Compare the durations/errors of one group between baseline and candidate."""
+    (base_d, base_e), (cand_d, cand_e) = base, cand
+    base_q = np.percentile(base_d, quantiles) if len(base_d) else np.full(len(quantiles), np.nan)
+    cand_q = np.percentile(cand_d, quantiles) if len(cand_d) else np.full(len(quantiles), np.nan)
+
+    delta = {}
+    for q, bq, cq in zip(quantiles, base_q, cand_q):
+        ok = np.isfinite(bq) and np.isfinite(cq) and bq > 0
+        delta[f"p{q}"] = float((cq - bq) / bq * 100.0) if ok else None
+
+    enough = len(base_d) >= min_samples and len(cand_d) >= min_samples
+    return GroupComparison(
+        kind=kind,
+        name=name,
+        n_base=len(base_d),
+        n_cand=len(cand_d),
+        base_ms={f"p{q}": _finite(v) for q, v in zip(quantiles, base_q)},
+        cand_ms={f"p{q}": _finite(v) for q, v in zip(quantiles, cand_q)},
+        delta_pct=delta,
+        base_error_rate=float(base_e.mean()) if len(base_e) else 0.0,
+        cand_error_rate=float(cand_e.mean()) if len(cand_e) else 0.0,
+        p_value=mann_whitney_p(base_d, cand_d) if enough else None,
+        ci_pct=(
+            bootstrap_delta_ci(base_d, cand_d, bootstrap_quantile, n_boot=bootstrap)
+            if enough and bootstrap else None
+        ),
+    )
+
+
+def compare_selections(
+    base: Selection,
+    cand: Selection,
+    quantiles: Sequence[int] = DEFAULT_QUANTILES,
+    min_samples: int = 5,
+    bootstrap: int = 0,
+    bootstrap_quantile: int = 95,
+) -> List[GroupComparison]:
+    """Compare per-tool/agent/task and end-to-end latency of two trace selections."""
+    base_groups = collect_samples(select_documents(base))
+    cand_groups = collect_samples(select_documents(cand))
+    empty = (np.empty(0), np.empty(0, dtype=bool))
+    results = [
+        compare_samples(
+            kind, name,
+            base_groups.get((kind, name), empty),
+            cand_groups.get((kind, name), empty),
+            quantiles=quantiles,
+            min_samples=min_samples,
+            bootstrap=bootstrap,
+            bootstrap_quantile=bootstrap_quantile,
+        )
+        for kind, name in sorted(set(base_groups) | set(cand_groups))
+    ]
+    kind_order = {"run": 0, "agent": 1, "task": 2, "tool": 3}
+    return sorted(results, key=lambda r: (kind_order.get(r.kind, 9), r.name))
+
+
+def find_regressions(
+    results: Sequence[GroupComparison],
+    metric: str = "p95",
+    threshold_pct: Optional[float] = None,
+    alpha: float = 0.05,
+    error_rate_threshold: Optional[float] = None,
+) -> List[GroupComparison]:
+    """Groups that got slower by more than ``threshold_pct`` with p < ``alpha``,
+    or whose error rate rose by more than ``error_rate_threshold`` (0-1)."""
+    regressions = []
+    for r in results:
+        slower = (
+            threshold_pct is not None
+            and r.delta_pct.get(metric) is not None
+            and r.delta_pct[metric] > threshold_pct
+            and r.p_value is not None
+            and r.p_value < alpha
+        )
+        more_errors = (
+            error_rate_threshold is not None
+            and r.n_base and r.n_cand
+            and r.error_rate_delta > error_rate_threshold
+        )
+        if slower or more_errors:
+            regressions.append(r)
+    return regressions
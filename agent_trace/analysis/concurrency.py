@@ -0,0 +1,367 @@
+import bisect
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, Field
+
+from agent_trace.core.backends.base import TraceDocument, document_started_at
+from agent_trace.core.schema import Trace
+from .compare import step_key
+
+# Timestamps are rounded to microseconds and durations are measured separately
+# from them, so containment and ordering allow this much slack
+TOLERANCE_MS = 0.5
+DEFAULT_BUCKETS = 20
+DEFAULT_MIN_GAP_MS = 1.0
+# Step kinds from outermost to innermost
+NESTING = ("task", "agent", "tool")
+
+
+class IdleGap(BaseModel):
+    """A stretch of the run during which no step was running."""
+    offset_ms: float
+    duration_ms: float
+
+
+class CriticalStep(BaseModel):
+    """One step on the critical path, with the wait before it started."""
+    index: int
+    kind: str
+    name: str
+    offset_ms: float
+    duration_ms: float
+    wait_ms: float
+    # Container (agent/task) the wait falls inside, if any
+    waited_in: Optional[str] = None
+
+
+class PathShare(BaseModel):
+    """Critical-path time attributed to one tool, agent or task.
+
+    ``self_time`` entries are waits inside an agent or task between its
+    traced children (e.g. LLM calls); kind ``idle`` is time outside any step.
+    """
+    kind: str
+    name: str
+    ms: float
+    share: float
+    steps: int = 0
+    self_time: bool = False
+
+
+class ConcurrencyReport(BaseModel):
+    """How much of a run's wall time its steps overlapped, and what bounds it."""
+    trace_id: str
+    name: str
+    started_at: datetime
+    wall_ms: float
+    # Sum of step durations as recorded (nested steps counted twice)
+    step_sum_ms: float
+    # Time at least one step ran, and time weighted by how many did; steps
+    # only count while none of their own children is running
+    busy_ms: float
+    work_ms: float
+    idle_ms: float
+    max_concurrency: int
+    idle_gaps: List[IdleGap] = Field(default_factory=list)
+    # Mean concurrency in equal slices of the wall time
+    timeline: List[float] = Field(default_factory=list)
+    critical_path: List[CriticalStep] = Field(default_factory=list)
+    critical_shares: List[PathShare] = Field(default_factory=list)
+
+    @property
+    def parallelism(self) -> Optional[float]:
+        """Mean number of steps running while anything was."""
+        return self.work_ms / self.busy_ms if self.busy_ms else None
+
+    @property
+    def speedup(self) -> Optional[float]:
+        """Work done per unit of wall time (1.0 = fully sequential, no gaps)."""
+        return self.work_ms / self.wall_ms if self.wall_ms else None
+
+
+class _Interval:
+    __slots__ = ("index", "kind", "name", "start", "end", "parent", "children")
+
+    def __init__(self, index: int, kind: str, name: str, start: float, end: float):
+        self.index = index
+        self.kind = kind
+        self.name = name
+        self.start = start
+        self.end = end
+        self.parent: Optional["_Interval"] = None
+        self.children = 0
+
+    def contains(self, other: "_Interval") -> bool:
+        return self.start <= other.start + TOLERANCE_MS and other.end <= self.end + TOLERANCE_MS
+
+    def covers(self, start: float, end: float) -> bool:
+        return self.start <= start + TOLERANCE_MS and end <= self.end + TOLERANCE_MS
+
+
+def _offset_ms(value, origin: datetime) -> float:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return (value - origin).total_seconds() * 1000
+
+
+def _intervals(doc: TraceDocument, origin: datetime) -> List[_Interval]:
+    intervals = []
+    for index, step in enumerate(doc.get("steps", [])):
+        key = step_key(step)
+        duration = step.get("duration_ms")
+        if key is None or not duration or duration <= 0 or not step.get("started_at"):
+            continue
+        start = _offset_ms(step["started_at"], origin)
+        intervals.append(_Interval(index, key[0], key[1], start, start + duration))
+    # Nest each step in the innermost step of an enclosing kind (a task
+    # around agents, an agent around tools) that contains it. Steps of the
+    # same kind only ever run side by side, however their times overlap.
+    intervals.sort(key=lambda i: (i.start, -i.end))
+    open_steps: Dict[str, List[_Interval]] = {kind: [] for kind in NESTING}
+    for interval in intervals:
+        for kind in reversed(NESTING[:NESTING.index(interval.kind)]):
+            candidates = open_steps[kind]
+            while candidates and candidates[-1].end + TOLERANCE_MS < interval.start:
+                candidates.pop()
+            parent = next((c for c in reversed(candidates) if c.contains(interval)), None)
+            if parent is not None:
+                interval.parent = parent
+                parent.children += 1
+                # Contained within the tolerance; make it exact
+                interval.start = max(interval.start, parent.start)
+                interval.end = min(interval.end, parent.end)
+                break
+        open_steps[interval.kind].append(interval)
+    return intervals
+
+
+def _sweep(intervals: Sequence[_Interval], wall_ms: float, buckets: int, min_gap_ms: float):
+    """Integrate concurrency over time; returns (busy, work, max, gaps, timeline)."""
+    events = []
+    for interval in intervals:
+        events.append((interval.start, 1, interval))
+        events.append((interval.end, 0, interval))
+    # Ends before starts at the same instant
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    active_children: Dict[int, int] = {}
+    active = set()
+    working = 0
+    busy = work = 0.0
+    max_working = 0
+    gaps: List[IdleGap] = []
+    timeline = [0.0] * buckets
+    width = wall_ms / buckets if wall_ms > 0 else 0.0
+
+    def accumulate(t0: float, t1: float, level: int) -> None:
+        nonlocal busy, work
+        if t1 <= t0:
+            return
+        if level:
+            busy += t1 - t0
+            work += level * (t1 - t0)
+        elif t1 - t0 >= min_gap_ms:
+            gaps.append(IdleGap(offset_ms=t0, duration_ms=t1 - t0))
+        if level and width:
+            # Spread over the timeline buckets the segment overlaps
+            first = max(0, min(buckets - 1, int(t0 // width)))
+            last = max(0, min(buckets - 1, int(t1 // width)))
+            for b in range(first, last + 1):
+                overlap = min(t1, (b + 1) * width) - max(t0, b * width)
+                if overlap > 0:
+                    timeline[b] += level * overlap
+
+    previous = 0.0
+    for time, is_start, interval in events:
+        accumulate(previous, time, working)
+        previous = max(previous, time)
+        parent = interval.parent
+        if is_start:
+            if parent is not None and id(parent) in active:
+                if active_children.get(id(parent), 0) == 0:
+                    working -= 1
+                active_children[id(parent)] = active_children.get(id(parent), 0) + 1
+            active.add(id(interval))
+            working += 1
+        else:
+            active.discard(id(interval))
+            if active_children.get(id(interval), 0) == 0:
+                working -= 1
+            if parent is not None and active_children.get(id(parent), 0) > 0:
+                active_children[id(parent)] -= 1
+                if active_children[id(parent)] == 0 and id(parent) in active:
+                    working += 1
+        max_working = max(max_working, working)
+    accumulate(previous, wall_ms, 0)
+    if width:
+        timeline = [round(total / width, 3) for total in timeline]
+    return busy, work, max_working, gaps, timeline
+
+
+def _label(interval: _Interval) -> str:
+    return f"{interval.kind}:{interval.name}"
+
+
+def _waited_in(step: _Interval, start: float, end: float) -> Optional[_Interval]:
+    """Innermost ancestor of ``step`` spanning the wait [start, end]."""
+    ancestor = step.parent
+    while ancestor is not None and not ancestor.covers(start, end):
+        ancestor = ancestor.parent
+    return ancestor
+
+
+def _critical_path(intervals: Sequence[_Interval]) -> List[Tuple[_Interval, float, Optional[_Interval]]]:
+    """Walk back from the step that finished last, each time to the step
+    that finished last before the current one started: the chain of steps
+    the end of the run waited on. Only leaf steps are considered; time a
+    container spent between them is reported as waits inside it."""
+    leaves = sorted((i for i in intervals if i.children == 0), key=lambda i: i.end)
+    if not leaves:
+        return []
+    ends = [leaf.end for leaf in leaves]
+    current = leaves[-1]
+    path = []
+    while True:
+        position = bisect.bisect_right(ends, current.start + TOLERANCE_MS)
+        previous = None
+        while position > 0:
+            position -= 1
+            if leaves[position] is not current and leaves[position].start < current.start:
+                previous = leaves[position]
+                break
+        wait_from = previous.end if previous is not None else 0.0
+        wait = max(0.0, current.start - wait_from)
+        path.append((current, wait, _waited_in(current, wait_from, current.start) if wait else None))
+        if previous is None:
+            break
+        current = previous
+    path.reverse()
+    return path
+
+
+def analyze_document(
+    doc: TraceDocument,
+    buckets: int = DEFAULT_BUCKETS,
+    min_gap_ms: float = DEFAULT_MIN_GAP_MS,
+) -> ConcurrencyReport:
+    """Concurrency, idle time and critical path of one raw trace document.
+
+    Only tool, agent and task steps with a duration take part. Steps that
+    contain other steps (an agent around its tool calls) are nested rather
+    than counted as running in parallel with them.
+    """
+    origin = document_started_at(doc)
+    intervals = _intervals(doc, origin)
+    last_end = max((i.end for i in intervals), default=0.0)
+    wall_ms = last_end
+    if doc.get("ended_at"):
+        wall_ms = max(wall_ms, _offset_ms(doc["ended_at"], origin))
+
+    busy, work, max_working, gaps, timeline = _sweep(intervals, wall_ms, buckets, min_gap_ms)
+    path = _critical_path(intervals)
+
+    critical_path = []
+    shares: Dict[Tuple[str, str, bool], List[float]] = {}
+
+    def attribute(kind: str, name: str, self_time: bool, ms: float, steps: int) -> None:
+        entry = shares.setdefault((kind, name, self_time), [0.0, 0])
+        entry[0] += ms
+        entry[1] += steps
+
+    for interval, wait, container in path:
+        critical_path.append(CriticalStep(
+            index=interval.index,
+            kind=interval.kind,
+            name=interval.name,
+            offset_ms=round(interval.start, 3),
+            duration_ms=round(interval.end - interval.start, 3),
+            wait_ms=round(wait, 3),
+            waited_in=_label(container) if container is not None else None,
+        ))
+        attribute(interval.kind, interval.name, False, interval.end - interval.start, 1)
+        if wait:
+            if container is not None:
+                attribute(container.kind, container.name, True, wait, 0)
+            else:
+                attribute("idle", "(untraced)", False, wait, 0)
+    if path:
+        # After the last leaf: the rest of its containers, then untraced time
+        last = path[-1][0]
+        cursor = last.end
+        container = last.parent
+        while container is not None:
+            if container.end > cursor:
+                attribute(container.kind, container.name, True, container.end - cursor, 0)
+                cursor = container.end
+            container = container.parent
+        if wall_ms > cursor:
+            attribute("idle", "(untraced)", False, wall_ms - cursor, 0)
+
+    critical_shares = sorted(
+        (
+            PathShare(
+                kind=kind, name=name, self_time=self_time, steps=steps,
+                ms=round(ms, 3), share=round(ms / wall_ms, 4) if wall_ms else 0.0,
+            )
+            for (kind, name, self_time), (ms, steps) in shares.items()
+        ),
+        key=lambda s: s.ms,
+        reverse=True,
+    )
+    return ConcurrencyReport(
+        trace_id=str(doc["trace_id"]),
+        name=doc["name"],
+        started_at=origin,
+        wall_ms=round(wall_ms, 3),
+        step_sum_ms=round(sum(i.end - i.start for i in intervals), 3),
+        busy_ms=round(busy, 3),
+        work_ms=round(work, 3),
+        idle_ms=round(max(0.0, wall_ms - busy), 3),
+        max_concurrency=max_working,
+        idle_gaps=[IdleGap(offset_ms=round(g.offset_ms, 3), duration_ms=round(g.duration_ms, 3)) for g in gaps],
+        timeline=timeline,
+        critical_path=critical_path,
+        critical_shares=critical_shares,
+    )
+
+
+def analyze_trace(trace: Trace, **kwargs) -> ConcurrencyReport:
+    """``analyze_document`` for a ``Trace`` model."""
+    return analyze_document(trace.model_dump(), **kwargs)
+
+
+def summarize_reports(reports: Sequence[ConcurrencyReport]) -> Dict[str, object]:
+    """Totals over many runs: overall parallelism and which tools, agents and
+    tasks account for the most critical-path time."""
+    wall = sum(r.wall_ms for r in reports)
+    busy = sum(r.busy_ms for r in reports)
+    work = sum(r.work_ms for r in reports)
+    shares: Dict[Tuple[str, str, bool], List[float]] = {}
+    for report in reports:
+        for share in report.critical_shares:
+            entry = shares.setdefault((share.kind, share.name, share.self_time), [0.0, 0, 0])
+            entry[0] += share.ms
+            entry[1] += share.steps
+            entry[2] += 1
+    return {
+        "runs": len(reports),
+        "wall_ms": round(wall, 3),
+        "step_sum_ms": round(sum(r.step_sum_ms for r in reports), 3),
+        "busy_ms": round(busy, 3),
+        "work_ms": round(work, 3),
+        "idle_ms": round(sum(r.idle_ms for r in reports), 3),
+        "parallelism": round(work / busy, 3) if busy else None,
+        "speedup": round(work / wall, 3) if wall else None,
+        "max_concurrency": max((r.max_concurrency for r in reports), default=0),
+        "critical_shares": [
+            {
+                "kind": kind, "name": name, "self_time": self_time,
+                "ms": round(ms, 3), "share": round(ms / wall, 4) if wall else 0.0,
+                "steps": steps, "runs": runs,
+            }
+            for (kind, name, self_time), (ms, steps, runs) in sorted(
+                shares.items(), key=lambda item: item[1][0], reverse=True
+            )
+        ],
+    }
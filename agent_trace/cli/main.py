@@ -1,12 +1,44 @@
 import json
+import os
+import reprlib
+import runpy
+import sys
+import time
+import webbrowser
+from pathlib import Path
 from typing import Optional
 from datetime import datetime
 
 import click
 from rich.console import Console
+from rich.markup import escape
+from rich.progress import Progress
 from rich.table import Table
 
-from agent_trace.core.store import list_traces, load_trace
+from agent_trace.analysis.compare import Selection, compare_selections, find_regressions
+from agent_trace.analysis.concurrency import analyze_document, summarize_reports
+from agent_trace.adapters.langgraph.graph import GRAPHS_KEY
+from agent_trace.server.app import DEFAULT_CACHE_BYTES, DEFAULT_PORT, TraceBrowser, make_server
+from agent_trace.core.search import HIGHLIGHT_END, HIGHLIGHT_START, SEARCH_FIELDS, InvalidSearchQuery
+from agent_trace.core.synth import LATENCY_DISTRIBUTIONS, STEP_TYPES, SynthConfig, write_synthetic_traces
+from agent_trace.core.cache import get_tool_cache
+from agent_trace.core.config import config_path, load_config
+from agent_trace.core.overhead import summarize_overhead
+from agent_trace.core.schema import ANOMALY_KEY, TraceSummary
+from agent_trace.core.replay import REPLAY_POLICIES, ReplayMismatch, normalize_inputs, replay_trace
+from agent_trace.core.store import (
+    compact_traces,
+    get_search_index,
+    iter_trace_documents,
+    list_overhead,
+    list_trace_documents,
+    list_trace_summaries,
+    load_trace,
+    load_trace_document,
+    open_step_columns,
+    reindex_search,
+    window_trace,
+)
 
 console = Console()
 
@@ -29,44 +61,190 @@ def parse_datetime(ctx, param, value):
         raise click.BadParameter("Date must be in ISO format (e.g. 2025-04-07T00:00)")
 
 
-def filter_traces_by_tool(traces, tool_name: Optional[str]) -> list:
-    if not tool_name:
-        return traces
-    return [
-        trace for trace in traces
-        if any(step.tool_name == tool_name for step in trace.steps)
-    ]
+def parse_steps(ctx, param, value):
+    """Parse a ``start:stop`` step window (0-based, Python slice semantics)."""
+    if value is None:
+        return None
+    try:
+        start, _, stop = value.partition(":")
+        return (
+            int(start) if start else None,
+            int(stop) if stop else None,
+        )
+    except ValueError:
+        raise click.BadParameter("Steps must be a slice like 100:200, :50 or -20:")
+
+
+def parse_tags(ctx, param, value):
+    """Parse repeated KEY=VALUE metadata tag options into a dict."""
+    tags = {}
+    for item in value or ():
+        key, sep, tag_value = item.partition("=")
+        if not sep or not key:
+            raise click.BadParameter(f"Tags must be KEY=VALUE, got '{item}'")
+        tags[key] = tag_value
+    return tags
+
+
+def uses_tool(tool_name: str):
+    """Predicate for raw trace documents that called ``tool_name``."""
+    def predicate(doc) -> bool:
+        return any(step.get("tool_name") == tool_name for step in doc.get("steps", []))
+    return predicate
+
 
+def has_anomalies(doc) -> bool:
+    """Whether a raw trace document has steps flagged as unusually slow."""
+    return TraceSummary.from_document(doc).anomaly_count > 0
 
-def format_step(step) -> tuple:
-    """Format a step for display in the table."""
+
+def all_of(*predicates):
+    """Predicate that holds when every given predicate (``None`` = skip) does."""
+    predicates = [p for p in predicates if p is not None]
+    return lambda doc: all(p(doc) for p in predicates)
+
+
+def make_repr(max_width: int) -> reprlib.Repr:
+    """A bounded ``repr`` that never formats more than it will display."""
+    short = reprlib.Repr()
+    if max_width:
+        short.maxstring = max_width
+        short.maxother = max_width
+        short.maxlist = short.maxdict = short.maxtuple = 8
+        short.maxlevel = 3
+    else:
+        short.maxstring = short.maxother = short.maxlong = 1 << 30
+        short.maxlist = short.maxdict = short.maxtuple = 1 << 30
+        short.maxlevel = 1 << 10
+    return short
+
+
+def truncate(text: str, max_width: int) -> str:
+    """Shorten ``text`` to ``max_width`` characters (0 = no limit)."""
+    if max_width and len(text) > max_width:
+        return text[:max_width - 1] + "…"
+    return text
+
+
+def format_step(step, max_width: int = 0) -> tuple:
+    """Format a step for display, truncating payloads to ``max_width``."""
+    duration = format_duration(step.duration_ms)
     if step.step_type == "tool":
         status = "❌" if step.error else "✅"
-        duration = format_duration(step.duration_ms)
-        
+        short = make_repr(max_width)
+
         inputs_str = ", ".join(
-            f"{k}={repr(v)}" for k, v in step.inputs.items()
+            f"{k}={short.repr(v)}" for k, v in step.inputs.items()
         )
-        
+
         return (
-            f"🔧 {step.tool_name}({inputs_str})",
+            f"🔧 {step.tool_name}({truncate(inputs_str, max_width)})",
             "→",
             f"{status} {duration}"
         )
     elif step.step_type == "reasoning":
-        duration = format_duration(step.duration_ms)
-        thought_line = f"💭 {step.thought}"
-        
+        thought_line = f"💭 {truncate(step.thought, max_width)}"
+
         if step.action:
-            thought_line += f"\n   ⚡ Action: {step.action}"
+            thought_line += f"\n   ⚡ Action: {truncate(step.action, max_width)}"
         if step.observation:
-            thought_line += f"\n   👁 Observed: {step.observation}"
-            
+            thought_line += f"\n   👁 Observed: {truncate(step.observation, max_width)}"
+
         return (
             thought_line,
             "",
             f"🤔 {duration}"
         )
+    elif step.step_type == "task":
+        return (
+            f"📌 {truncate(step.task_name or '', max_width)}",
+            "→",
+            f"🗂  {duration}"
+        )
+    return (
+        f"🤖 {step.agent_name}",
+        "→",
+        f"⏳ {duration}"
+    )
+
+
+def print_graph_timings(trace, top: int = 5) -> None:
+    """Where each LangGraph invocation of a run spent its time: the slowest
+    supersteps and the time between them."""
+    for graph in trace.metadata.get(GRAPHS_KEY, []):
+        supersteps = graph["supersteps"]
+        console.print(
+            f"🕸  {escape(graph['graph'])}: {len(supersteps)} supersteps in {format_duration(graph['duration_ms'])}, "
+            f"{format_duration(graph['between_ms'])} between them"
+        )
+        for superstep in sorted(supersteps, key=lambda s: s["duration_ms"], reverse=True)[:top]:
+            nodes = ", ".join(superstep["nodes"])
+            console.print(
+                f"   [dim]step {superstep['step']:<4}[/dim] {format_duration(superstep['duration_ms']):>7}  "
+                f"{escape(truncate(nodes, 60))} [dim](slowest: {escape(superstep['slowest'])})[/dim]"
+            )
+
+
+def print_trace(trace, total_steps: int, start: int, max_width: int, anomalies: bool = False) -> None:
+    """Print a trace header and its (already windowed) steps, row by row.
+
+    With ``anomalies``, steps flagged as slower than their baseline are
+    highlighted.
+    """
+    console.print(f"\n📋 [bold blue]Run:[/bold blue] {escape(trace.name)}")
+    console.print(f"🕒 {trace.started_at.isoformat()}")
+    if len(trace.steps) < total_steps:
+        stop = start + len(trace.steps)
+        console.print(f"📄 Steps {start}-{max(stop - 1, start)} of {total_steps}")
+    console.print()
+
+    # Rows are printed as they are formatted rather than collected into one
+    # table, so memory and time stay proportional to the window.
+    for i, step in enumerate(trace.steps, start):
+        left, middle, right = format_step(step, max_width)
+        console.print(f"[dim]#{i:<5}[/dim] {escape(left)} {middle} {right}")
+
+        if getattr(step, "error", None):
+            console.print(f"       [red]{escape(truncate(step.error, max_width))}[/red]")
+        anomaly = step.metadata.get(ANOMALY_KEY) if anomalies else None
+        if anomaly:
+            console.print(
+                f"       [bold yellow]🐢 {anomaly['ratio']}× slower than p99 "
+                f"({format_duration(anomaly['p99_ms'])})[/bold yellow]"
+            )
+
+    remaining = total_steps - start - len(trace.steps)
+    if remaining > 0:
+        console.print(f"[dim]… {remaining} more steps (use --page, --steps or --pager)[/dim]")
+    console.print()
+    console.print(
+        f"⏱ Total: {format_duration(trace.duration_ms)}"
+    )
+    print_graph_timings(trace)
+
+
+def page_trace(doc, page_size: int, max_width: int, anomalies: bool = False) -> None:
+    """Interactively page through the steps of one trace."""
+    total = len(doc.get("steps", []))
+    pages = max(1, -(-total // page_size))
+    page = 0
+    while True:
+        start = page * page_size
+        trace, _ = window_trace(doc, start, start + page_size)
+        console.clear()
+        print_trace(trace, total, start, max_width, anomalies)
+        console.print(f"\n[dim]Page {page + 1}/{pages} — [n]ext, [p]revious, [f]irst, [l]ast, [q]uit[/dim]")
+        key = click.getchar()
+        if key in ("n", " ", "\r", "\n", "j"):
+            page = min(page + 1, pages - 1)
+        elif key in ("p", "b", "k"):
+            page = max(page - 1, 0)
+        elif key == "f":
+            page = 0
+        elif key == "l":
+            page = pages - 1
+        elif key in ("q", "\x1b", "\x03"):
+            return
 
 
 @click.group()
@@ -82,7 +260,13 @@ def cli():
 @click.option("--since", callback=parse_datetime, help="Show traces after this date (ISO format)")
 @click.option("--until", callback=parse_datetime, help="Show traces before this date (ISO format)")
 @click.option("--tool", help="Filter traces that used this tool")
+@click.option("--anomalies", is_flag=True, help="Only traces with unusually slow steps, highlighting them")
 @click.option("--limit", type=int, default=10, help="Maximum number of traces to show")
+@click.option("--page", type=click.IntRange(min=1), help="Page of steps to show (see --page-size)")
+@click.option("--page-size", type=click.IntRange(min=0), default=50, help="Steps per page (0 = all steps)")
+@click.option("--steps", callback=parse_steps, help="Window of steps to show, e.g. 100:200 (0-based)")
+@click.option("--pager", is_flag=True, help="Page through the steps of one trace interactively")
+@click.option("--max-width", type=click.IntRange(min=0), default=120, help="Truncate inputs/thoughts to this many characters (0 = no limit)")
 @click.argument("index", type=int, required=False)
 def view(
     latest: bool,
@@ -91,84 +275,691 @@ def view(
     since: Optional[datetime],
     until: Optional[datetime],
     tool: Optional[str],
+    anomalies: bool,
     limit: int,
+    page: Optional[int],
+    page_size: int,
+    steps: Optional[tuple],
+    pager: bool,
+    max_width: int,
     index: Optional[int]
 ):
     """View agent traces. Optionally provide an index number to view a specific trace."""
-    traces = list_traces(
-        limit=1 if latest else limit,
-        name_filter=name,
-        since=since,
-        until=until
-    )
-    
-    if not traces:
-        console.print("[yellow]No traces found[/yellow]")
-        return
+    # Raw documents are only validated for the visible window of steps.
+    # Filtering by tool or anomalies needs whole documents, so those are
+    # loaded in parallel until enough traces matched.
+    if tool or anomalies:
+        docs = [*iter_trace_documents(
+            limit=1 if latest else limit,
+            name_filter=name,
+            since=since,
+            until=until,
+            where=all_of(uses_tool(tool) if tool else None, has_anomalies if anomalies else None),
+        )]
+    else:
+        docs = list_trace_documents(
+            limit=1 if latest else limit,
+            name_filter=name,
+            since=since,
+            until=until
+        )
 
-    # Apply tool filter if specified
-    traces = filter_traces_by_tool(traces, tool)
-    if not traces:
-        console.print("[yellow]No traces found with the specified tool[/yellow]")
+    if not docs:
+        if anomalies:
+            message = "No traces found with anomalies"
+        elif tool:
+            message = "No traces found with the specified tool"
+        else:
+            message = "No traces found"
+        console.print(f"[yellow]{message}[/yellow]")
         return
 
     if index is not None:
-        if index < 1 or index > len(traces):
-            console.print(f"[red]Error: Index {index} is out of range. Available range: 1-{len(traces)}[/red]")
+        if index < 1 or index > len(docs):
+            console.print(f"[red]Error: Index {index} is out of range. Available range: 1-{len(docs)}[/red]")
             return
-        traces = [traces[index - 1]]
-        
-    if json_output:
-        for trace in traces:
+        docs = [docs[index - 1]]
+
+    if pager:
+        if len(docs) > 1:
+            console.print("[yellow]--pager shows one trace; showing the first (use INDEX or --latest to pick)[/yellow]")
+        page_trace(docs[0], page_size or 50, max_width, anomalies)
+        return
+
+    if steps is not None:
+        start, stop = steps
+    elif page_size and (page or not json_output):
+        start = ((page or 1) - 1) * page_size
+        stop = start + page_size
+    else:
+        start, stop = None, None
+
+    for doc in docs:
+        trace, total = window_trace(doc, start, stop)
+        if json_output:
             click.echo(json.dumps(trace.model_dump(), indent=2, default=str))
+            continue
+        print_trace(trace, total, slice(start, stop).indices(total)[0], max_width, anomalies)
+
+
+def format_delta(pct: Optional[float]) -> str:
+    """Format a relative change, red when slower and green when faster."""
+    if pct is None:
+        return "[dim]n/a[/dim]"
+    color = "red" if pct > 0 else "green"
+    return f"[{color}]{pct:+.1f}%[/{color}]"
+
+
+@cli.command()
+@click.option("--base-name", help="Baseline: filter traces by name")
+@click.option("--base-since", callback=parse_datetime, help="Baseline: traces after this date (ISO format)")
+@click.option("--base-until", callback=parse_datetime, help="Baseline: traces before this date (ISO format)")
+@click.option("--base-tag", multiple=True, callback=parse_tags, help="Baseline: metadata KEY=VALUE (repeatable)")
+@click.option("--base-limit", type=int, help="Baseline: at most this many (newest) traces")
+@click.option("--cand-name", help="Candidate: filter traces by name")
+@click.option("--cand-since", callback=parse_datetime, help="Candidate: traces after this date (ISO format)")
+@click.option("--cand-until", callback=parse_datetime, help="Candidate: traces before this date (ISO format)")
+@click.option("--cand-tag", multiple=True, callback=parse_tags, help="Candidate: metadata KEY=VALUE (repeatable)")
+@click.option("--cand-limit", type=int, help="Candidate: at most this many (newest) traces")
+@click.option("--metric", type=click.Choice(["p50", "p95", "p99"]), default="p95", help="Percentile used for regression gating and bootstrap CI")
+@click.option("--min-samples", type=int, default=5, help="Minimum samples per side for significance estimates")
+@click.option("--bootstrap", type=int, default=0, help="Bootstrap resamples for a CI on the --metric delta (0 = off)")
+@click.option("--alpha", type=float, default=0.05, help="Significance level for regressions")
+@click.option("--fail-on-regression", type=float, help="Exit non-zero if any group's --metric is this many %% slower (and significant)")
+@click.option("--fail-on-error-increase", type=float, help="Exit non-zero if any group's error rate rises by this many percentage points")
+@click.option("--json", "json_output", is_flag=True, help="Output as JSON")
+def compare(
+    base_name, base_since, base_until, base_tag, base_limit,
+    cand_name, cand_since, cand_until, cand_tag, cand_limit,
+    metric: str,
+    min_samples: int,
+    bootstrap: int,
+    alpha: float,
+    fail_on_regression: Optional[float],
+    fail_on_error_increase: Optional[float],
+    json_output: bool,
+):
+    """Compare latency and error rates between two sets of runs."""
+    base = Selection(name=base_name, since=base_since, until=base_until, tags=base_tag, limit=base_limit)
+    cand = Selection(name=cand_name, since=cand_since, until=cand_until, tags=cand_tag, limit=cand_limit)
+    results = compare_selections(
+        base, cand,
+        min_samples=min_samples,
+        bootstrap=bootstrap,
+        bootstrap_quantile=int(metric[1:]),
+    )
+    regressions = find_regressions(
+        results,
+        metric=metric,
+        threshold_pct=fail_on_regression,
+        alpha=alpha,
+        error_rate_threshold=fail_on_error_increase / 100 if fail_on_error_increase is not None else None,
+    )
+
+    if json_output:
+        click.echo(json.dumps({
+            "baseline": base.describe(),
+            "candidate": cand.describe(),
+            "groups": [r.model_dump() for r in results],
+            "regressions": [f"{r.kind}:{r.name}" for r in regressions],
+        }, indent=2))
+    elif not results:
+        console.print("[yellow]No steps found in either selection[/yellow]")
+    else:
+        console.print(f"\n⚖️  [bold]Baseline:[/bold] {escape(base.describe())}")
+        console.print(f"   [bold]Candidate:[/bold] {escape(cand.describe())}\n")
+        table = Table()
+        for column in ("", "n", "p50", "p95", "p99", "errors", "p-value"):
+            table.add_column(column, justify="left" if not column else "right")
+        if bootstrap:
+            table.add_column(f"{metric} CI", justify="right")
+        for r in results:
+            icon = {"run": "📋", "agent": "🤖", "task": "📌", "tool": "🔧"}.get(r.kind, "")
+            flag = " ⚠️" if r in regressions else ""
+            row = [
+                f"{icon} {escape(r.name)}{flag}",
+                f"{r.n_base}→{r.n_cand}",
+                *(
+                    f"{format_duration(r.cand_ms[q]) if r.n_cand else '-'} {format_delta(r.delta_pct[q])}"
+                    for q in ("p50", "p95", "p99")
+                ),
+                f"{r.base_error_rate:.0%}→{r.cand_error_rate:.0%}",
+                f"{r.p_value:.3f}" if r.p_value is not None else "[dim]n/a[/dim]",
+            ]
+            if bootstrap:
+                row.append(escape(f"[{r.ci_pct[0]:+.1f}%, {r.ci_pct[1]:+.1f}%]") if r.ci_pct else "[dim]n/a[/dim]")
+            table.add_row(*row)
+        console.print(table)
+
+    if regressions:
+        if not json_output:
+            console.print(f"\n[red]❌ {len(regressions)} regression(s) detected[/red]")
+        raise SystemExit(1)
+
+
+SPARK_CHARS = " ▁▂▃▄▅▆▇█"
+
+
+def sparkline(values, top: float) -> str:
+    """One character per value, scaled so ``top`` is a full block."""
+    if not top:
+        return SPARK_CHARS[0] * len(values)
+    last = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[min(last, round(v / top * last))] for v in values)
+
+
+def print_critical_shares(shares, limit: int) -> None:
+    """Table of where critical-path time goes, largest first."""
+    table = Table(title="Critical path time")
+    for column in ("", "time", "share", "steps"):
+        table.add_column(column, justify="left" if not column else "right")
+    for share in shares[:limit]:
+        icon = {"agent": "🤖", "task": "📌", "tool": "🔧", "idle": "💤"}.get(share["kind"], "")
+        label = f"{icon} {escape(share['name'])}" + (" [dim](self)[/dim]" if share["self_time"] else "")
+        table.add_row(label, format_duration(share["ms"]), f"{share['share']:.0%}", str(share["steps"] or ""))
+    console.print(table)
+
+
+@cli.command()
+@click.argument("trace_id", required=False)
+@click.option("--latest", is_flag=True, help="Analyze only the latest trace")
+@click.option("--name", help="Filter traces by name")
+@click.option("--since", callback=parse_datetime, help="Only traces after this date (ISO format)")
+@click.option("--until", callback=parse_datetime, help="Only traces before this date (ISO format)")
+@click.option("--limit", type=int, default=20, help="Maximum number of traces to analyze")
+@click.option("--buckets", type=click.IntRange(min=1), default=40, help="Slices of the parallelism timeline")
+@click.option("--top", type=click.IntRange(min=1), default=10, help="Rows of critical-path time to show")
+@click.option("--json", "json_output", is_flag=True, help="Output as JSON")
+def analyze(trace_id: Optional[str], latest: bool, name: Optional[str], since: Optional[datetime],
+            until: Optional[datetime], limit: int, buckets: int, top: int, json_output: bool):
+    """Parallelism, idle time and critical path of runs.
+
+    With TRACE_ID (or --latest) shows one run in detail; otherwise sums up
+    the matching runs and where their critical-path time goes.
+    """
+    if trace_id:
+        try:
+            docs = [load_trace_document(trace_id)]
+        except FileNotFoundError as e:
+            console.print(f"[red]{escape(str(e))}[/red]")
+            raise SystemExit(1)
+    else:
+        docs = list_trace_documents(limit=1 if latest else limit, name_filter=name, since=since, until=until)
+    if not docs:
+        console.print("[yellow]No traces found[/yellow]")
         return
-        
-    for trace in traces:
-        console.print(f"\n📋 [bold blue]Run:[/bold blue] {trace.name}")
-        console.print(f"🕒 {trace.started_at.isoformat()}")
-        console.print()
-        
-        table = Table(show_header=False)
-        for step in trace.steps:
-            left, middle, right = format_step(step)
-            table.add_row(left, middle, right)
-            
-            if hasattr(step, 'error') and step.error:
-                table.add_row("", "", f"[red]{step.error}[/red]")
-                
+    reports = [analyze_document(doc, buckets=buckets) for doc in docs]
+
+    if len(reports) == 1:
+        report = reports[0]
+        if json_output:
+            click.echo(json.dumps(
+                {**report.model_dump(mode="json"), "parallelism": report.parallelism, "speedup": report.speedup},
+                indent=2,
+            ))
+            return
+        console.print(f"\n📋 [bold blue]Run:[/bold blue] {escape(report.name)}")
+        console.print(
+            f"⏱ Wall {format_duration(report.wall_ms)} · steps {format_duration(report.step_sum_ms)} summed"
+            f" · busy {format_duration(report.busy_ms)} · idle {format_duration(report.idle_ms)}"
+        )
+        parallelism = f"{report.parallelism:.2f}" if report.parallelism is not None else "n/a"
+        console.print(f"🔀 Parallelism {parallelism} while busy (max {report.max_concurrency})")
+        console.print(f"   [cyan]{sparkline(report.timeline, report.max_concurrency)}[/cyan]")
+        if report.idle_gaps:
+            longest = sorted(report.idle_gaps, key=lambda g: g.duration_ms, reverse=True)[:5]
+            gaps = ", ".join(f"{format_duration(g.duration_ms)} at +{format_duration(g.offset_ms)}" for g in longest)
+            console.print(f"💤 {len(report.idle_gaps)} idle gaps; longest: {gaps}")
+
+        table = Table(title="Critical path")
+        for column in ("#", "step", "start", "duration", "wait before"):
+            table.add_column(column, justify="left" if column == "step" else "right")
+        for step in report.critical_path:
+            wait = format_duration(step.wait_ms) if step.wait_ms else ""
+            if step.wait_ms and step.waited_in:
+                wait += f" [dim]in {escape(step.waited_in)}[/dim]"
+            table.add_row(
+                str(step.index), f"{escape(step.kind)}:{escape(step.name)}",
+                f"+{format_duration(step.offset_ms)}", format_duration(step.duration_ms), wait,
+            )
         console.print(table)
-        console.print()
+        print_critical_shares([s.model_dump() for s in report.critical_shares], top)
+        return
+
+    summary = summarize_reports(reports)
+    if json_output:
+        click.echo(json.dumps({
+            "summary": summary,
+            "runs": [
+                {**r.model_dump(mode="json", exclude={"critical_path", "timeline"}), "parallelism": r.parallelism}
+                for r in reports
+            ],
+        }, indent=2))
+        return
+    table = Table()
+    for column in ("run", "started", "wall", "steps summed", "parallelism", "max", "idle"):
+        table.add_column(column, justify="left" if column in ("run", "started") else "right")
+    for r in reports:
+        table.add_row(
+            escape(r.name), r.started_at.strftime("%Y-%m-%d %H:%M"), format_duration(r.wall_ms),
+            format_duration(r.step_sum_ms), f"{r.parallelism:.2f}" if r.parallelism is not None else "-",
+            str(r.max_concurrency), f"{r.idle_ms / r.wall_ms:.0%}" if r.wall_ms else "-",
+        )
+    console.print(table)
+    if summary["wall_ms"]:
+        parallelism = f"{summary['parallelism']:.2f}" if summary["parallelism"] is not None else "n/a"
         console.print(
-            f"⏱ Total: {format_duration(trace.duration_ms)}"
+            f"🔀 {summary['runs']} runs: parallelism {parallelism} while busy, "
+            f"idle {summary['idle_ms'] / summary['wall_ms']:.0%} of wall time"
         )
+    print_critical_shares(summary["critical_shares"], top)
 
 
-@cli.command()
+@cli.command(context_settings={"ignore_unknown_options": True})
 @click.argument("trace_id")
-def replay(trace_id: str):
-    """Replay a specific trace (not implemented in MVP)."""
+@click.argument("script", type=click.Path(exists=True, dir_okay=False), required=False)
+@click.argument("script_args", nargs=-1, type=click.UNPROCESSED)
+@click.option("--policy", type=click.Choice(REPLAY_POLICIES), default="strict", help="strict: fail on calls that weren't recorded; lenient: run them for real")
+@click.option("--max-width", type=click.IntRange(min=0), default=80, help="Truncate inputs to this many characters (0 = no limit)")
+@click.option("--json", "json_output", is_flag=True, help="Output the replay report as JSON")
+def replay(trace_id: str, script: Optional[str], script_args: tuple, policy: str, max_width: int, json_output: bool):
+    """Re-run SCRIPT with traced tools answered from trace TRACE_ID.
+
+    Tool calls matching a recorded call (same tool, same inputs) return the
+    recorded output or raise the recorded error instantly. Without SCRIPT,
+    lists the recorded tool calls.
+    """
+    try:
+        recorded = load_trace(trace_id)
+    except FileNotFoundError as e:
+        console.print(f"[red]{e}[/red]")
+        raise SystemExit(1)
+
+    if script is None:
+        tool_steps = [s for s in recorded.steps if s.step_type == "tool"]
+        console.print(f"▶️  {len(tool_steps)} recorded tool calls in {recorded.name} ({recorded.trace_id})")
+        for i, step in enumerate(tool_steps):
+            status = "❌" if step.error else "✅"
+            inputs = escape(truncate(normalize_inputs(step.inputs), max_width))
+            console.print(f"  #{i:<4} {status} {step.tool_name:<20} {format_duration(step.duration_ms):>8}  {inputs}")
+        return
+
+    failure = None
+    exit_code = 0
+    saved_argv, saved_path = sys.argv, sys.path[:]
+    sys.argv = [script, *script_args]
+    sys.path.insert(0, str(Path(script).resolve().parent))
+    try:
+        with replay_trace(recorded, policy) as session:
+            try:
+                runpy.run_path(script, run_name="__main__")
+            except ReplayMismatch as e:
+                failure = e
+            except SystemExit as e:
+                exit_code = e.code if isinstance(e.code, int) else (1 if e.code else 0)
+    finally:
+        sys.argv, sys.path[:] = saved_argv, saved_path
+
+    report = session.report
+    if json_output:
+        click.echo(json.dumps(report.model_dump(), indent=2))
+    else:
+        console.print(
+            f"▶️  Replayed {recorded.name} ({recorded.trace_id}, {policy}): "
+            f"{report.hits}/{report.calls} calls from the recording, "
+            f"{format_duration(report.saved_ms)} of tool time skipped"
+        )
+        for miss in report.misses:
+            console.print(f"  [yellow]miss[/yellow] {miss.tool_name} ({miss.reason}): {escape(truncate(miss.inputs, max_width))}")
+        if report.unused:
+            console.print(f"  {report.unused} recorded calls were never made")
+        if failure:
+            console.print(f"[red]Replay failed: {escape(str(failure))}[/red]")
+    if failure:
+        raise SystemExit(1)
+    if exit_code:
+        raise SystemExit(exit_code)
+
+
+@cli.command()
+@click.argument("query", required=False)
+@click.option("--field", type=click.Choice(SEARCH_FIELDS), help="Only match this step field")
+@click.option("--type", "step_type", type=click.Choice(["tool", "reasoning", "task", "agent"]), help="Only match this step type")
+@click.option("--tool", help="Only match steps of this tool/agent/task name")
+@click.option("--limit", type=int, default=20, help="Maximum number of matching steps to show")
+@click.option("--raw", is_flag=True, help="Treat QUERY as FTS5 syntax (AND/OR/NEAR, prefix*) instead of a phrase")
+@click.option("--reindex", is_flag=True, help="Rebuild the search index from stored traces first")
+@click.option("--json", "json_output", is_flag=True, help="Output as JSON")
+def search(
+    query: Optional[str],
+    field: Optional[str],
+    step_type: Optional[str],
+    tool: Optional[str],
+    limit: int,
+    raw: bool,
+    reindex: bool,
+    json_output: bool,
+):
+    """Full-text search over thoughts, tool inputs/outputs/errors and results."""
+    if reindex:
+        count = reindex_search()
+        console.print(f"🔎 Indexed {count} traces")
+    if not query:
+        if not reindex:
+            raise click.UsageError("Provide a QUERY or --reindex")
+        return
+
+    try:
+        hits = get_search_index().search(
+            query, field=field, step_type=step_type, step_name=tool, limit=limit, raw=raw
+        )
+    except InvalidSearchQuery as e:
+        raise click.BadParameter(str(e), param_hint="QUERY")
+    if json_output:
+        click.echo(json.dumps([hit.model_dump() for hit in hits], indent=2))
+        return
+    if not hits:
+        console.print("[yellow]No matches found[/yellow]")
+        return
+
+    # Group by trace, keeping traces in order of their best hit
+    by_trace = {}
+    for hit in hits:
+        by_trace.setdefault(hit.trace_id, []).append(hit)
+
+    for trace_hits in by_trace.values():
+        first = trace_hits[0]
+        console.print(f"\n📋 [bold blue]{escape(first.trace_name)}[/bold blue] [dim]{first.trace_id}[/dim]")
+        for hit in trace_hits:
+            snippet = escape(hit.snippet.replace("\n", " "))
+            snippet = snippet.replace(HIGHLIGHT_START, "[bold yellow]").replace(HIGHLIGHT_END, "[/bold yellow]")
+            name = f" {escape(hit.step_name)}" if hit.step_name else ""
+            console.print(f"   #{hit.step_index}{name} [cyan]{hit.field}[/cyan]: {snippet}")
+
+
+@cli.command()
+@click.option("--segments-only", is_flag=True, help="Don't migrate loose JSON trace files into segments")
+def compact(segments_only: bool):
+    """Compact segment storage and fold loose trace files into segments."""
+    result = compact_traces(include_files=not segments_only)
+    console.print(
+        f"🗜  Compacted {result['traces']} traces: "
+        f"{result['segments_before']} → {result['segments_after']} segments, "
+        f"{result['bytes_before']:,} → {result['bytes_after']:,} bytes"
+    )
+    if result["files_migrated"]:
+        console.print(f"📦 Migrated {result['files_migrated']} trace files into segments")
+
+
+@cli.command()
+@click.option("--clear", is_flag=True, help="Remove cached tool results")
+@click.option("--tool", help="With --clear, only remove results of this tool")
+@click.option("--json", "json_output", is_flag=True, help="Output as JSON")
+def cache(clear: bool, tool: Optional[str], json_output: bool):
+    """Show or clear the persisted tool result cache."""
+    tool_cache = get_tool_cache()
+    if clear:
+        removed = tool_cache.clear(tool)
+        console.print(f"🧹 Removed {removed} cached results{f' of {tool}' if tool else ''}")
+        return
+    stats = tool_cache.stats()
+    if json_output:
+        click.echo(json.dumps(stats, indent=2))
+        return
+    console.print(f"🗄  {stats['disk_entries']} cached results, {stats['disk_bytes']:,} bytes in {tool_cache.path}")
+    for name, tool_stats in stats["tools"].items():
+        console.print(
+            f"  {name:<25} {tool_stats['entries']:>6} results  "
+            f"{tool_stats['bytes']:>10,} bytes  {format_duration(tool_stats['recorded_ms'])} of tool time"
+        )
+
+
+@cli.command()
+@click.option("--name", help="Only runs whose name contains this")
+@click.option("--since", callback=parse_datetime, help="Only runs saved after this date (ISO format)")
+@click.option("--limit", type=int, help="Only the most recent N runs")
+@click.option("--fail-above", type=float, help="Exit non-zero if p95 overhead exceeds this many %% of run time")
+@click.option("--json", "json_output", is_flag=True, help="Output as JSON")
+def overhead(name: Optional[str], since: Optional[datetime], limit: Optional[int], fail_above: Optional[float], json_output: bool):
+    """Summarize the tracer's own overhead across recorded runs."""
+    summary = summarize_overhead(list_overhead(limit=limit, name_filter=name, since=since))
+    if json_output:
+        click.echo(json.dumps(summary, indent=2))
+    elif not summary["runs"]:
+        console.print("[yellow]No overhead records found[/yellow]")
+        return
+    else:
+        pct = summary["overhead_pct"]
+        console.print(f"⏱  Tracer overhead over {summary['runs']} runs ({summary['steps_captured']:,} steps)")
+        if pct:
+            console.print(
+                f"   % of run time: p50 {pct['p50']:.3f}%  p95 {pct['p95']:.3f}%  "
+                f"p99 {pct['p99']:.3f}%  max {pct['max']:.3f}%"
+            )
+        table = Table(box=None)
+        table.add_column("Phase")
+        table.add_column("Mean per run", justify="right")
+        for phase, ms in summary["mean_ms"].items():
+            label = "logging (part of capture)" if phase == "logging" else phase
+            table.add_row(label, f"{ms:.3f}ms")
+        console.print(table)
+        per_step = summary["capture_us_per_step"]
+        if per_step is not None:
+            console.print(f"   Capture cost per step: {per_step:.1f}µs")
+        console.print(f"   Bytes written: {summary['bytes_written']:,}")
+
+    p95 = summary.get("overhead_pct", {}).get("p95")
+    if fail_above is not None and p95 is not None and p95 > fail_above:
+        if not json_output:
+            console.print(f"[red]p95 overhead {p95:.3f}% exceeds {fail_above}%[/red]")
+        raise SystemExit(1)
+
+
+@cli.command()
+@click.option("--file", "path", type=click.Path(dir_okay=False, path_type=Path),
+              help="Check this config file instead of AGENT_TRACE_CONFIG")
+@click.option("--tool", "tools", multiple=True, help="Also show how calls to this tool are recorded (repeatable)")
+def config(path: Optional[Path], tools: tuple):
+    """Show the effective runtime tracing configuration (environment plus config file)."""
+    path = path or config_path()
+    try:
+        settings = load_config(path)
+    except ValueError as e:
+        console.print(f"[red]Invalid configuration: {escape(str(e))}[/red]")
+        raise SystemExit(1)
+    click.echo(json.dumps(settings.model_dump(exclude_none=True), indent=2))
+    for tool in tools:
+        decision = settings.decide("tool", tool)
+        click.echo(f"{tool}: sample rate {decision.sample_rate:g}, capture {decision.capture}")
+
+
+@cli.command()
+@click.option("--kind", type=click.Choice(["tool", "agent", "task"]), default="tool", help="Which steps to aggregate")
+@click.option("--name", help="Only traces whose name contains this")
+@click.option("--since", callback=parse_datetime, help="Only steps started after this date (ISO format)")
+@click.option("--until", callback=parse_datetime, help="Only steps started before this date (ISO format)")
+@click.option("--limit", type=int, default=20, help="Maximum number of rows to show")
+@click.option("--rebuild", is_flag=True, help="Rebuild the step columns from the stored traces first")
+@click.option("--json", "json_output", is_flag=True, help="Output as JSON")
+def stats(kind: str, name: Optional[str], since: Optional[datetime], until: Optional[datetime],
+          limit: int, rebuild: bool, json_output: bool):
+    """Latency and error rates per tool, agent or task, from the step columns."""
+    columns = open_step_columns(rebuild=rebuild)
+    mask = columns.select(kind=kind, trace_name=name, since=since, until=until)
+    rows = columns.group_stats(mask)[:limit]
+    if json_output:
+        click.echo(json.dumps(rows, indent=2))
+        return
+    if not rows:
+        console.print(f"[yellow]No {kind} steps found[/yellow]")
+        return
+
+    console.print(f"📊 {int(mask.sum()):,} {kind} steps across {columns.live_traces:,} traces")
+    table = Table()
+    table.add_column(kind.capitalize())
+    for column in ("calls", "p50", "p95", "p99", "errors", "avg output"):
+        table.add_column(column, justify="right")
+    for row in rows:
+        table.add_row(
+            escape(row["name"] or "?"),
+            f"{row['count']:,}",
+            format_duration(row["p50_ms"]),
+            format_duration(row["p95_ms"]),
+            format_duration(row["p99_ms"]),
+            f"{row['error_rate']:.1%}",
+            f"{row['mean_output_bytes']:,.0f}B",
+        )
+    console.print(table)
+
+
+@cli.command()
+@click.option("--host", default="127.0.0.1", help="Address to listen on")
+@click.option("--port", type=int, default=DEFAULT_PORT, help="Port to listen on")
+@click.option("--cache-mb", type=click.IntRange(min=0), default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+              help="Memory for parsed traces kept between requests")
+@click.option("--open", "open_browser", is_flag=True, help="Open the browser UI")
+def serve(host: str, port: int, cache_mb: int, open_browser: bool):
+    """Browse traces in a local web UI, with a JSON API under /api."""
+    browser = TraceBrowser(cache_bytes=cache_mb * 1024 * 1024)
+    with console.status("Indexing traces..."):
+        browser.index.refresh(force=True)
+    server = make_server(host, port, browser)
+    url = f"http://{host}:{server.server_address[1]}/"
+    console.print(f"🔎 Serving {len(browser.index):,} traces at {url} (Ctrl+C to stop)")
+    if open_browser:
+        webbrowser.open(url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+@cli.command()
+@click.argument("count", type=click.IntRange(min=1))
+@click.option("--min-steps", type=click.IntRange(min=0), default=5, help="Minimum steps per trace")
+@click.option("--max-steps", type=click.IntRange(min=0), default=50, help="Maximum steps per trace")
+@click.option("--mix", multiple=True, callback=parse_tags, help="Step type weight TYPE=WEIGHT, e.g. tool=5 (repeatable)")
+@click.option("--tools", type=click.IntRange(min=1), default=20, help="Number of distinct tool names")
+@click.option("--agents", type=click.IntRange(min=1), default=3, help="Number of distinct agent names")
+@click.option("--tasks", type=click.IntRange(min=1), default=5, help="Number of distinct task names")
+@click.option("--names", type=click.IntRange(min=1), default=1, help="Number of distinct trace names")
+@click.option("--name", "name_prefix", default="synthetic", help="Trace name (prefix when --names > 1)")
+@click.option("--skew", type=float, default=1.1, help="Zipf exponent of the name distributions (0 = uniform)")
+@click.option("--latency", type=click.Choice(LATENCY_DISTRIBUTIONS), default="lognormal", help="Step latency distribution")
+@click.option("--latency-median", type=float, default=200.0, help="Median tool latency in ms")
+@click.option("--latency-sigma", type=float, default=1.0, help="Sigma of the lognormal distribution")
+@click.option("--error-rate", type=click.FloatRange(0, 1), default=0.02, help="Probability that a tool/agent/task step fails")
+@click.option("--payload-bytes", type=click.IntRange(min=0), default=256, help="Mean size of inputs/outputs/thoughts")
+@click.option("--span-hours", type=float, default=24.0, help="Spread start times over this many past hours")
+@click.option("--seed", type=int, default=0, help="Random seed (same seed, same traces)")
+@click.option("--tag", multiple=True, callback=parse_tags, help="Metadata KEY=VALUE added to every trace (repeatable)")
+@click.option("--workers", type=click.IntRange(min=1), default=1, help="Generate and write in this many processes")
+@click.option("--bulk/--no-bulk", default=True, help="Save in batches (default) or one save_trace call per trace")
+@click.option("--batch-size", type=click.IntRange(min=1), default=1000, help="Traces per batch in --bulk mode")
+@click.option("--no-search", is_flag=True, help="Don't add the generated traces to the search index")
+def synth(
+    count: int,
+    min_steps: int,
+    max_steps: int,
+    mix: dict,
+    tools: int,
+    agents: int,
+    tasks: int,
+    names: int,
+    name_prefix: str,
+    skew: float,
+    latency: str,
+    latency_median: float,
+    latency_sigma: float,
+    error_rate: float,
+    payload_bytes: int,
+    span_hours: float,
+    seed: int,
+    tag: dict,
+    workers: int,
+    bulk: bool,
+    batch_size: int,
+    no_search: bool,
+):
+    """Generate COUNT synthetic traces into the configured store."""
+    if max_steps < min_steps:
+        raise click.BadParameter("--max-steps must be at least --min-steps")
+    step_mix = None
+    if mix:
+        unknown = set(mix) - set(STEP_TYPES)
+        if unknown:
+            raise click.BadParameter(f"Unknown step types {sorted(unknown)}, expected {STEP_TYPES}")
+        try:
+            step_mix = {step_type: float(weight) for step_type, weight in mix.items()}
+        except ValueError:
+            raise click.BadParameter("Step mix weights must be numbers")
+    config = SynthConfig(
+        count=count,
+        min_steps=min_steps,
+        max_steps=max_steps,
+        tools=tools,
+        agents=agents,
+        tasks=tasks,
+        names=names,
+        name_prefix=name_prefix,
+        skew=skew,
+        latency=latency,
+        latency_median_ms=latency_median,
+        latency_sigma=latency_sigma,
+        error_rate=error_rate,
+        payload_bytes=payload_bytes,
+        span_hours=span_hours,
+        seed=seed,
+        tags=tag,
+        **({"step_mix": step_mix} if step_mix else {}),
+    )
+    if no_search:
+        # Also reaches worker processes, which inherit the environment
+        os.environ["AGENT_TRACE_SEARCH"] = "0"
+
+    started = time.perf_counter()
+    with Progress(console=console, transient=True) as progress:
+        bar = progress.add_task("Generating traces", total=count)
+        written = write_synthetic_traces(
+            config,
+            workers=workers,
+            bulk=bulk,
+            batch_size=batch_size,
+            progress=lambda n: progress.advance(bar, n),
+        )
+    elapsed = time.perf_counter() - started
     console.print(
-        "[yellow]Trace replay not implemented in MVP[/yellow]"
+        f"🧪 Wrote {written:,} synthetic traces in {elapsed:.1f}s "
+        f"({written / elapsed:,.0f} traces/s)"
     )
 
 
 @cli.command()
 @click.option("--limit", type=int, default=10, help="Maximum number of traces to show")
 @click.option("--name", help="Filter traces by name")
-def list(limit: int, name: Optional[str]):
+@click.option("--anomalies", is_flag=True, help="Only traces with unusually slow steps")
+def list(limit: int, name: Optional[str], anomalies: bool):
     """List available traces in a concise format."""
-    traces = list_traces(limit=limit, name_filter=name)
+    # Summaries are read from each trace's header, never its steps
+    traces = list_trace_summaries(
+        limit=limit,
+        name_filter=name,
+        where=(lambda summary: summary.anomaly_count > 0) if anomalies else None,
+    )
     
     if not traces:
         console.print("[yellow]No traces found[/yellow]")
         return
         
     for i, trace in enumerate(traces, 1):
-        status = "❌" if any(step.error for step in trace.steps) else "✅"
+        status = "❌" if trace.error_count else "✅"
         date_str = trace.started_at.strftime("%Y-%m-%d %H:%M")
         duration = format_duration(trace.duration_ms)
+        slow = f"   🐢 {trace.anomaly_count} slow" if trace.anomaly_count else ""
         console.print(
-            f"📋 {i}. {trace.name:<25} {date_str}   {status} {duration}"
+            f"📋 {i}. {trace.name:<25} {date_str}   {status} {duration}{slow}"
         )
 
 
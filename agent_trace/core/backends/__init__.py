@@ -0,0 +1 @@
+"""Pluggable trace storage backends."""
\ No newline at end of file
@@ -0,0 +1,98 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Union, runtime_checkable
+from uuid import UUID
+
+from agent_trace.core.schema import Trace, TraceSummary
+
+TraceId = Union[str, UUID]
+TraceDocument = Dict[str, Any]
+
+
+@runtime_checkable
+class TraceStore(Protocol):
+    """Interface every trace storage backend implements.
+
+    ``query`` returns traces newest-saved first. Filters combine with AND:
+    ``name`` is a substring match, ``since``/``until`` bound ``started_at``.
+    """
+
+    def put(self, trace: Trace) -> Optional[Path]:
+        """Store a trace, returning where it was written if that is a file."""
+        ...
+
+    def put_many(self, traces: Iterable[Trace]) -> int:
+        """Store several traces in one batch/transaction. Returns the count."""
+        ...
+
+    def get(self, trace_id: TraceId) -> Optional[Trace]:
+        """Fetch a trace by ID, or ``None`` if it isn't stored."""
+        ...
+
+    def get_raw(self, trace_id: TraceId) -> Optional[TraceDocument]:
+        """Like ``get``, but returns the parsed JSON document unvalidated."""
+        ...
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Trace]:
+        """Return matching traces, newest first, paginated by limit/offset."""
+        ...
+
+    def query_raw(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[TraceDocument]:
+        """Like ``query``, but returns parsed JSON documents without validating
+        them into ``Trace`` models, for callers that only need part of each."""
+        ...
+
+    def query_summaries(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[TraceSummary]:
+        """Like ``query``, but returns only each trace's summary, without
+        reading its steps."""
+        ...
+
+    def delete(self, trace_id: TraceId) -> bool:
+        """Remove a trace. Returns whether it existed."""
+        ...
+
+
+def matches(
+    name: str,
+    started_at: datetime,
+    name_filter: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> bool:
+    """Shared filter semantics for backends that filter in Python."""
+    if name_filter and name_filter not in name:
+        return False
+    if since and started_at < since:
+        return False
+    if until and started_at > until:
+        return False
+    return True
+
+
+def document_started_at(doc: TraceDocument) -> datetime:
+    """``started_at`` of a raw trace document as a datetime."""
+    started_at = doc["started_at"]
+    if isinstance(started_at, str):
+        return datetime.fromisoformat(started_at)
+    return started_at
@@ -0,0 +1,299 @@
+import functools
+import time
+from concurrent.futures import Executor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+from uuid import UUID
+
+from agent_trace.core.fileio import atomic_writer, sanitize_name
+from agent_trace.core.overhead import record_serialization
+from agent_trace.core.parallel import ordered_map
+from agent_trace.core.schema import Trace, TraceSummary
+from agent_trace.core.serialize import SUMMARY_READ_BYTES, loads, read_summary, write_trace
+from agent_trace.core.segments import (
+    DEFAULT_SEGMENT_MAX_AGE_S,
+    DEFAULT_SEGMENT_MAX_BYTES,
+    SEGMENTS_DIRNAME,
+    SegmentEntry,
+    SegmentLog,
+)
+from .base import TraceDocument, TraceId, document_started_at, matches
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("FS_TRACE_STORE")
+
+LAYOUT_FILES = "files"
+LAYOUT_SEGMENTS = "segments"
+
+
+def read_trace_document(path: Path) -> TraceDocument:
+    """Parse a standalone JSON trace file without validating it."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def read_trace_file(path: Path) -> Trace:
+    """Load a trace from a standalone JSON file."""
+    return Trace.model_validate(read_trace_document(path))
+
+
+def read_source_document(
+    segments_root: Path,
+    source: Union[Path, SegmentEntry],
+    name: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Tuple[Optional[TraceDocument], Optional[str]]:
+    """Read and parse one stored trace, returning ``(doc, error)``.
+
+    ``doc`` is ``None`` if it doesn't match the filters. Module level so it
+    can run in a process pool.
+    """
+    try:
+        if isinstance(source, Path):
+            doc = read_trace_document(source)
+        else:
+            with open(segments_root / source.segment, "rb") as f:
+                f.seek(source.offset)
+                doc = loads(f.read(source.length))
+        if not matches(doc["name"], document_started_at(doc), name, since, until):
+            return None, None
+        return doc, None
+    except (OSError, ValueError, KeyError) as e:
+        return None, f"Skipping unreadable trace {source}: {e}"
+
+
+def _normalize_id(trace_id: TraceId) -> Optional[str]:
+    # IDs end up in glob patterns, so only accept well-formed UUIDs.
+    try:
+        return str(UUID(str(trace_id)))
+    except ValueError:
+        return None
+
+
+class FileSystemTraceStore:
+    """Traces stored under a directory, as JSON files and/or segment logs.
+
+    ``layout`` only decides how new traces are written; reads always cover
+    both one-file-per-trace JSON files and the segment log.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        layout: str = LAYOUT_FILES,
+        segment_max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES,
+        segment_max_age_s: float = DEFAULT_SEGMENT_MAX_AGE_S,
+    ):
+        if layout not in (LAYOUT_FILES, LAYOUT_SEGMENTS):
+            raise ValueError(f"Unknown filesystem layout '{layout}'")
+        self.root = Path(root)
+        self.layout = layout
+        self.segments = SegmentLog(
+            self.root / SEGMENTS_DIRNAME,
+            max_bytes=segment_max_bytes,
+            max_age_s=segment_max_age_s,
+        )
+
+    def _write_file(self, trace: Trace) -> Path:
+        # Create filename with timestamp and trace name using local time. The
+        # trace ID keeps names unique across processes writing in the same
+        # microsecond; the name is sanitized since it may contain path separators.
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        filename = f"{timestamp}_{sanitize_name(trace.name)}_{trace.trace_id}.json"
+
+        filepath = self.root / filename
+        start = time.perf_counter()
+        # Steps are streamed straight to the file; serialization and the
+        # write itself are accounted together.
+        with atomic_writer(filepath) as f:
+            nbytes = write_trace(trace, f)
+        record_serialization(start, nbytes)
+        return filepath
+
+    def put(self, trace: Trace) -> Optional[Path]:
+        if self.layout == LAYOUT_SEGMENTS:
+            entry = self.segments.append(trace)
+            return self.segments.root / entry.segment
+        return self._write_file(trace)
+
+    def put_many(self, traces: Iterable[Trace]) -> int:
+        traces = list(traces)
+        if self.layout == LAYOUT_SEGMENTS:
+            self.segments.append_many(traces)
+        else:
+            for trace in traces:
+                self._write_file(trace)
+        return len(traces)
+
+    def find_file(self, trace_id: TraceId) -> Optional[Path]:
+        """Locate the standalone JSON file of a trace, if it has one."""
+        for candidate in self.root.glob(f"*_{trace_id}.json"):
+            return candidate
+        return None
+
+    def get(self, trace_id: TraceId) -> Optional[Trace]:
+        trace_id = _normalize_id(trace_id)
+        if trace_id is None:
+            return None
+        entry = self.segments.find(trace_id)
+        if entry is not None:
+            return self.segments.read(entry)
+        path = self.find_file(trace_id)
+        return read_trace_file(path) if path else None
+
+    def get_raw(self, trace_id: TraceId) -> Optional[TraceDocument]:
+        trace_id = _normalize_id(trace_id)
+        if trace_id is None:
+            return None
+        entry = self.segments.find(trace_id)
+        if entry is not None:
+            return loads(self.segments.read_bytes(entry))
+        path = self.find_file(trace_id)
+        return read_trace_document(path) if path else None
+
+    def _candidates(self, name: Optional[str], since, until) -> list:
+        """(saved_at, source) pairs for every stored trace, newest first."""
+        candidates = []
+        for p in self.root.glob("*.json"):
+            try:
+                candidates.append((p.stat().st_mtime, p))
+            except FileNotFoundError:
+                # Moved into a segment by a concurrent compaction.
+                continue
+        # Segment entries carry name/started_at, so filter before loading.
+        candidates.extend(
+            (entry.saved_at, entry) for entry in self.segments.entries()
+            if matches(entry.name, entry.started_at, name, since, until)
+        )
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return candidates
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Trace]:
+        return [
+            Trace.model_validate(doc)
+            for doc in self.query_raw(name, since, until, limit, offset)
+        ]
+
+    def _scan(self, read, name, since, until, limit, offset) -> list:
+        # Sources are loaded lazily so that ``limit`` stops us before reading
+        # anything we won't return. ``read`` returns (item, name, started_at).
+        items = []
+        skipped = 0
+        # Segment entries were already filtered by _candidates, and without
+        # filters so were files: those can be skipped without reading them
+        unfiltered = name is None and since is None and until is None
+        for _, source in self._candidates(name, since, until):
+            if limit and len(items) >= limit:
+                break
+            if skipped < offset and (unfiltered or isinstance(source, SegmentEntry)):
+                skipped += 1
+                continue
+
+            try:
+                item, item_name, started_at = read(source)
+                matched = matches(item_name, started_at, name, since, until)
+            except (OSError, ValueError, KeyError) as e:
+                # Another process may have compacted or removed it since we
+                # listed; skip rather than failing the whole listing.
+                logger.warning(f"Skipping unreadable trace {source}: {e}")
+                continue
+            if not matched:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+
+            items.append(item)
+
+        return items
+
+    def _read_document(self, source) -> Tuple[TraceDocument, str, datetime]:
+        if isinstance(source, Path):
+            doc = read_trace_document(source)
+        else:
+            doc = loads(self.segments.read_bytes(source))
+        return doc, doc["name"], document_started_at(doc)
+
+    def _read_summary(self, source) -> Tuple[TraceSummary, str, datetime]:
+        if isinstance(source, Path):
+            with open(source, "rb") as f:
+                summary = read_summary(f.read(SUMMARY_READ_BYTES))
+            size = source.stat().st_size
+        else:
+            summary = read_summary(self.segments.read_bytes(source, SUMMARY_READ_BYTES))
+            size = source.length
+        if summary is None:
+            summary = TraceSummary.from_document(self._read_document(source)[0])
+        summary.bytes = size
+        return summary, summary.name, summary.started_at
+
+    def query_raw(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[TraceDocument]:
+        return self._scan(self._read_document, name, since, until, limit, offset)
+
+    def iter_raw(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        where: Optional[Callable[[TraceDocument], bool]] = None,
+        executor: Optional[Executor] = None,
+        window: int = 1,
+    ) -> Iterator[TraceDocument]:
+        """Stream matching documents, newest first, reading ``window`` ahead.
+
+        Reads and parsing run on ``executor`` (threads or processes) but are
+        yielded in order; stop iterating to stop reading.
+        """
+        read = functools.partial(
+            read_source_document, self.segments.root, name=name, since=since, until=until
+        )
+        sources = (source for _, source in self._candidates(name, since, until))
+        for doc, error in ordered_map(read, sources, executor, window):
+            if error:
+                # Another process may have compacted or removed it since we
+                # listed; skip rather than failing the whole listing.
+                logger.warning(error)
+            elif doc is not None and (where is None or where(doc)):
+                yield doc
+
+    def query_summaries(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[TraceSummary]:
+        return self._scan(self._read_summary, name, since, until, limit, offset)
+
+    def delete(self, trace_id: TraceId) -> bool:
+        trace_id = _normalize_id(trace_id)
+        if trace_id is None:
+            return False
+        deleted = self.segments.delete(trace_id)
+        path = self.find_file(trace_id)
+        if path is not None:
+            path.unlink(missing_ok=True)
+            deleted = True
+        return deleted
+
+    def compact(self, include_files: bool = True) -> dict:
+        """Compact segment files, optionally migrating loose JSON trace files."""
+        loose_files = sorted(self.root.glob("*.json")) if include_files else []
+        return self.segments.compact(loose_files)
@@ -0,0 +1,77 @@
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from agent_trace.core.schema import Trace, TraceSummary
+from .base import TraceDocument, TraceId, matches
+
+
+class InMemoryTraceStore:
+    """Process-local trace store, mainly for tests and short-lived tools."""
+
+    def __init__(self):
+        self._traces: Dict[str, Trace] = {}
+        self._lock = threading.Lock()
+
+    def put(self, trace: Trace) -> Optional[Path]:
+        self.put_many([trace])
+        return None
+
+    def put_many(self, traces: Iterable[Trace]) -> int:
+        # Copy so later mutation of the live trace doesn't change what's stored,
+        # matching the behaviour of the persistent backends.
+        copies = [trace.model_copy(deep=True) for trace in traces]
+        with self._lock:
+            for trace in copies:
+                key = str(trace.trace_id)
+                self._traces.pop(key, None)
+                self._traces[key] = trace
+        return len(copies)
+
+    def get(self, trace_id: TraceId) -> Optional[Trace]:
+        return self._traces.get(str(trace_id))
+
+    def get_raw(self, trace_id: TraceId) -> Optional[TraceDocument]:
+        trace = self.get(trace_id)
+        return trace.model_dump() if trace else None
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Trace]:
+        with self._lock:
+            traces = list(reversed(self._traces.values()))
+        matched = [
+            t for t in traces if matches(t.name, t.started_at, name, since, until)
+        ]
+        end = offset + limit if limit else None
+        return matched[offset:end]
+
+    def query_raw(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[TraceDocument]:
+        return [t.model_dump() for t in self.query(name, since, until, limit, offset)]
+
+    def query_summaries(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[TraceSummary]:
+        return [TraceSummary.from_trace(t) for t in self.query(name, since, until, limit, offset)]
+
+    def delete(self, trace_id: TraceId) -> bool:
+        with self._lock:
+            return self._traces.pop(str(trace_id), None) is not None
@@ -0,0 +1,213 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from agent_trace.core.fileio import file_lock
+from agent_trace.core.overhead import record_serialization
+from agent_trace.core.schema import Trace, TraceSummary
+from agent_trace.core.serialize import iter_trace_json, loads
+from .base import TraceDocument, TraceId
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("SQLITE_TRACE_STORE")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS traces (
+    trace_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    saved_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    summary TEXT,
+    bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS traces_saved_at ON traces (saved_at);
+CREATE INDEX IF NOT EXISTS traces_started_at ON traces (started_at);
+"""
+
+# Columns added after the first release, with their types
+ADDED_COLUMNS = {"summary": "TEXT", "bytes": "INTEGER"}
+# How long a connection waits for another writer's lock
+BUSY_TIMEOUT_MS = 30_000
+
+
+class SQLiteTraceStore:
+    """Traces stored as JSON documents in a single SQLite database.
+
+    The database runs in WAL mode so readers don't block the writer, and
+    ``put_many`` inserts a whole batch in one transaction.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections aren't shareable.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            # Before anything that takes a lock, so it waits rather than failing
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._setup(conn)
+            self._local.conn = conn
+        return conn
+
+    def _setup(self, conn: sqlite3.Connection) -> None:
+        """Switch the database to WAL and create or migrate the schema, once
+        per store. Processes opening a new database at the same time would
+        race on the journal mode switch, which doesn't wait for the busy
+        timeout, so setup runs under a lock file next to the database."""
+        with self._setup_lock:
+            if self._ready:
+                return
+            with file_lock(self.path.with_name(f".{self.path.name}.lock")):
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                self._migrate(conn)
+            self._ready = True
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(traces)")}
+        with conn:
+            for column, kind in ADDED_COLUMNS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE traces ADD COLUMN {column} {kind}")
+
+    def put(self, trace: Trace) -> Optional[Path]:
+        self.put_many([trace])
+        return self.path
+
+    def put_many(self, traces: Iterable[Trace]) -> int:
+        saved_at = time.time()
+        start = time.perf_counter()
+        rows = []
+        for trace in traces:
+            data = b"".join(iter_trace_json(trace))
+            rows.append((
+                str(trace.trace_id),
+                trace.name,
+                trace.started_at.timestamp(),
+                trace.ended_at.timestamp() if trace.ended_at else None,
+                saved_at,
+                data.decode(),
+                TraceSummary.from_trace(trace).model_dump_json(exclude_none=True),
+                len(data),
+            ))
+        record_serialization(start, sum(row[-1] for row in rows))
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO traces "
+                "(trace_id, name, started_at, ended_at, saved_at, data, summary, bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        logger.debug(f"Stored {len(rows)} traces in {self.path}")
+        return len(rows)
+
+    def get(self, trace_id: TraceId) -> Optional[Trace]:
+        row = self._connect().execute(
+            "SELECT data FROM traces WHERE trace_id = ?", (str(trace_id),)
+        ).fetchone()
+        return Trace.model_validate_json(row[0]) if row else None
+
+    def get_raw(self, trace_id: TraceId) -> Optional[TraceDocument]:
+        row = self._connect().execute(
+            "SELECT data FROM traces WHERE trace_id = ?", (str(trace_id),)
+        ).fetchone()
+        return loads(row[0]) if row else None
+
+    def _select(
+        self,
+        name: Optional[str],
+        since: Optional[datetime],
+        until: Optional[datetime],
+        limit: Optional[int],
+        offset: int,
+        columns: str = "data",
+    ) -> list:
+        clauses, params = [], []
+        if name:
+            clauses.append("instr(name, ?) > 0")
+            params.append(name)
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(since.timestamp())
+        if until:
+            clauses.append("started_at <= ?")
+            params.append(until.timestamp())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            f"SELECT {columns} FROM traces {where} "
+            "ORDER BY saved_at DESC, rowid DESC LIMIT ? OFFSET ?"
+        )
+        params.extend([limit if limit else -1, offset])
+        rows = self._connect().execute(sql, params)
+        return [row[0] for row in rows] if columns == "data" else rows.fetchall()
+
+    def query(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Trace]:
+        return [
+            Trace.model_validate_json(data)
+            for data in self._select(name, since, until, limit, offset)
+        ]
+
+    def query_raw(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[TraceDocument]:
+        return [
+            loads(data) for data in self._select(name, since, until, limit, offset)
+        ]
+
+    def query_summaries(
+        self,
+        name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[TraceSummary]:
+        # Rows written before summaries existed fall back to the document
+        rows = self._select(
+            name, since, until, limit, offset,
+            columns="summary, bytes, CASE WHEN summary IS NULL THEN data END",
+        )
+        summaries = []
+        for summary, size, data in rows:
+            if summary is not None:
+                item = TraceSummary.model_validate_json(summary)
+                item.bytes = size
+            else:
+                item = TraceSummary.from_document(loads(data))
+                item.bytes = len(data.encode())
+            summaries.append(item)
+        return summaries
+
+    def delete(self, trace_id: TraceId) -> bool:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM traces WHERE trace_id = ?", (str(trace_id),)
+            )
+        return cursor.rowcount > 0
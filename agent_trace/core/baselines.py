@@ -0,0 +1,174 @@
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .fileio import atomic_write, file_lock
+from .metrics import LogHistogram
+from .schema import ANOMALY_KEY, Trace
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("BASELINES")
+
+# A directory of its own: trace files are found by globbing ``*.json``
+BASELINES_DIRNAME = "baselines"
+BASELINES_FILENAME = "baselines.json"
+LOCK_FILENAME = ".lock"
+BASELINES_VERSION = 1
+
+# Latencies per generation; a baseline covers the last one to two windows
+WINDOW = 1000
+# Below this many samples a baseline flags nothing
+MIN_SAMPLES = 30
+QUANTILE = 0.99
+
+Key = Tuple[str, str]  # (kind, name)
+
+
+def step_key(step) -> Optional[Key]:
+    """(kind, name) a step's latency is tracked under, if any."""
+    if step.step_type == "tool":
+        return ("tool", step.tool_name)
+    if step.step_type == "task" and step.task_name:
+        return ("task", step.task_name)
+    if step.step_type == "agent" and step.agent_name:
+        return ("agent", step.agent_name)
+    return None
+
+
+class Baseline:
+    """Rolling latency distribution of one tool, agent or task.
+
+    Two log-bucketed histograms (see ``metrics.LogHistogram``) take turns:
+    new latencies go to ``current`` and once it holds ``window`` of them it
+    replaces ``previous``, so the baseline follows the most recent one to
+    two windows of calls.
+    """
+    __slots__ = ("current", "previous", "window")
+
+    def __init__(self, window: int = WINDOW):
+        self.current = LogHistogram()
+        self.previous = LogHistogram()
+        self.window = window
+
+    def add(self, value_ms: float) -> None:
+        self.current.add(value_ms)
+        if self.current.count >= self.window:
+            self.previous, self.current = self.current, LogHistogram()
+
+    @property
+    def count(self) -> int:
+        return self.current.count + self.previous.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        return LogHistogram().merge(self.previous).merge(self.current).quantile(q)
+
+    def to_dict(self) -> Dict:
+        return {"current": self.current.to_dict(), "previous": self.previous.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict, window: int = WINDOW) -> "Baseline":
+        baseline = cls(window)
+        baseline.current = LogHistogram.from_dict(data["current"])
+        baseline.previous = LogHistogram.from_dict(data["previous"])
+        return baseline
+
+
+class BaselineStore:
+    """Per-(kind, name) baselines persisted as one JSON file under ``root``,
+    updated under a lock file so concurrent savers don't lose each other's
+    latencies."""
+
+    def __init__(self, root: Path, window: int = WINDOW, min_samples: int = MIN_SAMPLES):
+        self.root = Path(root)
+        self.path = self.root / BASELINES_FILENAME
+        self.window = window
+        self.min_samples = min_samples
+
+    def load(self) -> Dict[Key, Baseline]:
+        try:
+            data = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable baselines {self.path}: {e}")
+            return {}
+        if data.get("version") != BASELINES_VERSION:
+            return {}
+        baselines = {}
+        for key, value in data["baselines"].items():
+            kind, name = key.split(":", 1)
+            baselines[(kind, name)] = Baseline.from_dict(value, self.window)
+        return baselines
+
+    def _write(self, baselines: Dict[Key, Baseline]) -> None:
+        data = {
+            "version": BASELINES_VERSION,
+            "baselines": {f"{kind}:{name}": b.to_dict() for (kind, name), b in baselines.items()},
+        }
+        atomic_write(self.path, json.dumps(data).encode())
+
+    def flag(self, traces: Iterable[Trace], baselines: Dict[Key, Baseline]) -> Tuple[int, Dict[Key, List[float]]]:
+        """Flag steps slower than their baseline's p99 in ``baselines``, then
+        add their latencies to it. Returns the number of steps flagged and
+        the latencies added, by key.
+
+        Each step is judged against the baseline as it was before this batch,
+        so a burst of slow calls can't hide itself.
+        """
+        flagged = 0
+        added: Dict[Key, List[float]] = {}
+        thresholds: Dict[Key, Optional[float]] = {}
+        for trace in traces:
+            for step in trace.steps:
+                key = step_key(step)
+                if key is None or step.duration_ms is None:
+                    continue
+                if key not in thresholds:
+                    baseline = baselines.get(key)
+                    thresholds[key] = (
+                        baseline.quantile(QUANTILE)
+                        if baseline is not None and baseline.count >= self.min_samples
+                        else None
+                    )
+                threshold = thresholds[key]
+                if threshold and step.duration_ms > threshold:
+                    step.metadata[ANOMALY_KEY] = {
+                        "p99_ms": round(threshold, 3),
+                        "ratio": round(step.duration_ms / threshold, 2),
+                    }
+                    flagged += 1
+                added.setdefault(key, []).append(step.duration_ms)
+        self.add_latencies(baselines, added)
+        if flagged:
+            logger.info(f"Flagged {flagged} slow steps")
+        return flagged, added
+
+    def add_latencies(self, baselines: Dict[Key, Baseline], latencies: Dict[Key, List[float]]) -> None:
+        """Add latencies by key to ``baselines``, in order."""
+        for key, values in latencies.items():
+            baseline = baselines.get(key)
+            if baseline is None:
+                baseline = baselines[key] = Baseline(self.window)
+            for value in values:
+                baseline.add(value)
+
+    def merge(self, latencies: Dict[Key, List[float]]) -> Dict[Key, Baseline]:
+        """Add latencies recorded elsewhere (see ``flag``) to the stored
+        baselines. Returns the baselines as written, including what other
+        processes added."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.root / LOCK_FILENAME):
+            baselines = self.load()
+            self.add_latencies(baselines, latencies)
+            self._write(baselines)
+        return baselines
+
+    def update(self, traces: Iterable[Trace]) -> int:
+        """Flag slow steps against the stored baselines and store their
+        latencies in one go. Returns the number of steps flagged."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.root / LOCK_FILENAME):
+            baselines = self.load()
+            flagged, _ = self.flag(traces, baselines)
+            self._write(baselines)
+        return flagged
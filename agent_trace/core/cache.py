@@ -0,0 +1,333 @@
+import dataclasses
+import datetime
+import enum
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from pathlib import Path, PurePath
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from .store import get_traces_dir
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("TOOL_CACHE")
+
+CACHE_DB_FILENAME = "cache.db"
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+TIER_MEMORY = "memory"
+TIER_DISK = "disk"
+
+# How a persisted value is stored in the ``encoding`` column
+ENCODING_JSON = "json"
+ENCODING_PICKLE = "pickle"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    tool_name TEXT NOT NULL,
+    value BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    duration_ms REAL,
+    encoding TEXT NOT NULL DEFAULT 'json'
+);
+CREATE INDEX IF NOT EXISTS cache_tool_name ON cache (tool_name);
+"""
+
+
+class CachePolicy(BaseModel):
+    """How results of one tool are cached."""
+    # Seconds a result stays valid (None = until evicted)
+    ttl_s: Optional[float] = None
+    # Also keep results in the on-disk SQLite tier, shared across runs.
+    # Only values that survive a JSON round trip unchanged are persisted
+    persist: bool = False
+    # Persist (and load) any picklable value instead. Loading a pickle runs
+    # code chosen by whoever wrote it, so only enable this when nobody
+    # untrusted can write to cache.db
+    pickle: bool = False
+    # Bump to invalidate results cached by an older version of the tool
+    version: str = ""
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    expires_at: Optional[float]
+    size: int
+    duration_ms: Optional[float]
+
+
+class CacheHit(NamedTuple):
+    value: Any
+    tier: str
+    duration_ms: Optional[float]
+
+
+_policies: Dict[str, CachePolicy] = {}
+
+
+def set_cache_policy(tool_name: str, policy: Optional[CachePolicy]) -> None:
+    """Cache ``tool_name`` with ``policy`` (``None`` removes it).
+
+    Applies to tools decorated with ``trace(cache=True)`` and overrides the
+    policy given to the decorator, so caching can be tuned per tool without
+    touching the tool's code.
+    """
+    if policy is None:
+        _policies.pop(tool_name, None)
+    else:
+        _policies[tool_name] = policy
+
+
+def resolve_policy(tool_name: str, cache: Union[bool, CachePolicy, None]) -> Optional[CachePolicy]:
+    """The policy for a decorated tool, or ``None`` if it isn't cached."""
+    if not cache:
+        return None
+    if tool_name in _policies:
+        return _policies[tool_name]
+    return cache if isinstance(cache, CachePolicy) else CachePolicy()
+
+
+class Uncacheable(TypeError):
+    """Inputs contain a value that can't be identified exactly."""
+
+
+def _type_tag(value: Any) -> str:
+    return f"{type(value).__module__}.{type(value).__qualname__}"
+
+
+def _key_material(value: Any) -> Any:
+    # Unlike capture snapshots this must never be lossy: two calls may only
+    # share a key if their inputs are equal, so unknown types are refused.
+    # Only strings, ints, bools and None are stored as themselves; anything
+    # else is tagged with its type, so 1.0 and "1.0" or a list and a tuple of
+    # the same items get different keys.
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        return {"f": repr(value)}
+    if isinstance(value, dict):
+        return {"dict": sorted(([_key_material(k), _key_material(v)] for k, v in value.items()), key=repr)}
+    if isinstance(value, list):
+        return {"list": [_key_material(v) for v in value]}
+    if isinstance(value, tuple):
+        return {"tuple": [_key_material(v) for v in value]}
+    if isinstance(value, (set, frozenset)):
+        return {type(value).__name__: sorted((_key_material(v) for v in value), key=repr)}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"bytes": hashlib.sha256(bytes(value)).hexdigest()}
+    if isinstance(value, (datetime.date, datetime.time, UUID, Decimal, PurePath)):
+        return {type(value).__name__: str(value)}
+    if isinstance(value, datetime.timedelta):
+        return {"timedelta": value.total_seconds()}
+    if isinstance(value, enum.Enum):
+        return {_type_tag(value): _key_material(value.value)}
+    if isinstance(value, BaseModel):
+        return {_type_tag(value): _key_material(value.model_dump(mode="json"))}
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {_type_tag(value): _key_material(
+            {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+        )}
+    if type(value).__module__ == "numpy" and type(value).__name__ == "ndarray":
+        return {"ndarray": [str(value.dtype), list(value.shape), hashlib.sha256(value.tobytes()).hexdigest()]}
+    raise Uncacheable(f"can't build a cache key from {type(value).__name__}")
+
+
+def cache_key(tool_name: str, inputs: Dict[str, Any], policy: CachePolicy) -> str:
+    """Stable hash of a tool call: name, policy version and inputs.
+
+    Raises ``Uncacheable`` if an input can't be identified exactly.
+    """
+    material = json.dumps([tool_name, policy.version, _key_material(inputs)])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _json_encoded(value: Any) -> Optional[Tuple[bytes, str]]:
+    """``value`` as JSON, if loading it back gives an equal value (tuples,
+    for one, come back as lists and are refused)."""
+    try:
+        data = json.dumps(value, allow_nan=False)
+    except (TypeError, ValueError):
+        return None
+    if json.loads(data) != value:
+        return None
+    return data.encode(), ENCODING_JSON
+
+
+class ToolCache:
+    """Two-tier cache of tool results.
+
+    The memory tier is an LRU bounded by the pickled size of its values; the
+    optional disk tier is a SQLite database used by tools whose policy sets
+    ``persist``. Disk hits are promoted to memory. Like ``functools.lru_cache``,
+    memory hits return the cached object itself, so callers shouldn't mutate it.
+
+    The disk tier holds JSON. Pickled values are only written and read for
+    policies that opt in with ``pickle=True``: anyone who can write to the
+    database could otherwise run code in every process reading it.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.path = Path(path) if path else None
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+            if "encoding" not in columns:
+                # Every row of a database from before the column is a pickle
+                with conn:
+                    conn.execute(
+                        f"ALTER TABLE cache ADD COLUMN encoding TEXT NOT NULL DEFAULT '{ENCODING_PICKLE}'"
+                    )
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def get(self, key: str, policy: CachePolicy) -> Optional[CacheHit]:
+        """Look up a result, trying memory first, then disk if persisted."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at is not None and entry.expires_at <= now:
+                    del self._entries[key]
+                    self._bytes -= entry.size
+                else:
+                    self._entries.move_to_end(key)
+                    return CacheHit(entry.value, TIER_MEMORY, entry.duration_ms)
+
+        if not (policy.persist and self.path):
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at, duration_ms, encoding FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                return None
+            if row[3] == ENCODING_JSON:
+                value = json.loads(row[0])
+            elif row[3] == ENCODING_PICKLE and policy.pickle:
+                value = pickle.loads(row[0])
+            else:
+                logger.warning(f"Ignoring cached result {key[:12]} stored as {row[3]}")
+                return None
+        except (sqlite3.Error, ValueError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            logger.error(f"Failed to read cached result {key[:12]}: {e}")
+            return None
+        self._remember(key, CacheEntry(value, row[1], len(row[0]), row[2]))
+        return CacheHit(value, TIER_DISK, row[2])
+
+    def put(
+        self,
+        key: str,
+        tool_name: str,
+        value: Any,
+        policy: CachePolicy,
+        duration_ms: Optional[float] = None,
+    ) -> bool:
+        """Store a result. Returns False if it can't be pickled."""
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"Not caching unpicklable result of {tool_name}: {e}")
+            return False
+        now = time.time()
+        expires_at = now + policy.ttl_s if policy.ttl_s is not None else None
+        self._remember(key, CacheEntry(value, expires_at, len(blob), duration_ms))
+        if policy.persist and self.path:
+            encoded = (blob, ENCODING_PICKLE) if policy.pickle else _json_encoded(value)
+            if encoded is None:
+                logger.debug(f"Not persisting result of {tool_name}: it doesn't round-trip through JSON")
+                return True
+            try:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (key, tool_name, encoded[0], now, expires_at, duration_ms, encoded[1]),
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Failed to persist cached result of {tool_name}: {e}")
+        return True
+
+    def clear(self, tool_name: Optional[str] = None) -> int:
+        """Drop cached results (of one tool, if given). Returns disk rows removed.
+
+        The memory tier doesn't record tool names, so it is always cleared.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if not (self.path and self.path.exists()):
+            return 0
+        conn = self._connect()
+        with conn:
+            if tool_name:
+                cursor = conn.execute("DELETE FROM cache WHERE tool_name = ?", (tool_name,))
+            else:
+                cursor = conn.execute("DELETE FROM cache")
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts and sizes of both tiers, with disk entries per tool."""
+        with self._lock:
+            stats = {"memory_entries": len(self._entries), "memory_bytes": self._bytes}
+        stats.update(disk_entries=0, disk_bytes=0, tools={})
+        if self.path and self.path.exists():
+            rows = self._connect().execute(
+                "SELECT tool_name, COUNT(*), SUM(LENGTH(value)), SUM(duration_ms) "
+                "FROM cache GROUP BY tool_name ORDER BY tool_name"
+            ).fetchall()
+            for tool_name, count, size, duration in rows:
+                stats["disk_entries"] += count
+                stats["disk_bytes"] += size or 0
+                stats["tools"][tool_name] = {
+                    "entries": count, "bytes": size or 0, "recorded_ms": duration or 0.0
+                }
+        return stats
+
+
+_caches: Dict[tuple, ToolCache] = {}
+
+
+def get_tool_cache() -> ToolCache:
+    """The process-wide tool cache for the configured traces directory."""
+    # Keyed on the settings themselves so the per-call lookup stays cheap
+    settings = (os.getenv("AGENT_TRACE_CACHE_PATH"), os.getenv("AGENT_TRACE_DIR"))
+    if settings not in _caches:
+        path = Path(settings[0]) if settings[0] else get_traces_dir() / CACHE_DB_FILENAME
+        max_bytes = int(os.getenv("AGENT_TRACE_CACHE_MAX_BYTES", DEFAULT_CACHE_MAX_BYTES))
+        _caches[settings] = ToolCache(path, max_bytes=max_bytes)
+    return _caches[settings]
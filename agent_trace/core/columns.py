@@ -0,0 +1,347 @@
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from uuid import UUID, uuid4
+
+import numpy as np
+
+from .fileio import atomic_write, file_lock
+from .schema import Trace
+from .serialize import dumps
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("STEP_COLUMNS")
+
+COLUMNS_DIRNAME = "columns"
+META_FILENAME = "meta.json"
+LOCK_FILENAME = ".lock"
+# Column files live in a directory named by meta.json
+DEFAULT_DATA_DIRNAME = "data"
+COLUMNS_VERSION = 2
+
+# Step types as stored in the ``type`` column
+STEP_TYPE_CODES = {"tool": 0, "reasoning": 1, "task": 2, "agent": 3}
+
+# One row per step
+STEP_COLUMNS = {
+    "trace": np.int32,         # row in the trace columns
+    "step": np.int32,          # index within the trace
+    "type": np.int8,           # STEP_TYPE_CODES
+    "name": np.int32,          # tool/agent/task name, coded in ``names`` (-1 = none)
+    "started_at": np.float64,  # epoch seconds
+    "offset_ms": np.float64,   # since the trace started
+    "duration_ms": np.float64, # NaN if not recorded
+    "error": np.bool_,
+    "input_bytes": np.int64,   # JSON size of inputs
+    "output_bytes": np.int64,  # JSON size of the output or result
+}
+
+# One row per trace
+TRACE_COLUMNS = {
+    "trace_id": np.dtype("V16"),
+    "trace_name": np.int32,    # coded in ``names``
+    "trace_started_at": np.float64,
+    "deleted": np.bool_,
+}
+
+
+def _payload_bytes(value: Any) -> int:
+    return 0 if value is None else len(dumps(value))
+
+
+class StepColumns:
+    """Read-only, memory-mapped view of the step columns.
+
+    ``columns[name]`` returns a NumPy array of one column (see
+    ``STEP_COLUMNS`` and ``TRACE_COLUMNS``). Names are dictionary-encoded;
+    use ``code``/``names`` to convert. Rows of deleted traces are still
+    present; ``select`` excludes them.
+    """
+
+    def __init__(self, root: Path, meta: Dict[str, Any]):
+        self.root = root
+        self.rows: int = meta["rows"]
+        self.traces: int = meta["traces"]
+        self.names: List[str] = meta["names"]
+        self._codes = {name: i for i, name in enumerate(self.names)}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def _map(self, column: str, dtype, length: int) -> np.ndarray:
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        # Only the committed prefix is mapped; a writer may be appending
+        return np.memmap(self.root / f"{column}.bin", dtype=dtype, mode="r", shape=(length,))
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        array = self._arrays.get(column)
+        if array is None:
+            if column in STEP_COLUMNS:
+                array = self._map(column, STEP_COLUMNS[column], self.rows)
+            elif column in TRACE_COLUMNS:
+                array = self._map(column, TRACE_COLUMNS[column], self.traces)
+            else:
+                raise KeyError(f"Unknown column '{column}'")
+            self._arrays[column] = array
+        return array
+
+    @property
+    def live_traces(self) -> int:
+        """Traces in the cache that haven't been deleted."""
+        return int(self.traces - self["deleted"].sum())
+
+    def code(self, name: str) -> int:
+        """Dictionary code of a name, or -1 if it never occurs."""
+        return self._codes.get(name, -1)
+
+    def trace_id(self, trace: int) -> UUID:
+        return UUID(bytes=self["trace_id"][trace].tobytes())
+
+    def select(
+        self,
+        kind: Optional[str] = None,
+        name: Optional[str] = None,
+        trace_name: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> np.ndarray:
+        """Boolean mask over steps of live traces matching every filter.
+
+        ``trace_name`` is a substring match on the trace name, as in
+        ``list_traces``; ``since``/``until`` bound the step's start.
+        """
+        mask = ~self["deleted"][self["trace"]]
+        if kind is not None:
+            mask &= self["type"] == STEP_TYPE_CODES[kind]
+        if name is not None:
+            mask &= self["name"] == self.code(name)
+        if trace_name:
+            matching = np.array([trace_name in n for n in self.names] or [False])
+            mask &= matching[self["trace_name"]][self["trace"]]
+        if since is not None:
+            mask &= self["started_at"] >= since.timestamp()
+        if until is not None:
+            mask &= self["started_at"] <= until.timestamp()
+        return mask
+
+    def group_stats(self, mask: np.ndarray, by: str = "name") -> List[Dict[str, Any]]:
+        """Count, latency percentiles, error rate and payload size per group.
+
+        Groups are the values of a coded column (``name`` or ``trace_name``),
+        largest first.
+        """
+        rows = np.flatnonzero(mask)
+        if by == "trace_name":
+            keys = self["trace_name"][self["trace"][rows]]
+        else:
+            keys = self[by][rows]
+        order = np.argsort(keys, kind="stable")
+        rows, keys = rows[order], keys[order]
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        duration = self["duration_ms"]
+        stats = []
+        for group_rows, key in zip(np.split(rows, bounds), keys[np.r_[0, bounds]] if len(keys) else []):
+            durations = duration[group_rows]
+            timed = durations[~np.isnan(durations)]
+            percentiles = np.percentile(timed, [50, 95, 99]).tolist() if len(timed) else [None] * 3
+            stats.append({
+                "name": self.names[key] if key >= 0 else None,
+                "count": len(group_rows),
+                "p50_ms": percentiles[0],
+                "p95_ms": percentiles[1],
+                "p99_ms": percentiles[2],
+                "error_rate": float(self["error"][group_rows].mean()),
+                "mean_output_bytes": float(self["output_bytes"][group_rows].mean()),
+            })
+        stats.sort(key=lambda s: s["count"], reverse=True)
+        return stats
+
+
+class ColumnStore:
+    """Appends steps of saved traces to columnar files under ``root``.
+
+    Every column is a flat binary file of fixed-width values in a data
+    directory under ``root``; ``meta.json`` names that directory and holds
+    the committed row counts and the name dictionary, and is replaced
+    atomically after each append, so readers never see a partial batch.
+    ``rebuild`` writes a new data directory and switches ``meta.json`` to it.
+    Writers serialize on a lock file across processes.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    @property
+    def meta_path(self) -> Path:
+        return self.root / META_FILENAME
+
+    def exists(self) -> bool:
+        return self._load_meta() is not None
+
+    def _load_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except FileNotFoundError:
+            return None
+        return meta if meta.get("version") == COLUMNS_VERSION else None
+
+    def _read_meta(self) -> Dict[str, Any]:
+        return self._load_meta() or self._empty_meta(DEFAULT_DATA_DIRNAME)
+
+    @staticmethod
+    def _empty_meta(data: str) -> Dict[str, Any]:
+        return {"version": COLUMNS_VERSION, "data": data, "rows": 0, "traces": 0, "names": []}
+
+    def open(self) -> StepColumns:
+        """A consistent view of everything committed so far."""
+        meta = self._read_meta()
+        return StepColumns(self.root / meta["data"], meta)
+
+    def _append_rows(self, data_dir: Path, columns: Dict[str, Any], committed: int, dtypes: Dict[str, Any]) -> None:
+        for column, dtype in dtypes.items():
+            path = data_dir / f"{column}.bin"
+            with open(path, "ab") as f:
+                # Drop anything a failed writer left past the committed rows
+                f.truncate(committed * np.dtype(dtype).itemsize)
+                f.write(np.asarray(columns[column], dtype=dtype).tobytes())
+
+    def _mark_deleted(self, data_dir: Path, meta: Dict[str, Any], keys: np.ndarray) -> int:
+        """Mark committed traces with any of ``keys`` (``V16`` trace IDs)
+        deleted. Returns how many were."""
+        if not meta["traces"] or not len(keys):
+            return 0
+        ids = np.memmap(data_dir / "trace_id.bin", dtype="V16", mode="r", shape=(meta["traces"],))
+        # Narrow down on the first 8 bytes of each ID, then compare them whole
+        candidates = np.flatnonzero(np.isin(ids.view("<u8")[::2], keys.view("<u8")[::2]))
+        wanted = {key.tobytes() for key in keys}
+        rows = [row for row in candidates if ids[row].tobytes() in wanted]
+        del ids
+        if not len(rows):
+            return 0
+        deleted = np.memmap(data_dir / "deleted.bin", dtype=np.bool_, mode="r+", shape=(meta["traces"],))
+        deleted[rows] = True
+        deleted.flush()
+        return len(rows)
+
+    def _append(self, meta: Dict[str, Any], traces: Sequence[Trace]) -> int:
+        """Write the steps of ``traces`` after the committed rows of ``meta``
+        and update it; the caller holds the lock and commits ``meta``.
+
+        A trace saved again replaces its earlier rows, which are marked
+        deleted. Returns the number of steps added.
+        """
+        data_dir = self.root / meta["data"]
+        data_dir.mkdir(parents=True, exist_ok=True)
+        names: List[str] = meta["names"]
+        codes = {name: i for i, name in enumerate(names)}
+
+        def code(name: Optional[str]) -> int:
+            if name is None:
+                return -1
+            if name not in codes:
+                codes[name] = len(names)
+                names.append(name)
+            return codes[name]
+
+        steps = {column: [] for column in STEP_COLUMNS}
+        trace_rows = {column: [] for column in TRACE_COLUMNS}
+        # Row in this batch of each trace ID, so only the last copy stays live
+        batch_rows: Dict[bytes, int] = {}
+        for i, trace in enumerate(traces):
+            trace_row = meta["traces"] + i
+            trace_start = trace.started_at.timestamp()
+            earlier = batch_rows.get(trace.trace_id.bytes)
+            if earlier is not None:
+                trace_rows["deleted"][earlier] = True
+            batch_rows[trace.trace_id.bytes] = i
+            trace_rows["trace_id"].append(np.frombuffer(trace.trace_id.bytes, dtype="V16")[0])
+            trace_rows["trace_name"].append(code(trace.name))
+            trace_rows["trace_started_at"].append(trace_start)
+            trace_rows["deleted"].append(False)
+            for index, step in enumerate(trace.steps):
+                started_at = step.started_at.timestamp()
+                if step.step_type == "tool":
+                    name, output = step.tool_name, step.output
+                    inputs = _payload_bytes(step.inputs)
+                else:
+                    name = step.task_name if step.step_type == "task" else step.agent_name
+                    output = getattr(step, "result", None)
+                    inputs = 0
+                steps["trace"].append(trace_row)
+                steps["step"].append(index)
+                steps["type"].append(STEP_TYPE_CODES.get(step.step_type, -1))
+                steps["name"].append(code(name))
+                steps["started_at"].append(started_at)
+                steps["offset_ms"].append((started_at - trace_start) * 1000)
+                steps["duration_ms"].append(np.nan if step.duration_ms is None else step.duration_ms)
+                steps["error"].append(bool(getattr(step, "error", None)))
+                steps["input_bytes"].append(inputs)
+                steps["output_bytes"].append(_payload_bytes(output))
+
+        keys = np.frombuffer(b"".join(batch_rows), dtype="V16")
+        self._mark_deleted(data_dir, meta, keys)
+        self._append_rows(data_dir, steps, meta["rows"], STEP_COLUMNS)
+        self._append_rows(data_dir, trace_rows, meta["traces"], TRACE_COLUMNS)
+        added = len(steps["trace"])
+        meta.update(rows=meta["rows"] + added, traces=meta["traces"] + len(traces), names=names)
+        return added
+
+    def append(self, traces: Sequence[Trace]) -> int:
+        """Add the steps of ``traces``. Returns the number of steps added."""
+        if not traces:
+            return 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.root / LOCK_FILENAME):
+            meta = self._read_meta()
+            added = self._append(meta, traces)
+            atomic_write(self.meta_path, json.dumps(meta).encode())
+        logger.debug(f"Appended {added} steps of {len(traces)} traces to {self.root}")
+        return added
+
+    def delete(self, trace_id: str) -> bool:
+        """Mark a trace's steps deleted. Returns whether it was in the cache."""
+        try:
+            key = np.frombuffer(UUID(str(trace_id)).bytes, dtype="V16")
+        except ValueError:
+            return False
+        if not self.exists():
+            return False
+        with file_lock(self.root / LOCK_FILENAME):
+            meta = self._read_meta()
+            return self._mark_deleted(self.root / meta["data"], meta, key) > 0
+
+    def rebuild(self, traces: Iterable[Trace], batch_size: int = 500) -> int:
+        """Replace the cache with the steps of ``traces``. Returns steps added.
+
+        The new cache is written to a data directory of its own and swapped
+        in at the end, so readers keep the old one until then. Appends wait
+        for the rebuild instead of racing it, and a trace both appended and
+        rebuilt is only counted once.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.root / LOCK_FILENAME):
+            meta = self._empty_meta(f"data-{uuid4().hex[:12]}")
+            added = 0
+            batch: List[Trace] = []
+            for trace in traces:
+                batch.append(trace)
+                if len(batch) >= batch_size:
+                    added += self._append(meta, batch)
+                    batch = []
+            added += self._append(meta, batch) if batch else 0
+            (self.root / meta["data"]).mkdir(exist_ok=True)
+            atomic_write(self.meta_path, json.dumps(meta).encode())
+            # Earlier data directories (and files of older layouts). Readers
+            # that mapped their files keep them until they close
+            for stale in self.root.iterdir():
+                if stale.name in (meta["data"], META_FILENAME, LOCK_FILENAME):
+                    continue
+                if stale.is_dir():
+                    shutil.rmtree(stale, ignore_errors=True)
+                else:
+                    stale.unlink(missing_ok=True)
+        return added
@@ -0,0 +1,257 @@
+"""Runtime tracing configuration: kill switch, sampling and capture levels.
+
+Settings come from environment variables, overridden by an optional JSON
+file (``AGENT_TRACE_CONFIG``) that a daemon thread re-reads whenever its
+modification time changes, so tracing can be turned up or down in a
+running process. The hot path only reads the current ``TracingConfig``
+snapshot, and per-name decisions are memoized on it::
+
+    {
+      "enabled": true,
+      "sample_rate": 1.0,
+      "capture": "full",
+      "tools": {"web_search": {"sample_rate": 0.01}, "cache_*": {"capture": "timing"}},
+      "agents": {"planner": {"capture": "metadata"}}
+    }
+"""
+import fnmatch
+import json
+import os
+import random
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Literal, NamedTuple, Optional, Tuple
+
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("CONFIG")
+
+# Name, timing and error only
+CAPTURE_TIMING = "timing"
+# Also the type and length of each input and output, but not their contents
+CAPTURE_METADATA = "metadata"
+# Bounded snapshots of inputs and outputs (see ``serialize``)
+CAPTURE_FULL = "full"
+CAPTURE_LEVELS = (CAPTURE_TIMING, CAPTURE_METADATA, CAPTURE_FULL)
+CaptureLevel = Literal["timing", "metadata", "full"]
+
+DEFAULT_CHECK_INTERVAL_S = 2.0
+
+
+class Rule(BaseModel):
+    """Overrides for the tools, agents or tasks whose name matches a pattern."""
+    sample_rate: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+    capture: Optional[CaptureLevel] = None
+
+
+class Decision(NamedTuple):
+    """How calls to one tool, agent or task are recorded."""
+    sample_rate: float
+    capture: str
+
+    def sampled(self) -> bool:
+        """Whether to record this call."""
+        return self.sample_rate >= 1.0 or (self.sample_rate > 0.0 and random.random() < self.sample_rate)
+
+
+class TracingConfig(BaseModel):
+    """One immutable snapshot of the runtime configuration.
+
+    Rules are keyed by exact name or ``fnmatch`` pattern; an exact name
+    wins, then the first matching pattern.
+    """
+    enabled: bool = True
+    sample_rate: float = Field(default=1.0, ge=0.0, le=1.0)
+    capture: CaptureLevel = CAPTURE_FULL
+    tools: Dict[str, Rule] = {}
+    agents: Dict[str, Rule] = {}
+    tasks: Dict[str, Rule] = {}
+
+    _decisions: Dict[Tuple[str, str], Decision] = PrivateAttr(default_factory=dict)
+
+    def decide(self, kind: str, name: str) -> Decision:
+        """Sampling rate and capture level for calls to ``name``."""
+        key = (kind, name)
+        decision = self._decisions.get(key)
+        if decision is None:
+            rule = self._match(kind, name)
+            decision = Decision(
+                self.sample_rate if rule is None or rule.sample_rate is None else rule.sample_rate,
+                self.capture if rule is None or rule.capture is None else rule.capture,
+            )
+            self._decisions[key] = decision
+        return decision
+
+    def _match(self, kind: str, name: str) -> Optional[Rule]:
+        rules = {"tool": self.tools, "agent": self.agents, "task": self.tasks}.get(kind) or {}
+        if name in rules:
+            return rules[name]
+        for pattern, rule in rules.items():
+            if fnmatch.fnmatchcase(name, pattern):
+                return rule
+        return None
+
+
+def _env_settings() -> Dict:
+    settings = {}
+    if "AGENT_TRACE_ENABLED" in os.environ:
+        settings["enabled"] = os.environ["AGENT_TRACE_ENABLED"] != "0"
+    if "AGENT_TRACE_SAMPLE_RATE" in os.environ:
+        settings["sample_rate"] = float(os.environ["AGENT_TRACE_SAMPLE_RATE"])
+    if "AGENT_TRACE_CAPTURE" in os.environ:
+        settings["capture"] = os.environ["AGENT_TRACE_CAPTURE"]
+    return settings
+
+
+def load_config(path: Optional[Path] = None) -> TracingConfig:
+    """Build a config from the environment, overridden by the file at
+    ``path`` when there is one. Raises ``ValueError`` if either is invalid."""
+    settings = _env_settings()
+    if path is not None and path.exists():
+        try:
+            data = json.loads(path.read_text())
+        except OSError as e:
+            raise ValueError(f"Can't read {path}: {e}") from e
+        if not isinstance(data, dict):
+            raise ValueError(f"{path} must hold a JSON object")
+        settings.update(data)
+    try:
+        return TracingConfig(**settings)
+    except ValidationError as e:
+        raise ValueError(str(e)) from e
+
+
+Listener = Callable[[TracingConfig, TracingConfig], None]
+
+_config: Optional[TracingConfig] = None
+_config_lock = threading.Lock()
+_listeners: List[Listener] = []
+_watcher: Optional["ConfigWatcher"] = None
+
+
+def config_path() -> Optional[Path]:
+    path = os.environ.get("AGENT_TRACE_CONFIG")
+    return Path(path) if path else None
+
+
+class ConfigWatcher:
+    """Daemon thread that reloads the config file when it changes.
+
+    Checking is one ``stat`` per interval, off the hot path.
+    """
+
+    def __init__(self, path: Path, interval_s: float = DEFAULT_CHECK_INTERVAL_S):
+        self.path = path
+        self.interval_s = interval_s
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="agent-trace-config", daemon=True)
+
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def start(self) -> "ConfigWatcher":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def check(self) -> bool:
+        """Reload if the file changed since the last check. Returns whether it did."""
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        reload_config()
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.check()
+
+
+def check_interval() -> float:
+    """Seconds between checks of the config file, from
+    ``AGENT_TRACE_CONFIG_INTERVAL``; a malformed value is logged and the
+    default used rather than failing the traced call that loads the config."""
+    value = os.environ.get("AGENT_TRACE_CONFIG_INTERVAL")
+    if value is None:
+        return DEFAULT_CHECK_INTERVAL_S
+    try:
+        interval = float(value)
+    except ValueError:
+        interval = 0.0
+    if not interval > 0:
+        logger.error(f"Invalid AGENT_TRACE_CONFIG_INTERVAL {value!r}, checking every {DEFAULT_CHECK_INTERVAL_S}s")
+        return DEFAULT_CHECK_INTERVAL_S
+    return interval
+
+
+def get_config() -> TracingConfig:
+    """The current configuration, loaded on first use.
+
+    When ``AGENT_TRACE_CONFIG`` names a file, a watcher thread is started
+    to pick up its changes every ``AGENT_TRACE_CONFIG_INTERVAL`` seconds.
+    """
+    global _watcher
+    config = _config
+    if config is None:
+        with _config_lock:
+            if _config is None:
+                path = config_path()
+                try:
+                    _set(load_config(path))
+                except ValueError as e:
+                    logger.error(f"Invalid tracing configuration, using defaults: {e}")
+                    _set(TracingConfig())
+                if path is not None:
+                    _watcher = ConfigWatcher(path, check_interval()).start()
+            config = _config
+    return config
+
+
+def _set(config: TracingConfig) -> None:
+    global _config
+    previous, _config = _config, config
+    if previous is not None:
+        for listener in [*_listeners]:
+            try:
+                listener(previous, config)
+            except Exception as e:
+                logger.error(f"Config listener failed: {e}")
+
+
+def set_config(config: TracingConfig) -> None:
+    """Replace the configuration, e.g. from code or a control endpoint."""
+    get_config()
+    with _config_lock:
+        _set(config)
+    logger.info(f"Tracing configuration updated: enabled={config.enabled}")
+
+
+def reload_config() -> bool:
+    """Re-read the environment and config file. An invalid file is logged
+    and the current configuration kept. Returns whether it was applied."""
+    try:
+        config = load_config(config_path())
+    except ValueError as e:
+        logger.error(f"Ignoring invalid tracing configuration: {e}")
+        return False
+    set_config(config)
+    return True
+
+
+def subscribe(listener: Listener) -> None:
+    """Call ``listener(previous, current)`` whenever the configuration changes."""
+    _listeners.append(listener)
+
+
+def enabled() -> bool:
+    """The global kill switch."""
+    return get_config().enabled
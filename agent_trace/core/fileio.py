@@ -0,0 +1,91 @@
+import os
+import re
+import stat
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+MAX_NAME_LENGTH = 64
+
+
+def _read_umask() -> int:
+    # The only portable way to read the umask is to set it; done once at
+    # import, before any writer threads exist
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+
+_UMASK = _read_umask()
+
+
+def sanitize_name(name: str) -> str:
+    """Turn an arbitrary trace name into a safe, bounded filename component."""
+    safe = _UNSAFE_CHARS.sub("_", name).strip("._")[:MAX_NAME_LENGTH]
+    return safe or "trace"
+
+
+@contextmanager
+def atomic_writer(path: Path):
+    """Open a binary file that replaces ``path`` only once the block completes.
+
+    The payload goes to a temporary file in the same directory which is then
+    renamed over the destination, so readers never observe a partial file.
+    Temporary files are dot-prefixed and end in ``.tmp`` so directory globs
+    for ``*.json`` never pick them up. The result keeps the mode of the file
+    it replaces, or gets the umask default a plain ``open`` would give it
+    (``mkstemp`` alone would leave it readable by its owner only).
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            yield f
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write(path: Path, data: bytes) -> None:
+    """Write ``data`` to ``path`` so readers never observe a partial file."""
+    with atomic_writer(path) as f:
+        f.write(data)
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Hold an exclusive advisory lock on ``path`` for the duration of the block.
+
+    Works across processes and across threads of the same process, since each
+    call opens its own file description.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:  # pragma: no cover - Windows
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:  # pragma: no cover - Windows
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,151 @@
+from collections.abc import Sequence
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+from pydantic import TypeAdapter
+
+from .backends.base import TraceDocument
+from .schema import SCHEMA_VERSION, AgentStep, ReasoningStep, Step, TaskStep, ToolStep, Trace
+
+STEP_MODELS = {
+    "tool": ToolStep,
+    "reasoning": ReasoningStep,
+    "task": TaskStep,
+    "agent": AgentStep,
+}
+
+# Keys stored alongside a trace that aren't part of the model
+DOCUMENT_KEYS = ("summary", "schema_version")
+
+_step_adapter = TypeAdapter(Step)
+_object_setattr = object.__setattr__
+
+
+def is_trusted(doc: TraceDocument) -> bool:
+    """Whether a document was written by this version of ``save_trace``."""
+    return doc.get("schema_version") == SCHEMA_VERSION
+
+
+def _datetime(value: Any) -> Any:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _fast_construct(cls, values: Dict[str, Any]):
+    # What model_construct does, minus resolving defaults and aliases, which
+    # dominates its cost. Only valid when ``values`` has every field.
+    model = cls.__new__(cls)
+    _object_setattr(model, "__dict__", values)
+    _object_setattr(model, "__pydantic_fields_set__", set(values))
+    _object_setattr(model, "__pydantic_extra__", None)
+    _object_setattr(model, "__pydantic_private__", None)
+    return model
+
+
+def construct_step(data: Dict[str, Any]) -> Step:
+    """Build a step from a trusted document without validating it.
+
+    Only conversions JSON can't represent (datetimes) are done, in place, so
+    ``data`` becomes the step's ``__dict__``. Unknown step types go through
+    normal validation.
+    """
+    cls = STEP_MODELS.get(data.get("step_type"))
+    if cls is None:
+        return _step_adapter.validate_python(data)
+    if "started_at" in data:
+        data["started_at"] = _datetime(data["started_at"])
+    if len(data) == len(cls.model_fields):
+        return _fast_construct(cls, data)
+    return cls.model_construct(**data)
+
+
+def validate_step(data: Dict[str, Any]) -> Step:
+    return _step_adapter.validate_python(data)
+
+
+def _header(doc: TraceDocument) -> Dict[str, Any]:
+    return {k: v for k, v in doc.items() if k != "steps" and k not in DOCUMENT_KEYS}
+
+
+def _construct(header: Dict[str, Any], steps: List[Step]) -> Trace:
+    values = dict(header)
+    values.update(
+        trace_id=UUID(str(values["trace_id"])),
+        started_at=_datetime(values["started_at"]),
+        ended_at=_datetime(values.get("ended_at")),
+        steps=steps,
+    )
+    return Trace.model_construct(**values)
+
+
+def trace_from_document(doc: TraceDocument, strict: bool = False) -> Trace:
+    """Turn a parsed trace document into a ``Trace``.
+
+    Documents written by ``save_trace`` (checked by ``schema_version``) are
+    constructed without validation, reusing the document's step dicts;
+    anything else, or everything when ``strict``, is fully validated.
+    """
+    if strict or not is_trusted(doc):
+        return Trace.model_validate(doc)
+    return _construct(_header(doc), [construct_step(step) for step in doc.get("steps", [])])
+
+
+class LazySteps(Sequence):
+    """Steps of a trace document, turned into models only when accessed."""
+
+    def __init__(self, raw: List[Dict[str, Any]], build: Callable[[Dict[str, Any]], Step]):
+        self._raw = raw
+        self._build = build
+        self._steps: List[Optional[Step]] = [None] * len(raw)
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def _get(self, index: int) -> Step:
+        step = self._steps[index]
+        if step is None:
+            step = self._steps[index] = self._build(self._raw[index])
+        return step
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self._raw)))]
+        if index < 0:
+            index += len(self._raw)
+        if not 0 <= index < len(self._raw):
+            raise IndexError("step index out of range")
+        return self._get(index)
+
+    @property
+    def built(self) -> int:
+        """How many steps have been turned into models so far."""
+        return sum(1 for step in self._steps if step is not None)
+
+
+class LazyTrace:
+    """A stored trace whose steps are built on demand.
+
+    The document is parsed up front (that part is fast); what is deferred is
+    building a model per step, which dominates loading large traces. Header
+    fields (``name``, ``started_at``, ``metadata``...) are available as on
+    ``Trace``; ``materialize()`` returns the full ``Trace``.
+    """
+
+    def __init__(self, doc: TraceDocument, strict: bool = False):
+        strict = strict or not is_trusted(doc)
+        if strict:
+            self._header = Trace.model_validate({**_header(doc), "steps": []})
+        else:
+            self._header = _construct(_header(doc), [])
+        self.steps = LazySteps(doc.get("steps", []), validate_step if strict else construct_step)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for attributes not set in __init__
+        return getattr(self._header, name)
+
+    def __repr__(self) -> str:
+        return f"LazyTrace(name={self._header.name!r}, steps={len(self.steps)})"
+
+    def materialize(self) -> Trace:
+        """The full ``Trace``, building any steps not accessed yet."""
+        return self._header.model_copy(update={"steps": self.steps[:]})
@@ -0,0 +1,343 @@
+import atexit
+import itertools
+import math
+import os
+import threading
+import weakref
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from .fileio import atomic_write
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("METRICS")
+
+# Histogram buckets grow by 2**(1/SUB_BUCKETS) from MIN_MS: bucket 0 holds
+# everything up to MIN_MS, bucket i (1..BUCKETS-1) values up to
+# MIN_MS * 2**(i / SUB_BUCKETS). Quantiles report a bucket's upper bound, so
+# they are never below the true value and at most ~19% (2**(1/4)) above it.
+MIN_MS = 0.01
+SUB_BUCKETS = 4
+OCTAVES = 32  # up to ~12 hours; slower calls land in the last bucket
+BUCKETS = OCTAVES * SUB_BUCKETS + 1
+MAX_MS = MIN_MS * 2 ** OCTAVES
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+
+_LOG2_MIN = math.log2(MIN_MS)
+
+Key = Tuple[str, str]  # (kind, name)
+
+
+def bucket_index(value_ms: float) -> int:
+    """Histogram bucket of a latency in milliseconds."""
+    if not value_ms > MIN_MS:  # also catches NaN
+        return 0
+    if value_ms >= MAX_MS:
+        return BUCKETS - 1
+    return min(BUCKETS - 1, math.ceil((math.log2(value_ms) - _LOG2_MIN) * SUB_BUCKETS))
+
+
+def bucket_upper_ms(index: int) -> float:
+    """Largest latency counted in bucket ``index``."""
+    return MIN_MS * 2 ** (index / SUB_BUCKETS)
+
+
+class LogHistogram:
+    """Counts of latencies in log-spaced buckets, plus their sum and maximum.
+
+    Histograms with the same layout merge by adding counts, so per-thread
+    or per-process histograms can be combined without losing accuracy.
+    """
+    __slots__ = ("counts", "count", "errors", "sum_ms", "max_ms")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * BUCKETS
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, value_ms: float, error: bool = False) -> None:
+        self.counts[bucket_index(value_ms)] += 1
+        self.count += 1
+        if error:
+            self.errors += 1
+        self.sum_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        counts = self.counts
+        for i, n in enumerate(other.counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.errors += other.errors
+        self.sum_ms += other.sum_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the ``q`` quantile, capped at the
+        largest value seen. ``None`` when empty."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_upper_ms(i), self.max_ms)
+        return self.max_ms
+
+    @property
+    def mean_ms(self) -> Optional[float]:
+        return self.sum_ms / self.count if self.count else None
+
+    def to_dict(self) -> Dict[str, Union[int, float, Dict[str, int]]]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "sum_ms": self.sum_ms,
+            "max_ms": self.max_ms,
+            # Sparse: most buckets of any one histogram are empty
+            "buckets": {str(i): n for i, n in enumerate(self.counts) if n},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LogHistogram":
+        histogram = cls()
+        histogram.count = data["count"]
+        histogram.errors = data.get("errors", 0)
+        histogram.sum_ms = data["sum_ms"]
+        histogram.max_ms = data["max_ms"]
+        for i, n in data["buckets"].items():
+            histogram.counts[int(i)] = n
+        return histogram
+
+
+class _ThreadShards:
+    """One thread's histograms; dropped with the thread's locals when it exits."""
+    __slots__ = ("token", "generation", "histograms", "__weakref__")
+
+    def __init__(self, token: int, generation: int):
+        self.token = token
+        self.generation = generation
+        self.histograms: Dict[Key, LogHistogram] = {}
+
+
+class MetricsRegistry:
+    """Call counts, error counts and latency histograms per (kind, name).
+
+    Each thread records into its own histograms, registered once per key, so
+    the hot path takes no lock; ``snapshot`` merges them on read. When a
+    thread exits its histograms are folded into a shared one per key, so
+    thread pools that churn don't grow the registry.
+    """
+
+    def __init__(self):
+        # Reentrant: a thread's histograms may be folded by a garbage
+        # collection that happens while this thread holds the lock
+        self._lock = threading.RLock()
+        self._threads: Dict[int, Dict[Key, LogHistogram]] = {}
+        self._retired: Dict[Key, LogHistogram] = {}
+        self._tokens = itertools.count()
+        self._generation = 0
+        self._local = threading.local()
+
+    def _thread_shards(self) -> _ThreadShards:
+        with self._lock:
+            shards = _ThreadShards(next(self._tokens), self._generation)
+            self._threads[shards.token] = shards.histograms
+        weakref.finalize(shards, self._retire, shards.token, shards.generation)
+        self._local.shards = shards
+        return shards
+
+    def _retire(self, token: int, generation: int) -> None:
+        with self._lock:
+            histograms = self._threads.pop(token, None)
+            if not histograms or generation != self._generation:
+                return
+            for key, histogram in histograms.items():
+                # Replaced, not merged into: a snapshot in progress may hold both
+                total = LogHistogram().merge(histogram)
+                if key in self._retired:
+                    total.merge(self._retired[key])
+                self._retired[key] = total
+
+    def _shard(self, key: Key) -> LogHistogram:
+        shards = getattr(self._local, "shards", None)
+        if shards is None or shards.generation != self._generation:
+            shards = self._thread_shards()
+        shard = shards.histograms.get(key)
+        if shard is None:
+            shard = LogHistogram()
+            with self._lock:
+                shards.histograms[key] = shard
+        return shard
+
+    def observe(self, kind: str, name: str, duration_ms: Optional[float], error: bool = False) -> None:
+        """Record one call of a tool, agent or task."""
+        self._shard((kind, name)).add(duration_ms or 0.0, error)
+
+    def snapshot(self) -> Dict[Key, LogHistogram]:
+        """Merged histograms of all threads, by (kind, name)."""
+        with self._lock:
+            shards: Dict[Key, List[LogHistogram]] = {key: [h] for key, h in self._retired.items()}
+            for histograms in self._threads.values():
+                for key, histogram in histograms.items():
+                    shards.setdefault(key, []).append(histogram)
+        merged = {}
+        for key, histograms in sorted(shards.items()):
+            total = LogHistogram()
+            for histogram in histograms:
+                total.merge(histogram)
+            merged[key] = total
+        return merged
+
+    def reset(self) -> None:
+        """Drop everything recorded so far."""
+        with self._lock:
+            self._threads = {}
+            self._retired = {}
+            self._generation += 1
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        return render_prometheus(self.snapshot())
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _seconds(value_ms: float) -> str:
+    return repr(value_ms / 1000)
+
+
+def render_prometheus(histograms: Dict[Key, LogHistogram]) -> str:
+    """Prometheus text for merged histograms.
+
+    Exposed histogram buckets are the powers of two of the internal layout
+    (every ``SUB_BUCKETS``-th boundary), so every series has the same ``le``
+    values from scrape to scrape.
+    """
+    calls = [
+        "# HELP agent_trace_calls_total Traced tool, agent and task calls.",
+        "# TYPE agent_trace_calls_total counter",
+    ]
+    errors = [
+        "# HELP agent_trace_errors_total Traced calls that raised.",
+        "# TYPE agent_trace_errors_total counter",
+    ]
+    durations = [
+        "# HELP agent_trace_duration_seconds Latency of traced calls.",
+        "# TYPE agent_trace_duration_seconds histogram",
+    ]
+    for (kind, name), histogram in histograms.items():
+        labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+        calls.append(f"agent_trace_calls_total{{{labels}}} {histogram.count}")
+        errors.append(f"agent_trace_errors_total{{{labels}}} {histogram.errors}")
+        cumulative = 0
+        for i, n in enumerate(histogram.counts[:-1]):
+            cumulative += n
+            if i % SUB_BUCKETS == 0:
+                durations.append(
+                    f'agent_trace_duration_seconds_bucket{{{labels},le="{_seconds(bucket_upper_ms(i))}"}} {cumulative}'
+                )
+        durations.append(f'agent_trace_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+        durations.append(f"agent_trace_duration_seconds_sum{{{labels}}} {_seconds(histogram.sum_ms)}")
+        durations.append(f"agent_trace_duration_seconds_count{{{labels}}} {histogram.count}")
+    return "\n".join(calls + errors + durations) + "\n"
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+_enabled = os.environ.get("AGENT_TRACE_METRICS", "1") != "0"
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(value: bool) -> None:
+    """Turn recording on or off for this process (``AGENT_TRACE_METRICS``)."""
+    global _enabled
+    _enabled = value
+
+
+def get_registry() -> MetricsRegistry:
+    """The process-wide registry.
+
+    Created on first use; at that point a metrics endpoint is started if
+    ``AGENT_TRACE_METRICS_PORT`` is set, and a dump on exit is registered if
+    ``AGENT_TRACE_METRICS_FILE`` is.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = MetricsRegistry()
+                port = os.environ.get("AGENT_TRACE_METRICS_PORT")
+                if port:
+                    try:
+                        serve_metrics(int(port), os.environ.get("AGENT_TRACE_METRICS_HOST", "127.0.0.1"), registry)
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Could not start metrics endpoint on port {port}: {e}")
+                path = os.environ.get("AGENT_TRACE_METRICS_FILE")
+                if path:
+                    atexit.register(dump_metrics, path, registry)
+                _registry = registry
+    return _registry
+
+
+def observe(kind: str, name: str, duration_ms: Optional[float], error: bool = False) -> None:
+    """Record a call in the process-wide registry, unless metrics are off."""
+    if _enabled:
+        get_registry().observe(kind, name, duration_ms, error)
+
+
+def dump_metrics(path: Union[str, Path], registry: Optional[MetricsRegistry] = None) -> Path:
+    """Write the current metrics as Prometheus text, e.g. for node_exporter's
+    textfile collector."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, (registry or get_registry()).render_prometheus().encode())
+    logger.debug(f"Wrote metrics to {path}")
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in (METRICS_PATH, "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def serve_metrics(
+    port: int = 9464,
+    host: str = "127.0.0.1",
+    registry: Optional[MetricsRegistry] = None,
+) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` on a daemon thread. Port 0 picks a free port
+    (see ``server.server_address``); stop with ``server.shutdown()``."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry or get_registry()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="agent-trace-metrics", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}{METRICS_PATH}")
+    return server
@@ -0,0 +1,187 @@
+import functools
+import json
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from agent_trace.logging.logger import logging_seconds
+from .fileio import file_lock
+
+OVERHEAD_KEY = "tracer_overhead"
+LEDGER_FILENAME = "overhead.jsonl"
+LEDGER_LOCK_FILENAME = ".overhead.lock"
+
+_local = threading.local()
+
+
+class OverheadAccount:
+    """Time the tracer spends capturing steps for one run."""
+    __slots__ = ("capture_s", "logging_s")
+
+    def __init__(self):
+        self.capture_s = 0.0
+        self.logging_s = 0.0
+
+    def summary(self, steps: int, run_ms: Optional[float]) -> Dict[str, Any]:
+        """Per-run totals as stored in ``Trace.metadata["tracer_overhead"]``."""
+        capture_ms = self.capture_s * 1000
+        return {
+            "capture_ms": round(capture_ms, 3),
+            "logging_ms": round(self.logging_s * 1000, 3),
+            "steps_captured": steps,
+            "run_ms": round(run_ms, 3) if run_ms is not None else None,
+            "capture_pct": round(capture_ms / run_ms * 100, 4) if run_ms else None,
+        }
+
+
+# The account of the active run; set and restored by ``start_run`` alongside
+# the current trace, in the same context.
+_account: ContextVar[Optional[OverheadAccount]] = ContextVar("agent_trace_overhead_account", default=None)
+
+
+def get_account() -> Optional[OverheadAccount]:
+    """The account of the active run, if any."""
+    return _account.get()
+
+
+def set_account(account: Optional[OverheadAccount]) -> None:
+    _account.set(account)
+
+
+def start_account() -> Optional[OverheadAccount]:
+    """Start accounting a new run. Returns the previous account to restore."""
+    previous = _account.get()
+    _account.set(OverheadAccount())
+    return previous
+
+
+def finish_account(previous: Optional[OverheadAccount]) -> OverheadAccount:
+    """Stop accounting the current run and restore ``previous``."""
+    account = _account.get()
+    _account.set(previous)
+    return account or OverheadAccount()
+
+
+def begin() -> Optional[float]:
+    """Start timing a section of tracer code.
+
+    Sections nest (an adapter calling ``log_tool_step``), and only the
+    outermost one is counted. Returns a token to pass to ``end``.
+    """
+    if _account.get() is None:
+        return None
+    depth = getattr(_local, "depth", 0)
+    _local.depth = depth + 1
+    if depth:
+        return 0.0
+    _local.logging_start = logging_seconds()
+    return time.perf_counter()
+
+
+def end(start: Optional[float]) -> None:
+    """Finish a section started with ``begin``, charging it to the active run."""
+    if start is None:
+        return
+    _local.depth -= 1
+    account = _account.get()
+    if start and account is not None:
+        account.capture_s += time.perf_counter() - start
+        account.logging_s += logging_seconds() - _local.logging_start
+
+
+class capture:
+    """``with capture():`` times a block of tracer code, see ``begin``."""
+    __slots__ = ("start",)
+
+    def __enter__(self):
+        self.start = begin()
+        return self
+
+    def __exit__(self, *exc):
+        end(self.start)
+        return False
+
+
+def accounted(func: Callable) -> Callable:
+    """Decorator charging the wrapped tracer function's time to the active run."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = begin()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            end(start)
+    return wrapper
+
+
+def record_serialization(start: float, nbytes: int) -> None:
+    """Called by store backends after serializing traces (``start`` from perf_counter)."""
+    _local.serialize_s = getattr(_local, "serialize_s", 0.0) + time.perf_counter() - start
+    _local.bytes = getattr(_local, "bytes", 0) + nbytes
+
+
+def take_serialization() -> Tuple[float, int]:
+    """Seconds and bytes serialized on this thread since the last call."""
+    totals = getattr(_local, "serialize_s", 0.0), getattr(_local, "bytes", 0)
+    _local.serialize_s, _local.bytes = 0.0, 0
+    return totals
+
+
+def append_ledger(directory: Path, entries: List[Dict[str, Any]]) -> None:
+    """Append runs' overhead records to the ledger in ``directory``."""
+    lines = "".join(json.dumps(entry, default=str) + "\n" for entry in entries)
+    with file_lock(directory / LEDGER_LOCK_FILENAME):
+        with open(directory / LEDGER_FILENAME, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def read_ledger(directory: Path) -> Iterator[Dict[str, Any]]:
+    """Yield ledger records, oldest first, skipping partial or corrupt lines."""
+    path = directory / LEDGER_FILENAME
+    if not path.exists():
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def total_overhead_ms(entry: Dict[str, Any]) -> float:
+    """Everything the tracer spent on one run: capture plus saving."""
+    return sum(entry.get(k) or 0.0 for k in ("capture_ms", "serialize_ms", "write_ms", "index_ms"))
+
+
+def summarize_overhead(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate ledger records into overhead percentiles and per-phase means."""
+    if not entries:
+        return {"runs": 0}
+    timed = [e for e in entries if e.get("run_ms")]
+    pct = np.array([total_overhead_ms(e) / e["run_ms"] * 100 for e in timed])
+    steps = sum(e.get("steps_captured") or 0 for e in entries)
+    capture = sum(e.get("capture_ms") or 0.0 for e in entries)
+
+    def mean(key: str) -> float:
+        return float(np.mean([e.get(key) or 0.0 for e in entries]))
+
+    overhead_pct = {}
+    if len(pct):
+        overhead_pct = {f"p{q}": float(np.percentile(pct, q)) for q in (50, 95, 99)}
+        overhead_pct["max"] = float(pct.max())
+
+    return {
+        "runs": len(entries),
+        "overhead_pct": overhead_pct,
+        "mean_ms": {
+            phase: mean(f"{phase}_ms")
+            for phase in ("run", "capture", "logging", "serialize", "write", "index")
+        },
+        "capture_us_per_step": capture * 1000 / steps if steps else None,
+        "steps_captured": steps,
+        "bytes_written": sum(e.get("bytes") or 0 for e in entries),
+    }
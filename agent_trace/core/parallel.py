@@ -0,0 +1,56 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Calls kept in flight per worker, enough to hide I/O latency without
+# reading far past an early ``limit``
+WINDOW_PER_WORKER = 4
+
+
+def default_workers() -> int:
+    """Workers used for bulk loading (``AGENT_TRACE_LOAD_WORKERS``)."""
+    return int(os.getenv("AGENT_TRACE_LOAD_WORKERS", min(8, os.cpu_count() or 1)))
+
+
+def make_executor(workers: int, processes: bool = False) -> Executor:
+    """A thread pool, or with ``processes`` a process pool for CPU-bound parsing."""
+    if processes:
+        # spawn, as in synth: forking a process with open SQLite handles and
+        # logging threads isn't safe
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent-trace-load")
+
+
+def ordered_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    executor: Optional[Executor] = None,
+    window: int = 1,
+) -> Iterator[R]:
+    """Lazy, order-preserving ``executor.map``.
+
+    At most ``window`` calls are in flight, so the first results come back
+    as soon as they are ready and closing the generator early (a consumer
+    that has enough) cancels what hasn't started. Without an executor calls
+    run inline.
+    """
+    if executor is None:
+        for item in items:
+            yield fn(item)
+        return
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
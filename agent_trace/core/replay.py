@@ -0,0 +1,140 @@
+import json
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+from .schema import ToolStep, Trace
+from .serialize import snapshot
+from .store import load_trace
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("REPLAY")
+
+POLICY_STRICT = "strict"
+POLICY_LENIENT = "lenient"
+REPLAY_POLICIES = (POLICY_STRICT, POLICY_LENIENT)
+
+
+class ReplayMismatch(LookupError):
+    """A tool call had no recorded counterpart under the strict policy."""
+
+
+class ReplayedToolError(RuntimeError):
+    """Raised in place of the exception a tool raised when it was recorded."""
+
+
+def normalize_inputs(inputs: Dict[str, Any]) -> str:
+    """Stable key for tool inputs that matches their recorded form.
+
+    Inputs are snapshotted the way they are at capture time (which is a
+    no-op for recorded inputs), so a recorded call and the same call made
+    again produce the same key.
+    """
+    return json.dumps(snapshot(inputs), sort_keys=True)
+
+
+class ReplayMiss(BaseModel):
+    tool_name: str
+    inputs: str
+    reason: str
+
+
+class ReplayReport(BaseModel):
+    """What happened to each tool call during a replay."""
+    trace_id: str
+    policy: str
+    hits: int = 0
+    misses: List[ReplayMiss] = Field(default_factory=list)
+    unused: int = 0
+    saved_ms: float = 0.0
+
+    @property
+    def calls(self) -> int:
+        return self.hits + len(self.misses)
+
+
+class ReplaySession:
+    """Serves recorded tool results for one stored trace.
+
+    Calls are matched on tool name and normalized inputs. Repeated identical
+    calls are answered in recorded order.
+    """
+
+    def __init__(self, trace: Trace, policy: str = POLICY_STRICT):
+        if policy not in REPLAY_POLICIES:
+            raise ValueError(f"Unknown replay policy '{policy}', expected one of {REPLAY_POLICIES}")
+        self.trace = trace
+        self.policy = policy
+        self._recorded: Dict[Tuple[str, str], Deque[ToolStep]] = defaultdict(deque)
+        for step in trace.steps:
+            if isinstance(step, ToolStep):
+                self._recorded[(step.tool_name, normalize_inputs(step.inputs))].append(step)
+        self.report = ReplayReport(trace_id=str(trace.trace_id), policy=policy)
+
+    def lookup(self, tool_name: str, inputs: Dict[str, Any]) -> Optional[ToolStep]:
+        """The recorded step for this call, or ``None`` to run the tool for real.
+
+        Raises ``ReplayMismatch`` on a miss under the strict policy.
+        """
+        key = normalize_inputs(inputs)
+        queue = self._recorded.get((tool_name, key))
+        if queue:
+            step = queue.popleft()
+            self.report.hits += 1
+            self.report.saved_ms += step.duration_ms or 0.0
+            logger.debug(f"Replay hit: {tool_name}")
+            return step
+
+        reason = "exhausted" if queue is not None else "not recorded"
+        self.report.misses.append(ReplayMiss(tool_name=tool_name, inputs=key, reason=reason))
+        logger.debug(f"Replay miss ({reason}): {tool_name} {key}")
+        if self.policy == POLICY_STRICT:
+            raise ReplayMismatch(f"No recorded call to '{tool_name}' with inputs {key} ({reason})")
+        return None
+
+    def finish(self) -> ReplayReport:
+        """Finalize the report, counting recorded calls that were never made."""
+        self.report.unused = sum(len(q) for q in self._recorded.values())
+        return self.report
+
+
+def replay_result(step: ToolStep) -> Any:
+    """Return a recorded step's output, or raise its recorded error."""
+    if step.error is not None:
+        raise ReplayedToolError(step.error)
+    return step.output
+
+
+_active_replay: Optional[ReplaySession] = None
+
+
+def get_active_replay() -> Optional[ReplaySession]:
+    """The replay session traced tools should consult, if any."""
+    return _active_replay
+
+
+@contextmanager
+def replay_trace(ref: Union[Trace, Path, str], policy: str = POLICY_STRICT):
+    """Context manager in which traced tools return outputs recorded in ``ref``.
+
+    ``ref`` is a ``Trace``, a trace ID or a trace file. Yields the session;
+    its ``report`` is complete once the block exits.
+    """
+    global _active_replay
+    trace = ref if isinstance(ref, Trace) else load_trace(ref)
+    session = ReplaySession(trace, policy)
+    previous = _active_replay
+    _active_replay = session
+    logger.info(f"Replaying trace {trace.trace_id} ({policy})")
+    try:
+        yield session
+    finally:
+        _active_replay = previous
+        report = session.finish()
+        logger.info(
+            f"Replay of {trace.trace_id} done: {report.hits} hits, "
+            f"{len(report.misses)} misses, {report.unused} unused"
+        )
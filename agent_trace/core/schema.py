@@ -1,9 +1,15 @@
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, Field
 
+# Written into every stored document; bump when the stored layout changes
+SCHEMA_VERSION = 1
+
+# Step metadata key under which slow steps are flagged (see ``baselines``)
+ANOMALY_KEY = "anomaly"
+
 class BaseStep(BaseModel):
     """Base class for all step types."""
     started_at: datetime = Field(default_factory=lambda: datetime.now())
@@ -14,7 +20,7 @@ class BaseStep(BaseModel):
 
 class ToolStep(BaseStep):
     """A single tool execution within a trace."""
-    step_type: str = "tool"
+    step_type: Literal["tool"] = "tool"
     tool_name: str
     inputs: Dict[str, Any]
     output: Optional[Any] = None
@@ -22,27 +28,34 @@ class ToolStep(BaseStep):
 
 class ReasoningStep(BaseStep):
     """A reasoning/thought step from the agent."""
-    step_type: str = "reasoning"
+    step_type: Literal["reasoning"] = "reasoning"
     thought: str
     action: Optional[str] = None
     observation: Optional[str] = None
 
 class TaskStep(BaseStep):
     """A task step from the agent."""
-    step_type: str = "task"
+    step_type: Literal["task"] = "task"
     result: Optional[Any] = None
 
 class AgentStep(BaseStep):
     """An agent step from the agent."""
-    step_type: str = "agent"
+    step_type: Literal["agent"] = "agent"
     result: Optional[Any] = None
 
+# Tagged by step_type: TaskStep and AgentStep have the same fields, so an
+# untagged union can't tell them apart
+Step = Annotated[
+    Union[ToolStep, ReasoningStep, AgentStep, TaskStep],
+    Field(discriminator="step_type"),
+]
+
 class Trace(BaseModel):
     """A complete trace of an agent run."""
     trace_id: UUID = Field(default_factory=uuid4)
     name: str
     started_at: datetime = Field(default_factory=lambda: datetime.now())
-    steps: List[Union[ToolStep, ReasoningStep, AgentStep, TaskStep]] = Field(default_factory=list)
+    steps: List[Step] = Field(default_factory=list)
     metadata: Dict[str, Any] = Field(default_factory=dict)
     ended_at: Optional[datetime] = None
     
@@ -51,4 +64,65 @@ class Trace(BaseModel):
         """Calculate total duration of the trace if ended."""
         if not self.ended_at:
             return None
-        return (self.ended_at - self.started_at).total_seconds() * 1000 
\ No newline at end of file
+        return (self.ended_at - self.started_at).total_seconds() * 1000 
+
+class TraceSummary(BaseModel):
+    """What listing a trace needs, stored ahead of its steps."""
+    trace_id: UUID
+    name: str
+    started_at: datetime
+    ended_at: Optional[datetime] = None
+    step_count: int = 0
+    error_count: int = 0
+    # Steps slower than their tool's/agent's baseline p99 when saved
+    anomaly_count: int = 0
+    tools: List[str] = Field(default_factory=list)
+    # Size of the stored document; filled in by the store when read
+    bytes: Optional[int] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if not self.ended_at:
+            return None
+        return (self.ended_at - self.started_at).total_seconds() * 1000
+
+    @classmethod
+    def from_trace(cls, trace: Trace) -> "TraceSummary":
+        tools = set()
+        errors = 0
+        anomalies = 0
+        for step in trace.steps:
+            if isinstance(step, ToolStep):
+                tools.add(step.tool_name)
+                if step.error:
+                    errors += 1
+            if ANOMALY_KEY in step.metadata:
+                anomalies += 1
+        return cls(
+            trace_id=trace.trace_id,
+            name=trace.name,
+            started_at=trace.started_at,
+            ended_at=trace.ended_at,
+            step_count=len(trace.steps),
+            error_count=errors,
+            anomaly_count=anomalies,
+            tools=sorted(tools),
+        )
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "TraceSummary":
+        """Summary of a raw trace document, computed from its steps if it has none."""
+        if "summary" in doc:
+            return cls.model_validate(doc["summary"])
+        steps = doc.get("steps", [])
+        tools = {step["tool_name"] for step in steps if "tool_name" in step}
+        return cls(
+            trace_id=doc["trace_id"],
+            name=doc["name"],
+            started_at=doc["started_at"],
+            ended_at=doc.get("ended_at"),
+            step_count=len(steps),
+            error_count=sum(1 for step in steps if step.get("error")),
+            anomaly_count=sum(1 for step in steps if ANOMALY_KEY in step.get("metadata", {})),
+            tools=sorted(tools),
+        )
@@ -0,0 +1,224 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .fileio import file_lock
+from .schema import Trace
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("TRACE_SEARCH")
+
+SEARCH_DB_FILENAME = "search.db"
+# How long a connection waits for another writer's lock
+BUSY_TIMEOUT_MS = 30_000
+
+# Markers wrapped around matched terms in ``SearchHit.snippet``.
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+# Large payloads are indexed by their head only; that's where error messages
+# and identifiers live, and it keeps the index a fraction of the trace size.
+MAX_FIELD_CHARS = 64 * 1024
+
+SEARCH_FIELDS = (
+    "thought", "action", "observation", "inputs", "output", "error", "result",
+)
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    trace_id UNINDEXED,
+    step_index UNINDEXED,
+    step_type UNINDEXED,
+    step_name UNINDEXED,
+    field UNINDEXED,
+    content,
+    tokenize = 'unicode61'
+);
+CREATE TABLE IF NOT EXISTS indexed (
+    trace_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    started_at REAL NOT NULL
+);
+"""
+
+
+class InvalidSearchQuery(ValueError):
+    """A raw query that isn't valid FTS5 syntax."""
+
+
+class SearchHit(BaseModel):
+    """A single step field matching a search query."""
+    trace_id: str
+    trace_name: str
+    step_index: int
+    step_type: str
+    step_name: Optional[str] = None
+    field: str
+    snippet: str
+
+
+def _as_text(value) -> Optional[str]:
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str)
+    return value[:MAX_FIELD_CHARS] if value else None
+
+
+def iter_documents(trace: Trace) -> Iterator[Tuple[int, str, Optional[str], str, str]]:
+    """Yield (step_index, step_type, step_name, field, text) for a trace."""
+    for i, step in enumerate(trace.steps):
+        if step.step_type == "tool":
+            name = step.tool_name
+            fields = {"inputs": step.inputs, "output": step.output, "error": step.error}
+        elif step.step_type == "reasoning":
+            name = step.agent_name
+            fields = {
+                "thought": step.thought,
+                "action": step.action,
+                "observation": step.observation,
+            }
+        else:
+            name = step.task_name if step.step_type == "task" else step.agent_name
+            fields = {"result": step.result}
+        for field, value in fields.items():
+            text = _as_text(value)
+            if text:
+                yield i, step.step_type, name, field, text
+
+
+def phrase_query(text: str) -> str:
+    """Quote free text as an FTS5 phrase so punctuation can't break the query."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    """Incrementally maintained SQLite FTS5 index over trace step contents."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000)
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._setup_lock:
+                if not self._ready:
+                    # Like SQLiteTraceStore: once, and one process at a time
+                    with file_lock(self.path.with_name(f".{self.path.name}.lock")):
+                        conn.execute("PRAGMA journal_mode=WAL")
+                        conn.executescript(SCHEMA)
+                    self._ready = True
+            self._local.conn = conn
+        return conn
+
+    def index_traces(self, traces: Iterable[Trace]) -> int:
+        """Index traces not already in the index, in one transaction."""
+        conn = self._connect()
+        count = 0
+        with conn:
+            for trace in traces:
+                trace_id = str(trace.trace_id)
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO indexed VALUES (?, ?, ?)",
+                    (trace_id, trace.name, trace.started_at.timestamp()),
+                ).rowcount
+                if not inserted:
+                    continue
+                conn.executemany(
+                    "INSERT INTO docs VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        (trace_id, i, step_type, name, field, text)
+                        for i, step_type, name, field, text in iter_documents(trace)
+                    ),
+                )
+                count += 1
+        logger.debug(f"Indexed {count} traces in {self.path}")
+        return count
+
+    def index_trace(self, trace: Trace) -> bool:
+        """Index a single trace. Returns False if it was already indexed."""
+        return self.index_traces([trace]) == 1
+
+    def remove(self, trace_id: str) -> None:
+        """Drop a trace from the index."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM docs WHERE trace_id = ?", (str(trace_id),))
+            conn.execute("DELETE FROM indexed WHERE trace_id = ?", (str(trace_id),))
+
+    def clear(self) -> None:
+        """Drop everything from the index."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM docs")
+            conn.execute("DELETE FROM indexed")
+
+    def count(self) -> int:
+        """Number of indexed traces."""
+        return self._connect().execute("SELECT count(*) FROM indexed").fetchone()[0]
+
+    def search(
+        self,
+        query: str,
+        field: Optional[str] = None,
+        step_type: Optional[str] = None,
+        step_name: Optional[str] = None,
+        limit: int = 50,
+        raw: bool = False,
+    ) -> List[SearchHit]:
+        """Return the best matching steps, most relevant first.
+
+        ``query`` is matched as a phrase unless ``raw`` is set, in which case
+        it is passed through as FTS5 query syntax (AND/OR/NEAR, prefix*);
+        raises ``InvalidSearchQuery`` if it doesn't parse.
+        """
+        clauses = ["docs MATCH ?"]
+        params: list = [query if raw else phrase_query(query)]
+        for column, value in (
+            ("field", field), ("step_type", step_type), ("step_name", step_name)
+        ):
+            if value:
+                clauses.append(f"docs.{column} = ?")
+                params.append(value)
+        params.append(limit)
+        params = [HIGHLIGHT_START, HIGHLIGHT_END] + params
+        try:
+            rows = self._connect().execute(
+                f"""
+                SELECT docs.trace_id, indexed.name, docs.step_index, docs.step_type,
+                       docs.step_name, docs.field,
+                       snippet(docs, 5, ?, ?, '…', 16)
+                FROM docs JOIN indexed ON indexed.trace_id = docs.trace_id
+                WHERE {' AND '.join(clauses)}
+                ORDER BY rank
+                LIMIT ?
+                """,
+                params,
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            if not raw:
+                raise
+            raise InvalidSearchQuery(f"invalid FTS5 query: {e}") from e
+        return [
+            SearchHit(
+                trace_id=trace_id,
+                trace_name=name,
+                step_index=step_index,
+                step_type=step_type,
+                step_name=step_name,
+                field=field,
+                snippet=snippet,
+            )
+            for trace_id, name, step_index, step_type, step_name, field, snippet in rows
+        ]
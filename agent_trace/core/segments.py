@@ -0,0 +1,281 @@
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from pydantic import BaseModel
+
+from .fileio import file_lock
+from .overhead import record_serialization
+from .schema import Trace
+from .serialize import iter_trace_json
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("TRACE_SEGMENTS")
+
+SEGMENTS_DIRNAME = "segments"
+INDEX_FILENAME = "index.jsonl"
+LOCK_FILENAME = ".lock"
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".jsonl"
+
+DEFAULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_SEGMENT_MAX_AGE_S = 3600.0
+
+
+class SegmentEntry(BaseModel):
+    """Location of a single trace inside a segment file."""
+    trace_id: str
+    name: str
+    started_at: datetime
+    saved_at: float
+    segment: str
+    offset: int
+    length: int
+    deleted: bool = False
+
+
+class SegmentLog:
+    """Append-only, size/time rotated segment files with an offset index.
+
+    Every trace is written as one compact JSON line to the active segment and
+    its location is appended to ``index.jsonl``, so a trace can be read back
+    with a single seek instead of scanning a directory of small files.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES,
+        max_age_s: float = DEFAULT_SEGMENT_MAX_AGE_S,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._entries: Dict[str, SegmentEntry] = {}
+        self._index_pos = 0
+        self._index_inode: Optional[int] = None
+
+    @property
+    def index_path(self) -> Path:
+        return self.root / INDEX_FILENAME
+
+    def lock(self):
+        """Exclusive lock serializing writers and compaction across processes."""
+        return file_lock(self.root / LOCK_FILENAME)
+
+    def _ensure_root(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def segments(self) -> List[Path]:
+        """Return all segment files, oldest first."""
+        if not self.root.exists():
+            return []
+        return sorted(self.root.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    def _new_segment_path(self) -> Path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return self.root / f"{SEGMENT_PREFIX}{timestamp}{SEGMENT_SUFFIX}"
+
+    def _segment_created_at(self, path: Path) -> float:
+        stamp = path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+        try:
+            return datetime.strptime(stamp, "%Y%m%d_%H%M%S_%f").timestamp()
+        except ValueError:
+            return path.stat().st_mtime
+
+    def _active_segment(self) -> Path:
+        """Return the segment to append to, rotating it when full or too old."""
+        segments = self.segments()
+        if segments:
+            active = segments[-1]
+            too_big = active.stat().st_size >= self.max_bytes
+            too_old = time.time() - self._segment_created_at(active) >= self.max_age_s
+            if not (too_big or too_old):
+                return active
+            logger.info(f"Rotating segment {active.name} (size={too_big}, age={too_old})")
+        return self._new_segment_path()
+
+    def append(self, trace: Trace) -> SegmentEntry:
+        """Append a trace to the active segment and record it in the index."""
+        return self.append_many([trace])[0]
+
+    def append_many(self, traces: Iterable[Trace]) -> List[SegmentEntry]:
+        """Append several traces with a single lock acquisition and write."""
+        self._ensure_root()
+        start = time.perf_counter()
+        lines = [
+            (trace, b"".join(iter_trace_json(trace)) + b"\n")
+            for trace in traces
+        ]
+        record_serialization(start, sum(len(line) for _, line in lines))
+        entries = []
+        # Segment lines are fully written before their index lines, and both
+        # happen under the lock, so readers only ever see complete entries.
+        with self.lock():
+            segment = self._active_segment()
+            with open(segment, "ab") as f:
+                offset = f.tell()
+                for trace, line in lines:
+                    entries.append(SegmentEntry(
+                        trace_id=str(trace.trace_id),
+                        name=trace.name,
+                        started_at=trace.started_at,
+                        saved_at=time.time(),
+                        segment=segment.name,
+                        offset=offset,
+                        length=len(line),
+                    ))
+                    offset += len(line)
+                f.write(b"".join(line for _, line in lines))
+            self._append_index(entries)
+        logger.debug(f"Appended {len(entries)} traces to {segment.name}")
+        return entries
+
+    def _append_index(self, entries: List[SegmentEntry]) -> None:
+        with open(self.index_path, "ab") as f:
+            f.write(b"".join(
+                e.model_dump_json(exclude_defaults=True).encode() + b"\n"
+                for e in entries
+            ))
+
+    def delete(self, trace_id: str) -> bool:
+        """Record a tombstone for a trace; its bytes are dropped on compaction."""
+        entry = self.find(trace_id)
+        if entry is None:
+            return False
+        self._ensure_root()
+        with self.lock():
+            self._append_index([entry.model_copy(update={"deleted": True})])
+        return True
+
+    def _refresh(self) -> None:
+        """Read index lines appended since the last refresh."""
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            self._entries, self._index_pos, self._index_inode = {}, 0, None
+            return
+        if stat.st_ino != self._index_inode or stat.st_size < self._index_pos:
+            # The index was rewritten (e.g. by compaction); start over.
+            self._entries, self._index_pos = {}, 0
+            self._index_inode = stat.st_ino
+        if stat.st_size == self._index_pos:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    # Partially written line, pick it up on the next refresh.
+                    break
+                self._index_pos += len(raw)
+                try:
+                    entry = SegmentEntry.model_validate_json(raw)
+                except ValueError:
+                    logger.warning(f"Skipping corrupt index line in {self.index_path}")
+                    continue
+                self._entries.pop(entry.trace_id, None)
+                if not entry.deleted:
+                    self._entries[entry.trace_id] = entry
+
+    def entries(self) -> List[SegmentEntry]:
+        """Return the latest index entry for every trace, oldest first."""
+        self._refresh()
+        return list(self._entries.values())
+
+    def find(self, trace_id: str) -> Optional[SegmentEntry]:
+        """Look up a trace by ID."""
+        self._refresh()
+        return self._entries.get(str(trace_id))
+
+    def read_bytes(self, entry: SegmentEntry, limit: Optional[int] = None) -> bytes:
+        """Read the raw JSON line for an entry (at most ``limit`` bytes of it)."""
+        with open(self.root / entry.segment, "rb") as f:
+            f.seek(entry.offset)
+            return f.read(min(entry.length, limit) if limit else entry.length)
+
+    def read(self, entry: SegmentEntry) -> Trace:
+        """Load the trace an index entry points to."""
+        return Trace.model_validate_json(self.read_bytes(entry))
+
+    def compact(self, loose_files: Iterable[Path] = ()) -> Dict[str, int]:
+        """Rewrite live traces into fresh, full segments.
+
+        Superseded entries and bytes that are not referenced by the index are
+        dropped. Any ``loose_files`` (one-file-per-trace JSON) are folded into
+        the segments and removed afterwards.
+        """
+        self._ensure_root()
+        with self.lock():
+            return self._compact(loose_files)
+
+    def _compact(self, loose_files: Iterable[Path]) -> Dict[str, int]:
+        old_segments = self.segments()
+        bytes_before = sum(p.stat().st_size for p in old_segments)
+
+        new_entries: List[SegmentEntry] = []
+        out = None
+        out_path: Optional[Path] = None
+
+        def write(payload: bytes, trace_id: str, name: str, started_at, saved_at: float):
+            nonlocal out, out_path
+            if out is None or out.tell() >= self.max_bytes:
+                if out is not None:
+                    out.close()
+                    # Segment names have microsecond resolution; make sure the
+                    # next one sorts after the one we just closed.
+                    time.sleep(0.000001)
+                out_path = self._new_segment_path().with_suffix(".compacting")
+                out = open(out_path, "wb")
+                written.append(out_path)
+            offset = out.tell()
+            out.write(payload)
+            new_entries.append(SegmentEntry(
+                trace_id=trace_id,
+                name=name,
+                started_at=started_at,
+                saved_at=saved_at,
+                segment=out_path.with_suffix(SEGMENT_SUFFIX).name,
+                offset=offset,
+                length=len(payload),
+            ))
+
+        written: List[Path] = []
+        migrated: List[Path] = []
+        try:
+            for entry in self.entries():
+                write(self.read_bytes(entry), entry.trace_id, entry.name,
+                      entry.started_at, entry.saved_at)
+            for path in sorted(loose_files, key=lambda p: p.stat().st_mtime):
+                trace = Trace.model_validate_json(path.read_bytes())
+                payload = b"".join(iter_trace_json(trace)) + b"\n"
+                write(payload, str(trace.trace_id), trace.name,
+                      trace.started_at, path.stat().st_mtime)
+                migrated.append(path)
+        finally:
+            if out is not None:
+                out.close()
+
+        new_segments = [p.rename(p.with_suffix(SEGMENT_SUFFIX)) for p in written]
+        tmp_index = self.index_path.with_suffix(".tmp")
+        with open(tmp_index, "w") as f:
+            for entry in sorted(new_entries, key=lambda e: e.saved_at):
+                f.write(entry.model_dump_json(exclude_defaults=True) + "\n")
+        os.replace(tmp_index, self.index_path)
+
+        for path in old_segments:
+            path.unlink()
+        for path in migrated:
+            path.unlink()
+
+        result = {
+            "traces": len(new_entries),
+            "segments_before": len(old_segments),
+            "segments_after": len(new_segments),
+            "bytes_before": bytes_before,
+            "bytes_after": sum(p.stat().st_size for p in new_segments),
+            "files_migrated": len(migrated),
+        }
+        logger.info(f"Compacted segments in {self.root}: {result}")
+        return result
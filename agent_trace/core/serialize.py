@@ -0,0 +1,372 @@
+import base64
+import dataclasses
+import datetime
+import enum
+import hashlib
+import json
+import math
+import os
+import re
+import reprlib
+from decimal import Decimal
+from pathlib import PurePath
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from .schema import SCHEMA_VERSION, Trace, TraceSummary
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+DEFAULT_MAX_DEPTH = 8
+DEFAULT_MAX_ITEMS = 1000
+DEFAULT_MAX_STRING = 10_000
+
+# Keys added to summaries of values that aren't kept in full
+TYPE_KEY = "__type__"
+TRUNCATED_KEY = "…"
+
+Encoder = Callable[[Any, "Serializer"], Any]
+
+
+class Limits(BaseModel):
+    """Bounds on how much of a captured payload is kept."""
+    max_depth: int = DEFAULT_MAX_DEPTH
+    max_items: int = DEFAULT_MAX_ITEMS
+    max_string: int = DEFAULT_MAX_STRING
+
+    @classmethod
+    def from_env(cls) -> "Limits":
+        return cls(
+            max_depth=int(os.getenv("AGENT_TRACE_MAX_DEPTH", DEFAULT_MAX_DEPTH)),
+            max_items=int(os.getenv("AGENT_TRACE_MAX_ITEMS", DEFAULT_MAX_ITEMS)),
+            max_string=int(os.getenv("AGENT_TRACE_MAX_STRING", DEFAULT_MAX_STRING)),
+        )
+
+
+def _qualified_name(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+class Serializer:
+    """Turns captured tool inputs/outputs into bounded, JSON-safe snapshots.
+
+    Containers are copied (so later mutation doesn't change the trace) and
+    truncated to ``max_items``; strings to ``max_string``; nesting beyond
+    ``max_depth`` becomes a short repr. Other types are reduced by encoders
+    registered per type, or per qualified type name for optional libraries
+    (``"pandas.core.frame.DataFrame"``) so they never need to be imported.
+    Encoding is idempotent: a snapshot encodes to itself.
+    """
+
+    def __init__(self, limits: Optional[Limits] = None):
+        self.limits = limits or Limits()
+        self._encoders: Dict[type, Encoder] = {}
+        self._named_encoders: Dict[str, Encoder] = {}
+        self._resolved: Dict[type, Optional[Encoder]] = {}
+        self._repr = reprlib.Repr()
+        self._repr.maxstring = self._repr.maxother = 200
+
+    def register(self, type_or_name: Union[type, str], encoder: Optional[Encoder] = None):
+        """Register ``encoder(value, serializer)`` for a type (and subclasses).
+
+        The encoder returns a simpler value (dict, list, str...) that is then
+        encoded normally. Usable as a decorator when ``encoder`` is omitted.
+        """
+        def decorator(func: Encoder) -> Encoder:
+            if isinstance(type_or_name, str):
+                self._named_encoders[type_or_name] = func
+            else:
+                self._encoders[type_or_name] = func
+            self._resolved.clear()
+            return func
+        return decorator(encoder) if encoder else decorator
+
+    def encoder_for(self, cls: type) -> Optional[Encoder]:
+        """The most specific registered encoder for ``cls``, if any."""
+        try:
+            return self._resolved[cls]
+        except KeyError:
+            pass
+        found = None
+        for base in cls.__mro__:
+            found = self._encoders.get(base) or self._named_encoders.get(_qualified_name(base))
+            if found:
+                break
+        self._resolved[cls] = found
+        return found
+
+    def short_repr(self, value: Any) -> str:
+        """A bounded repr for values that can't be kept."""
+        try:
+            return f"<{type(value).__name__} {self._repr.repr(value)}>"
+        except Exception:
+            return f"<{type(value).__name__}>"
+
+    def _string(self, value: str) -> str:
+        limit = self.limits.max_string
+        if len(value) <= limit:
+            return value
+        marker = f"…[+{len(value) - limit} chars]"
+        # The result stays within the limit, so encoding it again is a no-op
+        return value[:max(0, limit - len(marker))] + marker
+
+    def encode(self, value: Any, depth: int = 0) -> Any:
+        """Return a JSON-safe snapshot of ``value``."""
+        cls = type(value)
+        if cls is str:
+            return self._string(value)
+        if value is None or cls is bool or cls is int:
+            return value
+        if cls is float:
+            return value if math.isfinite(value) else str(value)
+
+        # Encoders registered for container subclasses (Counter, namedtuples...)
+        # take precedence over the generic container handling
+        encoder = None if cls is dict or cls is list or cls is tuple else self.encoder_for(cls)
+        if encoder is None and isinstance(value, (dict, list, tuple, set, frozenset)):
+            if depth >= self.limits.max_depth:
+                return self.short_repr(value)
+            if isinstance(value, dict):
+                return self._encode_dict(value, depth)
+            items = value
+            if isinstance(value, (set, frozenset)):
+                try:
+                    items = sorted(value)
+                except TypeError:
+                    items = list(value)
+            return self._encode_list(items, depth)
+
+        if encoder is None:
+            if dataclasses.is_dataclass(value) and not isinstance(value, type):
+                encoder = _encode_dataclass
+            elif isinstance(value, str):
+                return self._string(str(value))
+            elif isinstance(value, (int, float)):
+                return self.encode(float(value) if isinstance(value, float) else int(value), depth)
+            else:
+                return self._string(self.short_repr(value))
+        try:
+            reduced = encoder(value, self)
+        except Exception as e:
+            return self._string(f"<{cls.__name__}: encoding failed: {e}>")
+        if type(reduced) is cls:
+            return self._string(self.short_repr(value))
+        return self.encode(reduced, depth)
+
+    def _encode_dict(self, value: dict, depth: int) -> dict:
+        max_items = self.limits.max_items
+        out = {}
+        for i, (key, item) in enumerate(value.items()):
+            if i >= max_items - 1 and len(value) > max_items:
+                out[TRUNCATED_KEY] = f"+{len(value) - i} keys"
+                break
+            if type(key) is not str:
+                # Stringify keys the way JSON does, so snapshots round-trip
+                if key is None or isinstance(key, (bool, float)):
+                    key = json.dumps(key)
+                elif isinstance(key, (int, str)):
+                    key = str(key)
+                else:
+                    key = self.short_repr(key)
+            out[key] = self.encode(item, depth + 1)
+        return out
+
+    def _encode_list(self, value, depth: int) -> list:
+        max_items = self.limits.max_items
+        if len(value) > max_items:
+            kept = max(0, max_items - 1)
+            out = [self.encode(item, depth + 1) for item in list(value)[:kept]]
+            out.append(f"{TRUNCATED_KEY}[+{len(value) - kept} items]")
+            return out
+        return [self.encode(item, depth + 1) for item in value]
+
+
+def _encode_dataclass(value: Any, serializer: Serializer) -> dict:
+    # Shallow, unlike dataclasses.asdict, so limits apply before copying
+    return {f.name: getattr(value, f.name) for f in dataclasses.fields(value)}
+
+
+def _encode_model(value: BaseModel, serializer: Serializer) -> dict:
+    return {name: item for name, item in value}
+
+
+def _encode_bytes(value: bytes, serializer: Serializer) -> dict:
+    data = bytes(value)
+    if len(data) <= 64:
+        return {TYPE_KEY: "bytes", "length": len(data), "base64": base64.b64encode(data).decode()}
+    return {
+        TYPE_KEY: "bytes",
+        "length": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "head_base64": base64.b64encode(data[:48]).decode(),
+    }
+
+
+def _encode_ndarray(value: Any, serializer: Serializer) -> Any:
+    if value.size <= serializer.limits.max_items and value.dtype.kind in "biufcUSb":
+        return value.tolist()
+    return {
+        TYPE_KEY: "ndarray",
+        "dtype": str(value.dtype),
+        "shape": list(value.shape),
+        "head": value.ravel()[:10].tolist() if value.dtype.kind in "biufUSb" else [],
+    }
+
+
+def _encode_numpy_scalar(value: Any, serializer: Serializer) -> Any:
+    return value.item()
+
+
+def _encode_dataframe(value: Any, serializer: Serializer) -> dict:
+    columns = [str(c) for c in value.columns[: serializer.limits.max_items]]
+    return {
+        TYPE_KEY: "DataFrame",
+        "shape": list(value.shape),
+        "columns": columns,
+        "dtypes": {str(c): str(t) for c, t in list(value.dtypes.items())[: len(columns)]},
+        "head": value.head(5).to_dict(orient="records"),
+    }
+
+
+def _encode_series(value: Any, serializer: Serializer) -> dict:
+    return {
+        TYPE_KEY: "Series",
+        "name": str(value.name),
+        "length": len(value),
+        "dtype": str(value.dtype),
+        "head": value.head(10).tolist(),
+    }
+
+
+def _register_defaults(serializer: Serializer) -> Serializer:
+    serializer.register(BaseModel, _encode_model)
+    serializer.register(bytes, _encode_bytes)
+    serializer.register(bytearray, _encode_bytes)
+    serializer.register(memoryview, _encode_bytes)
+    serializer.register(datetime.datetime, lambda v, s: v.isoformat())
+    serializer.register(datetime.date, lambda v, s: v.isoformat())
+    serializer.register(datetime.time, lambda v, s: v.isoformat())
+    serializer.register(datetime.timedelta, lambda v, s: v.total_seconds())
+    serializer.register(UUID, lambda v, s: str(v))
+    serializer.register(Decimal, lambda v, s: str(v))
+    serializer.register(PurePath, lambda v, s: str(v))
+    serializer.register(enum.Enum, lambda v, s: v.value)
+    serializer.register(BaseException, lambda v, s: f"{type(v).__name__}: {v}")
+    serializer.register("numpy.ndarray", _encode_ndarray)
+    serializer.register("numpy.generic", _encode_numpy_scalar)
+    serializer.register("pandas.core.frame.DataFrame", _encode_dataframe)
+    serializer.register("pandas.core.series.Series", _encode_series)
+    return serializer
+
+
+_serializer: Optional[Serializer] = None
+
+
+def get_serializer() -> Serializer:
+    """The serializer used at capture time, with limits from the environment."""
+    global _serializer
+    if _serializer is None:
+        _serializer = _register_defaults(Serializer(Limits.from_env()))
+    return _serializer
+
+
+def register_encoder(type_or_name: Union[type, str], encoder: Optional[Encoder] = None):
+    """Register an encoder on the capture-time serializer, see ``Serializer.register``."""
+    return get_serializer().register(type_or_name, encoder)
+
+
+def snapshot(value: Any) -> Any:
+    """Bounded, JSON-safe copy of a captured payload."""
+    return get_serializer().encode(value)
+
+
+def describe(value: Any) -> Any:
+    """Type and length of a captured payload, without its contents."""
+    if value is None:
+        return None
+    summary = {TYPE_KEY: type(value).__name__}
+    try:
+        summary["length"] = len(value)
+    except TypeError:
+        pass
+    return summary
+
+
+def dumps(value: Any, indent: bool = False) -> bytes:
+    """Serialize to JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(value, default=str, option=option)
+        except TypeError:
+            # e.g. integers beyond 64 bits; fall back to the stdlib encoder
+            pass
+    return json.dumps(value, default=str, indent=2 if indent else None).encode()
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_trace_json(trace: Trace) -> Iterator[bytes]:
+    """Compact JSON of a trace, in chunks: the header, then one step at a time.
+
+    Equivalent to ``dumps(trace.model_dump())`` but never holds more than one
+    step's dump, so huge traces don't need a full copy in memory. The
+    document starts with a ``summary`` (see ``read_summary``) and the
+    ``schema_version``, followed by the other header fields, so listings
+    can stop reading after a few hundred bytes.
+    """
+    summary = dumps(TraceSummary.from_trace(trace).model_dump(exclude_none=True))
+    header = dumps(trace.model_dump(exclude={"steps"}))
+    yield (
+        b'{"summary":' + summary
+        + b',"schema_version":' + str(SCHEMA_VERSION).encode()
+        + b"," + header[1:-1] + b',"steps":['
+    )
+    for i, step in enumerate(trace.steps):
+        chunk = dumps(step.model_dump())
+        yield b"," + chunk if i else chunk
+    yield b"]}"
+
+
+def write_trace(trace: Trace, f: IO[bytes]) -> int:
+    """Stream a trace's JSON to a binary file. Returns the bytes written."""
+    written = 0
+    for chunk in iter_trace_json(trace):
+        f.write(chunk)
+        written += len(chunk)
+    return written
+
+
+# Stored documents start with their summary, see ``iter_trace_json``
+SUMMARY_READ_BYTES = 4096
+_SUMMARY_PREFIX = re.compile(rb'\s*\{\s*"summary"\s*:\s*')
+_decoder = json.JSONDecoder()
+
+
+def read_summary(head: bytes) -> Optional[TraceSummary]:
+    """Parse the summary at the start of a stored trace document.
+
+    ``head`` only needs to cover the summary, normally the first
+    ``SUMMARY_READ_BYTES``. Returns ``None`` if the document has no summary
+    (it predates them) or ``head`` cuts it off; callers then fall back to
+    the full document.
+    """
+    match = _SUMMARY_PREFIX.match(head)
+    if not match:
+        return None
+    try:
+        # A cut multi-byte character can only be at the end, past the summary
+        value, _ = _decoder.raw_decode(head.decode("utf-8", errors="ignore"), match.end())
+        return TraceSummary.model_validate(value)
+    except ValueError:
+        return None
@@ -0,0 +1,205 @@
+"""Batched updates of the stores kept next to saved traces.
+
+Besides the trace itself, saving one updates the search index, the step
+columns, the latency baselines and the overhead ledger. Doing that on every
+``save_trace`` costs several synchronous writes per trace, some under
+directory-wide locks, so instead saved traces are queued here and written
+in batches: by a daemon thread once the oldest has waited
+``AGENT_TRACE_SIDECAR_INTERVAL`` seconds (default 1), as soon as
+``AGENT_TRACE_SIDECAR_BATCH`` traces are pending (default 200), and at exit. An interval of 0 writes them on every
+save. Readers in this process call ``flush_sidecars`` first, so they always
+see what was saved; other processes see it within one interval.
+
+Anomalies are still flagged before a trace is written, against an
+in-memory copy of the baselines that is refreshed from disk on every flush.
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from . import overhead
+from .baselines import BASELINES_DIRNAME, Baseline, BaselineStore, Key
+from .columns import COLUMNS_DIRNAME, ColumnStore
+from .schema import Trace
+from .search import SEARCH_DB_FILENAME, SearchIndex
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("SIDECARS")
+
+DEFAULT_INTERVAL_S = 1.0
+DEFAULT_BATCH = 200
+# How often the background thread looks for writers due a flush
+TICK_S = 0.25
+
+
+def flush_interval() -> float:
+    """Seconds between background flushes; 0 flushes on every save."""
+    return float(os.getenv("AGENT_TRACE_SIDECAR_INTERVAL", DEFAULT_INTERVAL_S))
+
+
+def batch_size() -> int:
+    """Pending traces that trigger a flush from the saving thread."""
+    return int(os.getenv("AGENT_TRACE_SIDECAR_BATCH", DEFAULT_BATCH))
+
+
+class SidecarWriter:
+    """Pending sidecar updates of one traces directory, written once the
+    oldest has waited ``interval_s`` or ``batch`` traces are pending."""
+
+    def __init__(self, traces_dir: Path, interval_s: float = DEFAULT_INTERVAL_S, batch: int = DEFAULT_BATCH):
+        self.traces_dir = Path(traces_dir)
+        self.interval_s = interval_s
+        self.batch = batch
+        self.baseline_store = BaselineStore(self.traces_dir / BASELINES_DIRNAME)
+        self.search_index = SearchIndex(self.traces_dir / SEARCH_DB_FILENAME)
+        self.column_store = ColumnStore(self.traces_dir / COLUMNS_DIRNAME)
+        # Guards the pending lists and the baselines; ``_flush_lock`` keeps
+        # flushes in order without blocking savers while one writes
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._baselines: Optional[Dict[Key, Baseline]] = None
+        self._latencies: Dict[Key, List[float]] = {}
+        self._index: List[Trace] = []
+        self._columns: List[Trace] = []
+        self._ledger: List[Dict[str, Any]] = []
+        # When the oldest pending update was queued
+        self._since: Optional[float] = None
+
+    def flag(self, traces: List[Trace]) -> int:
+        """Flag slow steps (see ``BaselineStore.flag``) and queue their
+        latencies. Returns the number of steps flagged."""
+        with self._lock:
+            if self._baselines is None:
+                self._baselines = self.baseline_store.load()
+            flagged, added = self.baseline_store.flag(traces, self._baselines)
+            for key, values in added.items():
+                self._latencies.setdefault(key, []).extend(values)
+            if added and self._since is None:
+                self._since = time.monotonic()
+        return flagged
+
+    def add(
+        self,
+        traces: List[Trace],
+        search: bool = False,
+        columns: bool = False,
+        ledger: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """Queue saved traces for the search index and step columns, and
+        overhead records for the ledger, flushing if the batch is full."""
+        with self._lock:
+            if search:
+                self._index.extend(traces)
+            if columns:
+                self._columns.extend(traces)
+            if ledger:
+                self._ledger.extend(ledger)
+            if self._since is None and (self._index or self._columns or self._ledger):
+                self._since = time.monotonic()
+            pending = max(len(self._index), len(self._columns), len(self._ledger))
+        if self.interval_s <= 0 or pending >= self.batch:
+            self.flush()
+        elif self._since is not None:
+            _start_flusher()
+
+    def pending(self) -> bool:
+        with self._lock:
+            return self._since is not None
+
+    def due(self) -> bool:
+        """Whether the oldest pending update has waited ``interval_s``."""
+        since = self._since
+        return since is not None and time.monotonic() - since >= self.interval_s
+
+    def flush(self) -> None:
+        """Write everything pending. Failures are logged: the traces
+        themselves are stored, and ``agent-trace search --reindex`` or
+        ``stats --rebuild`` can rebuild the index and columns."""
+        with self._flush_lock:
+            with self._lock:
+                latencies, self._latencies = self._latencies, {}
+                index, self._index = self._index, []
+                columns, self._columns = self._columns, []
+                ledger, self._ledger = self._ledger, []
+                self._since = None
+            if latencies:
+                try:
+                    merged = self.baseline_store.merge(latencies)
+                except OSError as e:
+                    logger.error(f"Failed to update latency baselines: {e}")
+                else:
+                    with self._lock:
+                        # Latencies flagged since the swap aren't on disk yet
+                        self.baseline_store.add_latencies(merged, self._latencies)
+                        self._baselines = merged
+            if index:
+                try:
+                    self.search_index.index_traces(index)
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to update search index: {e}")
+            if columns and self.column_store.exists():
+                # Built from the whole store on first use, see open_step_columns
+                try:
+                    self.column_store.append(columns)
+                except OSError as e:
+                    logger.error(f"Failed to update step columns: {e}")
+            if ledger:
+                try:
+                    overhead.append_ledger(self.traces_dir, ledger)
+                except OSError as e:
+                    logger.error(f"Failed to record tracer overhead: {e}")
+            logger.debug(f"Flushed sidecars: {len(index)} indexed, {len(columns)} to columns, {len(ledger)} ledger records")
+
+
+_writers: Dict[Path, SidecarWriter] = {}
+_writers_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+
+
+def get_writer(traces_dir: Path) -> SidecarWriter:
+    """The writer of ``traces_dir``, batching as configured when it was
+    first used."""
+    with _writers_lock:
+        writer = _writers.get(traces_dir)
+        if writer is None:
+            writer = _writers[traces_dir] = SidecarWriter(traces_dir, flush_interval(), batch_size())
+        return writer
+
+
+def _start_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _writers_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run_flusher, name="agent-trace-sidecars", daemon=True)
+            _flusher.start()
+
+
+def _run_flusher() -> None:
+    while True:
+        time.sleep(TICK_S)
+        with _writers_lock:
+            writers = [*_writers.values()]
+        for writer in writers:
+            if writer.due():
+                try:
+                    writer.flush()
+                except Exception as e:
+                    logger.error(f"Background sidecar flush of {writer.traces_dir} failed: {e}")
+
+
+def flush_sidecars(traces_dir: Optional[Path] = None) -> None:
+    """Write pending sidecar updates, of ``traces_dir`` or of every directory."""
+    with _writers_lock:
+        writers = [*_writers.values()] if traces_dir is None else [_writers.get(traces_dir)]
+    for writer in writers:
+        if writer is not None and writer.pending():
+            writer.flush()
+
+
+atexit.register(flush_sidecars)
@@ -1,12 +1,30 @@
-import json
+import itertools
 import os
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from dotenv import load_dotenv
 
-from .schema import Trace
+from .backends.base import TraceDocument, TraceStore
+from .backends.filesystem import (
+    LAYOUT_FILES,
+    LAYOUT_SEGMENTS,
+    FileSystemTraceStore,
+    read_trace_document,
+)
+from .backends.memory import InMemoryTraceStore
+from .backends.sqlite import SQLiteTraceStore
+from .baselines import BASELINES_DIRNAME, BaselineStore
+from .columns import COLUMNS_DIRNAME, ColumnStore, StepColumns
+from .lazy import LazyTrace, trace_from_document
+from .parallel import WINDOW_PER_WORKER, default_workers, make_executor
+from . import overhead
+from .schema import Trace, TraceSummary
+from .search import SearchIndex
+from .segments import DEFAULT_SEGMENT_MAX_AGE_S, DEFAULT_SEGMENT_MAX_BYTES
+from .sidecars import SidecarWriter, flush_sidecars, get_writer
 
 from agent_trace.logging.logger import file_logger
 logger = file_logger("TRACE_STORE")
@@ -14,6 +32,18 @@ logger = file_logger("TRACE_STORE")
 # Load environment variables from .env file
 load_dotenv()
 
+STORAGE_FILES = LAYOUT_FILES
+STORAGE_SEGMENTS = LAYOUT_SEGMENTS
+STORAGE_SQLITE = "sqlite"
+STORAGE_MEMORY = "memory"
+STORAGE_ENGINES = (STORAGE_FILES, STORAGE_SEGMENTS, STORAGE_SQLITE, STORAGE_MEMORY)
+
+# Documents fetched per query when streaming from a database backend
+PAGE_SIZE = 500
+
+_stores: Dict[Tuple[str, Path], TraceStore] = {}
+
+
 def get_traces_dir() -> Path:
     """Get the directory where traces are stored."""
     # Read from .env, fallback to default if not set
@@ -26,52 +56,396 @@ def get_traces_dir() -> Path:
     return traces_dir
 
 
-def save_trace(trace: Trace) -> Path:
-    """Save a trace to the local filesystem."""
+def get_storage_engine() -> str:
+    """Get the configured storage engine."""
+    engine = os.getenv("AGENT_TRACE_STORAGE", STORAGE_FILES).lower()
+    if engine not in STORAGE_ENGINES:
+        raise ValueError(
+            f"Unknown AGENT_TRACE_STORAGE '{engine}', "
+            f"expected one of: {', '.join(STORAGE_ENGINES)}"
+        )
+    return engine
+
+
+def create_store(engine: str, traces_dir: Path) -> TraceStore:
+    """Instantiate the backend for a storage engine."""
+    if engine == STORAGE_SQLITE:
+        return SQLiteTraceStore(
+            Path(os.getenv("AGENT_TRACE_SQLITE_PATH", traces_dir / "traces.db"))
+        )
+    if engine == STORAGE_MEMORY:
+        return InMemoryTraceStore()
+    return FileSystemTraceStore(
+        traces_dir,
+        layout=engine,
+        segment_max_bytes=int(os.getenv(
+            "AGENT_TRACE_SEGMENT_MAX_BYTES", DEFAULT_SEGMENT_MAX_BYTES
+        )),
+        segment_max_age_s=float(os.getenv(
+            "AGENT_TRACE_SEGMENT_MAX_AGE", DEFAULT_SEGMENT_MAX_AGE_S
+        )),
+    )
+
+
+def get_store() -> TraceStore:
+    """Get the trace store selected by configuration."""
+    key = (get_storage_engine(), get_traces_dir())
+    store = _stores.get(key)
+    if store is None:
+        store = create_store(*key)
+        _stores[key] = store
+    return store
+
+
+def get_filesystem_store() -> FileSystemTraceStore:
+    """Get a filesystem store over the traces directory, whatever the engine."""
+    store = get_store()
+    if isinstance(store, FileSystemTraceStore):
+        return store
+    return FileSystemTraceStore(get_traces_dir())
+
+
+def search_enabled() -> bool:
+    """Whether saved traces are added to the full-text search index."""
+    if get_storage_engine() == STORAGE_MEMORY:
+        return False
+    return os.getenv("AGENT_TRACE_SEARCH", "1").lower() not in ("0", "false", "no")
+
+
+def get_search_index() -> SearchIndex:
+    """Get the full-text search index for the current traces directory,
+    with every trace saved so far in this process indexed."""
     traces_dir = get_traces_dir()
-    
-    # Create filename with timestamp and trace name using local time
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{trace.name}_{trace.trace_id}.json"
-    
-    filepath = traces_dir / filename
-    with open(filepath, "w") as f:
-        json.dump(trace.model_dump(), f, default=str, indent=2)
+    flush_sidecars(traces_dir)
+    return get_writer(traces_dir).search_index
+
+
+def reindex_search(batch_size: int = 500) -> int:
+    """Rebuild the full-text search index from the configured store,
+    reading it once and indexing ``batch_size`` traces per transaction."""
+    index = get_search_index()
+    index.clear()
+    count = 0
+    traces = iter_traces()
+    while True:
+        batch = list(itertools.islice(traces, batch_size))
+        if not batch:
+            return count
+        count += index.index_traces(batch)
+
+
+def columns_enabled() -> bool:
+    """Whether saved traces are added to the columnar step cache."""
+    if get_storage_engine() == STORAGE_MEMORY:
+        return False
+    return os.getenv("AGENT_TRACE_COLUMNS", "1").lower() not in ("0", "false", "no")
+
+
+def get_column_store() -> ColumnStore:
+    """The columnar step cache of the current traces directory."""
+    return ColumnStore(get_traces_dir() / COLUMNS_DIRNAME)
+
+
+def open_step_columns(rebuild: bool = False) -> StepColumns:
+    """Memory-mapped step columns of every stored trace.
+
+    The cache is built from the store the first time (or with ``rebuild``)
+    and kept up to date by ``save_trace`` afterwards.
+    """
+    flush_sidecars(get_traces_dir())
+    column_store = get_column_store()
+    if rebuild or not column_store.exists():
+        steps = column_store.rebuild(iter_traces())
+        logger.info(f"Built step columns: {steps} steps")
+    return column_store.open()
+
+
+def baselines_enabled() -> bool:
+    """Whether saved steps are checked against, and added to, latency baselines."""
+    if get_storage_engine() == STORAGE_MEMORY:
+        return False
+    return os.getenv("AGENT_TRACE_BASELINES", "1").lower() not in ("0", "false", "no")
+
+
+def get_baseline_store() -> BaselineStore:
+    """The per-tool/agent/task latency baselines of the current traces
+    directory, including the latencies saved so far in this process."""
+    traces_dir = get_traces_dir()
+    flush_sidecars(traces_dir)
+    return BaselineStore(traces_dir / BASELINES_DIRNAME)
+
+
+def _flag_anomalies(writer: SidecarWriter, traces: List[Trace]) -> None:
+    # Before the traces are written, so that anomaly annotations are stored
+    if not baselines_enabled():
+        return
+    try:
+        writer.flag(traces)
+    except OSError as e:
+        logger.error(f"Failed to read latency baselines: {e}")
+
+
+def overhead_ledger_enabled() -> bool:
+    """Whether ``save_trace`` records per-run tracer overhead in the ledger."""
+    if get_storage_engine() == STORAGE_MEMORY:
+        return False
+    return os.getenv("AGENT_TRACE_OVERHEAD", "1").lower() not in ("0", "false", "no")
+
+
+def _overhead_entry(trace: Trace, put_s: float, index_s: float) -> Optional[Dict]:
+    """Add the cost of saving to a traced run's overhead and return its
+    ledger record, if it should be kept.
+
+    The stored trace can't hold the size and serialization time of its own
+    document, so those reach ``trace.metadata`` of the saved object (what
+    ``start_run`` yields) and the ledger only.
+    """
+    serialize_s, nbytes = overhead.take_serialization()
+    captured = trace.metadata.get(overhead.OVERHEAD_KEY)
+    if not isinstance(captured, dict):
+        # Only traced runs are accounted, not imported or generated traces
+        return None
+    captured.update(
+        serialize_ms=round(serialize_s * 1000, 3),
+        write_ms=round(max(0.0, put_s - serialize_s) * 1000, 3),
+        index_ms=round(index_s * 1000, 3),
+        bytes=nbytes,
+    )
+    if not overhead_ledger_enabled():
+        return None
+    return {
+        "trace_id": str(trace.trace_id),
+        "name": trace.name,
+        "saved_at": datetime.now().isoformat(),
+        **captured,
+    }
+
+
+def list_overhead(
+    limit: Optional[int] = None,
+    name_filter: Optional[str] = None,
+    since: Optional[datetime] = None,
+) -> List[Dict]:
+    """Per-run tracer overhead records from the ledger, oldest first."""
+    flush_sidecars(get_traces_dir())
+    entries = [
+        entry for entry in overhead.read_ledger(get_traces_dir())
+        if (not name_filter or name_filter in entry.get("name", ""))
+        and (not since or datetime.fromisoformat(entry["saved_at"]) >= since)
+    ]
+    return entries[-limit:] if limit else entries
+
+
+def _queue_sidecars(writer: SidecarWriter, traces: List[Trace], ledger: Optional[List[Dict]] = None) -> None:
+    # Search index, step columns, baselines and ledger are written in
+    # batches, see ``sidecars``
+    writer.add(traces, search=search_enabled(), columns=columns_enabled(), ledger=ledger)
+
+
+def save_trace(trace: Trace) -> Optional[Path]:
+    """Save a trace to the configured store."""
+    overhead.take_serialization()
+    writer = get_writer(get_traces_dir())
+    start = time.perf_counter()
+    _flag_anomalies(writer, [trace])
+    flagged = time.perf_counter()
+    filepath = get_store().put(trace)
+    stored = time.perf_counter()
+    # Flagging anomalies counts as indexing; the batched writes aren't per run
+    entry = _overhead_entry(trace, stored - flagged, flagged - start)
+    _queue_sidecars(writer, [trace], [entry] if entry else None)
     logger.info("-"*100)
-    logger.info(f"Saved trace to {filepath}")
+    logger.info(f"Saved trace {trace.trace_id} to {filepath or get_storage_engine()}")
     logger.info("-"*100)
     return filepath
 
 
-def load_trace(filepath: Path) -> Trace:
-    """Load a trace from a file."""
-    with open(filepath) as f:
-        data = json.load(f)
-    return Trace.model_validate(data)
+def save_traces(traces: Iterable[Trace]) -> int:
+    """Save many traces in one batch (a single transaction where supported)."""
+    traces = list(traces)
+    writer = get_writer(get_traces_dir())
+    _flag_anomalies(writer, traces)
+    count = get_store().put_many(traces)
+    _queue_sidecars(writer, traces)
+    logger.info(f"Saved {count} traces to {get_storage_engine()}")
+    return count
+
+
+def load_trace_document(ref: Union[Path, str]) -> TraceDocument:
+    """The raw JSON document of a trace file, or of a stored trace by ID."""
+    path = Path(ref)
+    if path.is_file():
+        return read_trace_document(path)
+
+    doc = get_store().get_raw(str(ref))
+    if doc is None:
+        raise FileNotFoundError(f"No trace found for '{ref}'")
+    return doc
+
+
+def load_trace(ref: Union[Path, str], strict: bool = False) -> Trace:
+    """Load a trace from a file, or by trace ID from the configured store.
+
+    Traces saved by this version are constructed without validation; pass
+    ``strict=True`` to validate anyway (e.g. for files from elsewhere).
+    """
+    return trace_from_document(load_trace_document(ref), strict=strict)
+
+
+def load_trace_lazy(ref: Union[Path, str], strict: bool = False) -> LazyTrace:
+    """Like ``load_trace``, but steps are only built when accessed."""
+    return LazyTrace(load_trace_document(ref), strict=strict)
 
 
 def list_traces(
     limit: Optional[int] = None,
-    name_filter: Optional[str] = None
+    name_filter: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    offset: int = 0,
 ) -> List[Trace]:
-    """List traces, optionally filtered and limited."""
-    traces_dir = get_traces_dir()
-    
-    files = sorted(
-        traces_dir.glob("*.json"),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True
+    """List traces, newest first, optionally filtered and paginated."""
+    return get_store().query(
+        name=name_filter, since=since, until=until, limit=limit, offset=offset
     )
-    
-    traces = []
-    for f in files:
-        if limit and len(traces) >= limit:
-            break
-            
-        trace = load_trace(f)
-        if name_filter and name_filter not in trace.name:
-            continue
-            
-        traces.append(trace)
-        
-    return traces 
\ No newline at end of file
+
+
+def list_trace_documents(
+    limit: Optional[int] = None,
+    name_filter: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    offset: int = 0,
+) -> List[TraceDocument]:
+    """Like ``list_traces``, but returns raw JSON documents without validation."""
+    return get_store().query_raw(
+        name=name_filter, since=since, until=until, limit=limit, offset=offset
+    )
+
+
+def _iter_documents(
+    store: TraceStore,
+    name: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    where: Optional[Callable[[TraceDocument], bool]],
+    workers: int,
+    processes: bool,
+) -> Iterator[TraceDocument]:
+    if isinstance(store, FileSystemTraceStore):
+        if workers <= 1:
+            yield from store.iter_raw(name, since, until, where)
+            return
+        with make_executor(workers, processes) as executor:
+            yield from store.iter_raw(
+                name, since, until, where, executor, window=workers * WINDOW_PER_WORKER
+            )
+        return
+    # Databases already read in bulk; just page through them
+    offset = 0
+    while True:
+        page = store.query_raw(name=name, since=since, until=until, limit=PAGE_SIZE, offset=offset)
+        for doc in page:
+            if where is None or where(doc):
+                yield doc
+        if len(page) < PAGE_SIZE:
+            return
+        offset += len(page)
+
+
+def iter_trace_documents(
+    limit: Optional[int] = None,
+    name_filter: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    offset: int = 0,
+    where: Optional[Callable[[TraceDocument], bool]] = None,
+    workers: Optional[int] = None,
+    processes: bool = False,
+) -> Iterator[TraceDocument]:
+    """Stream raw trace documents, newest first, loading them in parallel.
+
+    Like ``list_trace_documents`` but results are yielded as they arrive and
+    reading stops once ``limit`` documents passed the filters, including
+    ``where`` (applied before ``offset``/``limit``). Files are read on
+    ``workers`` threads, or processes with ``processes=True`` when parsing
+    dominates.
+    """
+    workers = default_workers() if workers is None else workers
+    docs = _iter_documents(get_store(), name_filter, since, until, where, workers, processes)
+    stop = offset + limit if limit else None
+    # Close the source as soon as we stop, cancelling reads still queued
+    try:
+        yield from itertools.islice(docs, offset, stop)
+    finally:
+        docs.close()
+
+
+def iter_traces(
+    limit: Optional[int] = None,
+    name_filter: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    offset: int = 0,
+    where: Optional[Callable[[TraceDocument], bool]] = None,
+    workers: Optional[int] = None,
+    processes: bool = False,
+) -> Iterator[Trace]:
+    """Like ``iter_trace_documents``, yielding ``Trace`` models."""
+    for doc in iter_trace_documents(limit, name_filter, since, until, offset, where, workers, processes):
+        yield trace_from_document(doc)
+
+
+def list_trace_summaries(
+    limit: Optional[int] = None,
+    name_filter: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    offset: int = 0,
+    where: Optional[Callable[[TraceSummary], bool]] = None,
+) -> List[TraceSummary]:
+    """Like ``list_traces``, but reads only each trace's summary, not its steps.
+
+    ``where`` filters summaries before ``offset``/``limit`` apply, which
+    means reading every summary that passes the other filters.
+    """
+    if where is None:
+        return get_store().query_summaries(
+            name=name_filter, since=since, until=until, limit=limit, offset=offset
+        )
+    summaries = [
+        summary
+        for summary in get_store().query_summaries(name=name_filter, since=since, until=until)
+        if where(summary)
+    ]
+    return summaries[offset:offset + limit if limit else None]
+
+
+def window_trace(
+    doc: TraceDocument,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Tuple[Trace, int]:
+    """Validate a trace document keeping only ``steps[start:stop]``.
+
+    Returns the trace and the total number of steps in the document, so huge
+    traces can be displayed a window at a time.
+    """
+    steps = doc.get("steps", [])
+    header = {k: v for k, v in doc.items() if k != "steps"}
+    return Trace.model_validate({**header, "steps": steps[start:stop]}), len(steps)
+
+
+def delete_trace(trace_id: str) -> bool:
+    """Delete a trace from the configured store."""
+    flush_sidecars(get_traces_dir())
+    if search_enabled():
+        get_search_index().remove(trace_id)
+    if columns_enabled():
+        get_column_store().delete(trace_id)
+    return get_store().delete(trace_id)
+
+
+def compact_traces(include_files: bool = True) -> Dict[str, int]:
+    """Compact segment files, optionally migrating loose JSON trace files."""
+    return get_filesystem_store().compact(include_files=include_files)
@@ -0,0 +1,238 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from agent_trace.core.schema import AgentStep, ReasoningStep, TaskStep, ToolStep, Trace
+from agent_trace.core.sidecars import flush_sidecars
+from agent_trace.core.store import save_trace, save_traces
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("SYNTH")
+
+LATENCY_DISTRIBUTIONS = ("lognormal", "exponential", "uniform", "constant")
+STEP_TYPES = ("tool", "reasoning", "agent", "task")
+
+_WORDS = (
+    "search fetch parse summary agent tool result query document answer plan "
+    "context retry error token model prompt cache index vector score table "
+    "report source page chunk filter rank merge update status request"
+).split()
+
+
+class SynthConfig(BaseModel):
+    """Shape of a synthetic trace workload."""
+    count: int = 1000
+    min_steps: int = 5
+    max_steps: int = 50
+    # Relative weights of tool/reasoning/agent/task steps
+    step_mix: Dict[str, float] = Field(
+        default_factory=lambda: {"tool": 0.5, "reasoning": 0.3, "agent": 0.1, "task": 0.1}
+    )
+    tools: int = 20
+    agents: int = 3
+    tasks: int = 5
+    names: int = 1
+    name_prefix: str = "synthetic"
+    # Zipf exponent for how often each tool/agent/task/trace name is picked
+    # (0 = uniform)
+    skew: float = 1.1
+    latency: str = "lognormal"
+    latency_median_ms: float = 200.0
+    latency_sigma: float = 1.0
+    error_rate: float = 0.02
+    payload_bytes: int = 256
+    span_hours: float = 24.0
+    # Traces start within ``span_hours`` before this time (default: now)
+    until: Optional[datetime] = None
+    seed: int = 0
+    tags: Dict[str, str] = Field(default_factory=dict)
+
+
+def _zipf_weights(n: int, skew: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+class TraceGenerator:
+    """Deterministically generate synthetic traces from a ``SynthConfig``.
+
+    Trace ``i`` only depends on the seed and ``i``, so workers can generate
+    disjoint index ranges in parallel and still produce the same dataset.
+    """
+
+    def __init__(self, config: SynthConfig):
+        self.config = config
+        setup = np.random.default_rng([config.seed, 0])
+        self.tool_names = [f"tool_{i}" for i in range(config.tools)]
+        self.agent_names = [f"agent_{i}" for i in range(config.agents)]
+        self.task_names = [f"task_{i}" for i in range(config.tasks)]
+        self.trace_names = (
+            [config.name_prefix] if config.names <= 1
+            else [f"{config.name_prefix}_{i}" for i in range(config.names)]
+        )
+        # Each tool gets its own typical latency around the configured median
+        self.tool_medians = config.latency_median_ms * np.exp(setup.normal(0, 0.75, config.tools))
+        mix = np.array([config.step_mix.get(t, 0.0) for t in STEP_TYPES], dtype=float)
+        if mix.sum() <= 0:
+            raise ValueError("step_mix needs at least one positive weight")
+        self.step_mix = mix / mix.sum()
+        self.weights = {
+            n: _zipf_weights(n, config.skew)
+            for n in {config.tools, config.agents, config.tasks, len(self.trace_names)}
+        }
+        self.until = config.until or datetime.now()
+        # Payloads are slices of one pre-generated text, which is far cheaper
+        # than drawing words for every field
+        corpus_size = max(4096, config.payload_bytes * 16)
+        self.corpus = " ".join(setup.choice(_WORDS, size=corpus_size // 6 + 1))[:corpus_size]
+
+    def _latency(self, rng: np.random.Generator, median: float) -> float:
+        kind = self.config.latency
+        if kind == "lognormal":
+            return float(median * np.exp(rng.normal(0, self.config.latency_sigma)))
+        if kind == "exponential":
+            return float(rng.exponential(median / np.log(2)))
+        if kind == "uniform":
+            return float(rng.uniform(0, 2 * median))
+        if kind == "constant":
+            return float(median)
+        raise ValueError(f"Unknown latency distribution '{kind}', expected one of {LATENCY_DISTRIBUTIONS}")
+
+    def _pick(self, rng: np.random.Generator, names: List[str]) -> str:
+        return names[rng.choice(len(names), p=self.weights[len(names)])]
+
+    def _payload(self, rng: np.random.Generator) -> str:
+        if self.config.payload_bytes <= 0:
+            return ""
+        size = min(len(self.corpus), max(1, int(rng.exponential(self.config.payload_bytes))))
+        start = int(rng.integers(0, len(self.corpus) - size + 1))
+        return self.corpus[start:start + size]
+
+    def generate(self, index: int) -> Trace:
+        """Build synthetic trace number ``index``."""
+        config = self.config
+        rng = np.random.default_rng([config.seed, 1, index])
+        started_at = self.until - timedelta(hours=float(rng.uniform(0, config.span_hours)))
+        n_steps = int(rng.integers(config.min_steps, config.max_steps + 1))
+        kinds = rng.choice(len(STEP_TYPES), size=n_steps, p=self.step_mix)
+        agent = self._pick(rng, self.agent_names)
+
+        steps, clock = [], started_at
+        for kind in kinds:
+            step_type = STEP_TYPES[kind]
+            failed = step_type != "reasoning" and rng.random() < config.error_rate
+            if step_type == "tool":
+                tool = int(rng.choice(config.tools, p=self.weights[config.tools]))
+                duration = self._latency(rng, self.tool_medians[tool])
+                step = ToolStep(
+                    tool_name=self.tool_names[tool],
+                    inputs={"query": self._payload(rng)},
+                    output=None if failed else self._payload(rng),
+                    error="SyntheticError: tool failed" if failed else None,
+                    started_at=clock, duration_ms=duration, agent_name=agent,
+                )
+            elif step_type == "reasoning":
+                duration = self._latency(rng, config.latency_median_ms / 4)
+                step = ReasoningStep(
+                    thought=self._payload(rng),
+                    action=self._pick(rng, self.tool_names),
+                    started_at=clock, duration_ms=duration, agent_name=agent,
+                )
+            elif step_type == "agent":
+                duration = self._latency(rng, config.latency_median_ms * 5)
+                step = AgentStep(
+                    result="SyntheticError: agent failed" if failed else self._payload(rng),
+                    started_at=clock, duration_ms=duration, agent_name=agent,
+                )
+            else:
+                duration = self._latency(rng, config.latency_median_ms * 3)
+                step = TaskStep(
+                    task_name=self._pick(rng, self.task_names),
+                    result="SyntheticError: task failed" if failed else self._payload(rng),
+                    started_at=clock, duration_ms=duration, agent_name=agent,
+                )
+            steps.append(step)
+            clock += timedelta(milliseconds=duration)
+
+        return Trace(
+            trace_id=UUID(bytes=rng.bytes(16), version=4),
+            name=self._pick(rng, self.trace_names),
+            started_at=started_at,
+            ended_at=clock,
+            steps=steps,
+            metadata={"synthetic": True, "synth_seed": config.seed, "synth_index": index, **config.tags},
+        )
+
+    def iter_traces(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Trace]:
+        """Generate traces ``start`` (inclusive) to ``stop`` (exclusive)."""
+        stop = self.config.count if stop is None else stop
+        for index in range(start, stop):
+            yield self.generate(index)
+
+
+def _write_range(config: SynthConfig, start: int, stop: int, bulk: bool, batch_size: int) -> int:
+    generator = TraceGenerator(config)
+    written = 0
+    if not bulk:
+        for trace in generator.iter_traces(start, stop):
+            save_trace(trace)
+            written += 1
+    else:
+        for batch_start in range(start, stop, batch_size):
+            batch_stop = min(stop, batch_start + batch_size)
+            written += save_traces(generator.iter_traces(batch_start, batch_stop))
+    # Pool workers may exit without running atexit handlers
+    flush_sidecars()
+    return written
+
+
+def _chunks(count: int, size: int) -> List[Tuple[int, int]]:
+    return [(start, min(count, start + size)) for start in range(0, count, size)]
+
+
+def write_synthetic_traces(
+    config: SynthConfig,
+    workers: int = 1,
+    bulk: bool = True,
+    batch_size: int = 1000,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """Generate ``config.count`` traces and save them to the configured store.
+
+    ``bulk`` saves ``batch_size`` traces per ``save_traces`` call; otherwise
+    every trace goes through ``save_trace`` like a real run would. With
+    ``workers > 1`` ranges of traces are generated and written by separate
+    processes. ``progress`` is called with the number of traces written.
+    """
+    logger.info(f"Generating {config.count} synthetic traces with {workers} worker(s)")
+    # Pin the time window so every worker generates the same dataset
+    config = config.model_copy(update={"until": config.until or datetime.now()})
+    chunk = batch_size if bulk else max(1, batch_size // 10)
+    ranges = _chunks(config.count, chunk)
+    written = 0
+    if workers <= 1:
+        for start, stop in ranges:
+            count = _write_range(config, start, stop, bulk, batch_size)
+            written += count
+            if progress:
+                progress(count)
+    else:
+        # spawn, not fork: the parent may hold open SQLite connections
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_write_range, config, start, stop, bulk, batch_size)
+                for start, stop in ranges
+            ]
+            for future in as_completed(futures):
+                count = future.result()
+                written += count
+                if progress:
+                    progress(count)
+    logger.info(f"Wrote {written} synthetic traces")
+    return written
@@ -1,68 +1,248 @@
 import functools
 import time
 from contextlib import contextmanager
-from typing import Any, Callable, Dict, Optional
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
+from . import metrics, overhead
+from .cache import CachePolicy, Uncacheable, cache_key, get_tool_cache, resolve_policy
+from .config import CAPTURE_FULL, CAPTURE_METADATA, Decision, get_config
+from .overhead import accounted
+from .replay import get_active_replay, replay_result
 from .schema import Trace, ToolStep, ReasoningStep, TaskStep, AgentStep
+from .serialize import describe, snapshot
 from .store import save_trace
 
 from agent_trace.logging.logger import file_logger
 logger = file_logger("TRACE")
 
-_current_trace: Optional[Trace] = None
+# The trace being recorded. A context variable rather than a global, so
+# concurrent runs (asyncio tasks, threads started with a copied context) each
+# record into their own trace; plain threads start without one
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("agent_trace_current_trace", default=None)
+
+# A run as made current by ``start_run``: its trace and overhead account
+RunState = Tuple[Optional[Trace], Optional[overhead.OverheadAccount]]
+
+def current_trace() -> Optional[Trace]:
+    """The trace being recorded, if any."""
+    return _current_trace.get()
+
+def active_run() -> RunState:
+    """The current run, to make current again later with ``resume_run``."""
+    return _current_trace.get(), overhead.get_account()
+
+def _set_run(state: RunState) -> None:
+    _current_trace.set(state[0])
+    overhead.set_account(state[1])
+
+@contextmanager
+def resume_run(state: RunState):
+    """Make a run saved with ``active_run`` current for the block.
+
+    For code that keeps a run open across yields (a traced generator): the
+    caller's context is restored between resumptions, so it doesn't record
+    into the run while the generator is suspended.
+    """
+    previous = active_run()
+    _set_run(state)
+    try:
+        yield state[0]
+    finally:
+        _set_run(previous)
+
+def _decide(kind: str, name: str) -> Optional[Decision]:
+    """How to record a call to ``name``, or ``None`` to not record it
+    (tracing is off, or the call isn't sampled)."""
+    settings = get_config()
+    if not settings.enabled:
+        return None
+    decision = settings.decide(kind, name)
+    return decision if decision.sampled() else None
+
+def _capture(value: Any, level: str) -> Any:
+    """A payload as kept at a capture level (see ``config``)."""
+    if level == CAPTURE_FULL:
+        return snapshot(value)
+    if level == CAPTURE_METADATA:
+        return describe(value)
+    return None
+
+def _capture_inputs(inputs: Dict[str, Any], level: str) -> Dict[str, Any]:
+    if level == CAPTURE_FULL:
+        return snapshot(inputs)
+    if level == CAPTURE_METADATA:
+        return {key: describe(value) for key, value in inputs.items()}
+    return {}
+
+def _append_tool_step(
+    tool_name: str,
+    inputs: Dict[str, Any],
+    started_at: datetime,
+    duration_ms: float,
+    output: Any = None,
+    error: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    level: Optional[str] = CAPTURE_FULL,
+) -> None:
+    """Record a decorated call. ``inputs`` were already captured at
+    ``level`` before the call, so a tool mutating its arguments doesn't
+    change what was recorded."""
+    metrics.observe("tool", tool_name, duration_ms, error is not None)
+    current = _current_trace.get()
+    if current is None or level is None:
+        return
+    with overhead.capture():
+        step = ToolStep(
+            tool_name=tool_name,
+            inputs=inputs,
+            output=_capture(output, level),
+            error=error,
+            started_at=started_at,
+            duration_ms=duration_ms,
+            metadata=metadata or {},
+        )
+        current.steps.append(step)
+        if error is not None:
+            logger.error(f"Error in function: {tool_name}: {error}")
+        else:
+            logger.debug(f"Exiting function: {tool_name}")
+
+def trace(
+    func: Optional[Callable] = None,
+    tool_name: Optional[str] = None,
+    cache: Union[bool, CachePolicy, None] = None,
+) -> Callable:
+    """Decorator to trace tool execution.
+
+    With ``cache=True`` (or a ``CachePolicy``) results are memoized on the
+    tool's inputs; see ``agent_trace.core.cache``. Use as ``@trace`` or
+    ``@trace(tool_name=..., cache=...)``.
+    """
+    if func is None:
+        return lambda f: trace(f, tool_name=tool_name, cache=cache)
 
-def trace(func: Callable, tool_name: Optional[str] = None) -> Callable:
-    """Decorator to trace tool execution."""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        # Use provided tool_name if available, otherwise use function name
-        actual_name = tool_name or func.__name__
-        logger.debug(f"Entering function: {actual_name}")
-        
-        if _current_trace is None:
+        settings = get_config()
+        if not settings.enabled:
+            return func(*args, **kwargs)
+        capture = overhead.begin()
+        # Always paired with end(): a section left open would stop this
+        # thread's tracer time from being accounted
+        try:
+            # Use provided tool_name if available, otherwise use function name
+            actual_name = tool_name or func.__name__
+            logger.debug(f"Entering function: {actual_name}")
+            session = get_active_replay()
+            policy = resolve_policy(actual_name, cache)
+            # Capture level of this call, or None when it isn't recorded
+            level = None
+            if _current_trace.get() is not None:
+                decision = settings.decide("tool", actual_name)
+                level = decision.capture if decision.sampled() else None
+            traced = level is not None or session is not None or policy is not None
+            if traced:
+                inputs = {
+                    **{f"arg_{i}": arg for i, arg in enumerate(args)},
+                    **kwargs
+                }
+                # Snapshot before the call: tools may mutate their arguments
+                captured = _capture_inputs(inputs, level) if level is not None else {}
+                started_at = datetime.now()
+        finally:
+            overhead.end(capture)
+
+        if not traced:
             # No active trace, just execute the function
-            result = func(*args, **kwargs)
+            if not metrics.enabled():
+                result = func(*args, **kwargs)
+                logger.debug(f"Exiting function: {actual_name}")
+                return result
+            start_time = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                metrics.observe("tool", actual_name, (time.perf_counter() - start_time) * 1000, error=True)
+                raise
+            metrics.observe("tool", actual_name, (time.perf_counter() - start_time) * 1000)
             logger.debug(f"Exiting function: {actual_name}")
             return result
 
-        # Track timing and execute
-        start_time = time.time()
+        start_time = time.perf_counter()
+
+        recorded = session.lookup(actual_name, inputs) if session else None
+        if recorded is not None:
+            # Answer from the replayed trace instead of running the tool
+            _append_tool_step(
+                actual_name, captured, started_at,
+                (time.perf_counter() - start_time) * 1000,
+                output=recorded.output,
+                error=recorded.error,
+                metadata={"replay": {
+                    "trace_id": str(session.trace.trace_id),
+                    "recorded_duration_ms": recorded.duration_ms,
+                }},
+                level=level,
+            )
+            return replay_result(recorded)
+
+        metadata = None
+        if policy is not None:
+            try:
+                key = cache_key(actual_name, inputs, policy)
+            except Uncacheable as e:
+                logger.debug(f"Not caching {actual_name}: {e}")
+                metadata = {"cache": {"hit": False, "uncacheable": True}}
+                policy = None
+        if policy is not None:
+            tool_cache = get_tool_cache()
+            hit = tool_cache.get(key, policy)
+            if hit is not None:
+                duration_ms = (time.perf_counter() - start_time) * 1000
+                _append_tool_step(
+                    actual_name, captured, started_at, duration_ms,
+                    output=hit.value,
+                    metadata={"cache": {
+                        "hit": True,
+                        "tier": hit.tier,
+                        "saved_ms": max(0.0, (hit.duration_ms or 0.0) - duration_ms),
+                    }},
+                    level=level,
+                )
+                return hit.value
+            metadata = {"cache": {"hit": False}}
+            start_time = time.perf_counter()
+
         try:
             result = func(*args, **kwargs)
-            
-            # Create tool step after we have the result
-            step = ToolStep(
-                tool_name=actual_name,
-                inputs={
-                    **{f"arg_{i}": arg for i, arg in enumerate(args)},
-                    **kwargs
-                },
-                output=result,
-                duration_ms=(time.time() - start_time) * 1000
-            )
-            _current_trace.steps.append(step)
-            
-            logger.debug(f"Exiting function: {actual_name}")
-            return result
         except Exception as e:
-            # Create error step
-            step = ToolStep(
-                tool_name=actual_name,
-                inputs={
-                    **{f"arg_{i}": arg for i, arg in enumerate(args)},
-                    **kwargs
-                },
+            _append_tool_step(
+                actual_name, captured, started_at,
+                (time.perf_counter() - start_time) * 1000,
                 error=str(e),
-                duration_ms=(time.time() - start_time) * 1000
+                metadata=metadata,
+                level=level,
             )
-            _current_trace.steps.append(step)
-            logger.error(f"Error in function: {actual_name}: {e}")
             raise
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        if policy is not None:
+            tool_cache.put(key, actual_name, result, policy, duration_ms=duration_ms)
+        _append_tool_step(
+            actual_name, captured, started_at, duration_ms,
+            output=result,
+            metadata=metadata,
+            level=level,
+        )
+        return result
     
     # Set the name on the wrapper function
     wrapper.__name__ = tool_name or func.__name__
     return wrapper
 
+@accounted
 def log_tool_step(
     tool_name: str,
     inputs: Dict[str, Any],
@@ -72,22 +252,28 @@ def log_tool_step(
     metadata: Optional[Dict[str, Any]] = None
 ) -> Optional[ToolStep]:
     """Log a tool step to the current trace. Returns the created step for later updates."""
-    if _current_trace is None:
+    current = _current_trace.get()
+    if current is None:
         logger.debug(f"No active trace, skipping tool step: {tool_name}")
         return None
+    decision = _decide("tool", tool_name)
+    if decision is None:
+        logger.debug(f"Not recording tool step: {tool_name}")
+        return None
     
     step = ToolStep(
         tool_name=tool_name,
-        inputs=inputs,
-        output=output,
+        inputs=_capture_inputs(inputs, decision.capture),
+        output=_capture(output, decision.capture),
         error=error,
         duration_ms=duration_ms,
         metadata=metadata or {},
     )
-    _current_trace.steps.append(step)
+    current.steps.append(step)
     logger.debug(f"Created tool step: {tool_name}")
     return step
 
+@accounted
 def update_tool_step(
     step: ToolStep,
     output: Optional[Any] = None,
@@ -98,11 +284,12 @@ def update_tool_step(
     if duration_ms is not None:
         step.duration_ms = duration_ms
     if output is not None:
-        step.output = output
+        step.output = _capture(output, get_config().decide("tool", step.tool_name).capture)
     if error is not None:
         step.error = error
     logger.debug(f"Updated tool step: {step.tool_name}")
 
+@accounted
 def log_react_step(
     agent_name: str,
     thought: str,
@@ -111,22 +298,40 @@ def log_react_step(
     task_name: Optional[str] = None,
     metadata: Optional[Dict[str, Any]] = None
 ) -> None:
-    """Log a reasoning step to the current trace."""
-    if _current_trace is None:
+    """Log a reasoning step to the current trace.
+
+    Sampled and captured by the agent's rules: below ``full`` capture the
+    thought and observation are left out (at ``metadata``, their sizes are
+    kept in the step's metadata).
+    """
+    current = _current_trace.get()
+    if current is None:
         logger.debug(f"No active trace, skipping reasoning step: {thought}")
         return
+    decision = _decide("agent", agent_name)
+    if decision is None:
+        logger.debug(f"Not recording reasoning step of: {agent_name}")
+        return
 
+    metadata = dict(metadata or {})
+    if decision.capture != CAPTURE_FULL:
+        if decision.capture == CAPTURE_METADATA:
+            metadata["thought"] = describe(thought)
+            if observation is not None:
+                metadata["observation"] = describe(observation)
+        thought, observation = "", None
     step = ReasoningStep(
         thought=thought,
         action=action,
         observation=observation,
         agent_name=agent_name,
         task_name=task_name,
-        metadata=metadata or {}
+        metadata=metadata,
     )
-    _current_trace.steps.append(step)
+    current.steps.append(step)
     logger.debug(f"Added reasoning step: {thought}")
 
+@accounted
 def log_task_step(
     agent_name: str,
     task_name: str,
@@ -136,22 +341,28 @@ def log_task_step(
     metadata: Optional[Dict[str, Any]] = None
 ) -> Optional[TaskStep]:
     """Log a task step to the current trace. Returns the created step for later updates."""
-    if _current_trace is None:
+    current = _current_trace.get()
+    if current is None:
         logger.debug(f"No active trace, skipping task step: {task_name}")
         return None
+    decision = _decide("task", task_name)
+    if decision is None:
+        logger.debug(f"Not recording task step: {task_name}")
+        return None
     
     step = TaskStep(
         agent_name=agent_name,
         task_name=task_name,
-        result=result,
+        result=_capture(result, decision.capture),
         started_at=started_at,
         duration_ms=duration_ms,
         metadata=metadata or {},
     )
-    _current_trace.steps.append(step)
+    current.steps.append(step)
     logger.debug(f"Created task step: {task_name}")
     return step
 
+@accounted
 def update_task_step(
     step: TaskStep,
     result: Optional[Any] = None,
@@ -161,9 +372,10 @@ def update_task_step(
     if duration_ms is not None:
         step.duration_ms = duration_ms
     if result is not None:
-        step.result = result
+        step.result = _capture(result, get_config().decide("task", step.task_name or "").capture)
     logger.debug(f"Updated task step: {step.task_name}")
 
+@accounted
 def log_agent_step(
     agent_name: str,
     started_at: str,
@@ -172,22 +384,28 @@ def log_agent_step(
     metadata: Optional[Dict[str, Any]] = None
 ) -> Optional[AgentStep]:
     """Log an agent step to the current trace. Returns the created step for later updates."""
-    if _current_trace is None:
+    current = _current_trace.get()
+    if current is None:
         logger.debug(f"No active trace, skipping agent step: {agent_name}")
         return None
+    decision = _decide("agent", agent_name)
+    if decision is None:
+        logger.debug(f"Not recording agent step: {agent_name}")
+        return None
 
     # Create the step at the beginning
     step = AgentStep(
         agent_name=agent_name,
         started_at=started_at,
         duration_ms=duration_ms,  # Initialize with provided value or 0
-        result=result,  # Initialize with provided value or None
+        result=_capture(result, decision.capture),  # Initialize with provided value or None
         metadata=metadata or {},
     )
-    _current_trace.steps.append(step)
+    current.steps.append(step)
     logger.debug(f"Created agent step: {agent_name}")
     return step
 
+@accounted
 def update_agent_step(
     step: AgentStep,
     result: Optional[Any] = None,
@@ -197,24 +415,49 @@ def update_agent_step(
     if duration_ms is not None:
         step.duration_ms = duration_ms
     if result is not None:
-        step.result = result
+        step.result = _capture(result, get_config().decide("agent", step.agent_name or "").capture)
     logger.debug(f"Updated agent step: {step.agent_name}")
 
+def _cache_summary(trace: Trace) -> Optional[Dict[str, Any]]:
+    """Hits, misses and latency saved by the tool cache during a run."""
+    results = [
+        step.metadata["cache"] for step in trace.steps
+        if isinstance(step, ToolStep) and "cache" in step.metadata
+    ]
+    if not results:
+        return None
+    hits = [r for r in results if r["hit"]]
+    return {
+        "hits": len(hits),
+        "misses": len(results) - len(hits),
+        "saved_ms": round(sum(r["saved_ms"] for r in hits), 3),
+    }
+
 @contextmanager
 def start_run(name: str, metadata: Optional[dict] = None):
     """Context manager to start a new trace."""
-    global _current_trace
+    trace = Trace(name=name, metadata=metadata or {})
+    if not get_config().enabled:
+        # Tracing is switched off: nothing is recorded or saved
+        yield trace
+        return
     logger.info(f"Starting trace run: {name}")
     
-    trace = Trace(name=name, metadata=metadata or {})
-    previous_trace = _current_trace
-    _current_trace = trace
+    previous_trace = _current_trace.get()
+    previous_account = overhead.start_account()
+    _current_trace.set(trace)
     
     try:
         yield trace
     finally:
-        from datetime import datetime
         trace.ended_at = datetime.now()
-        _current_trace = previous_trace
+        _current_trace.set(previous_trace)
+        account = overhead.finish_account(previous_account)
+        trace.metadata[overhead.OVERHEAD_KEY] = account.summary(
+            len(trace.steps), trace.duration_ms
+        )
+        cache_stats = _cache_summary(trace)
+        if cache_stats:
+            trace.metadata["tool_cache"] = cache_stats
         save_trace(trace)
-        logger.info(f"Completed trace run: {name}")
\ No newline at end of file
+        logger.info(f"Completed trace run: {name}")
@@ -1,9 +1,34 @@
 import logging
+import os
 import sys
+import threading
+import time
 from pathlib import Path
 
+_emit_time = threading.local()
+
+
+class TimedFileHandler(logging.FileHandler):
+    """FileHandler that keeps a per-thread total of time spent writing records."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        start = time.perf_counter()
+        try:
+            super().emit(record)
+        finally:
+            _emit_time.seconds = logging_seconds() + time.perf_counter() - start
+
+
+def logging_seconds() -> float:
+    """Total seconds this thread has spent in file log handlers."""
+    return getattr(_emit_time, "seconds", 0.0)
+
+
 def file_logger(name: str, filename: str = "run.log", level: int = logging.DEBUG) -> logging.Logger:
-    """Set up and return a logger with both console and file output."""
+    """Set up and return a logger with both console and file output.
+
+    Files go to ``logs/`` in the working directory, or to ``AGENT_TRACE_LOG_DIR``.
+    """
     # Create logger
     logger = logging.getLogger(name)
     logger.propagate = False  # Prevent propagation to root logger
@@ -20,9 +45,9 @@ def file_logger(name: str, filename: str = "run.log", level: int = logging.DEBUG
     )
     
     # File handler
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    file_handler = logging.FileHandler(log_dir / filename, mode='a')  # Added mode='w' to overwrite
+    log_dir = Path(os.environ.get("AGENT_TRACE_LOG_DIR", "logs"))
+    log_dir.mkdir(parents=True, exist_ok=True)
+    file_handler = TimedFileHandler(log_dir / filename, mode='a')  # Added mode='w' to overwrite
     file_handler.setLevel(level)
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
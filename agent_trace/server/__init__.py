@@ -0,0 +1 @@
+"""Local HTTP trace browser (``agent-trace serve``)."""
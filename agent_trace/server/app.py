@@ -0,0 +1,332 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+from uuid import UUID
+
+from agent_trace.core import metrics
+from agent_trace.core.schema import TraceSummary
+from agent_trace.core.serialize import dumps
+from agent_trace.core.store import PAGE_SIZE, list_trace_summaries, load_trace_document, open_step_columns
+
+from agent_trace.logging.logger import file_logger
+logger = file_logger("SERVER")
+
+STATIC_DIR = Path(__file__).parent / "static"
+DEFAULT_PORT = 8765
+DEFAULT_PAGE = 50
+MAX_PAGE = 500
+DEFAULT_STEP_WINDOW = 200
+MAX_STEP_WINDOW = 5000
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+REFRESH_INTERVAL_S = 5.0
+
+
+class BadRequest(ValueError):
+    """A request parameter that can't be used; answered with HTTP 400."""
+
+
+class NotFound(LookupError):
+    """Answered with HTTP 404."""
+
+
+class SummaryIndex:
+    """Every stored trace's summary, held in memory in save order.
+
+    A trace's position never changes once indexed, so positions serve as
+    pagination cursors that stay valid while new traces arrive. New traces
+    are picked up by reading the newest summaries until a known one is met,
+    at most every ``refresh_interval_s``.
+    """
+
+    def __init__(self, refresh_interval_s: float = REFRESH_INTERVAL_S):
+        self.refresh_interval_s = refresh_interval_s
+        self._summaries: List[TraceSummary] = []  # oldest first
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._refreshed_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def get(self, trace_id: str) -> Optional[TraceSummary]:
+        position = self._ids.get(trace_id)
+        return None if position is None else self._summaries[position]
+
+    def refresh(self, force: bool = False) -> int:
+        """Index traces saved since the last refresh. Returns how many."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval_s:
+                return 0
+            # Everything in one pass at first; later, newest pages until a
+            # trace we already have
+            new = list_trace_summaries() if not self._ids else self._newer_summaries()
+            for summary in reversed(new):
+                self._ids[str(summary.trace_id)] = len(self._summaries)
+                self._summaries.append(summary)
+            self._refreshed_at = time.monotonic()
+        if new:
+            logger.info(f"Indexed {len(new)} new traces ({len(self._summaries)} total)")
+        return len(new)
+
+    def _newer_summaries(self) -> List[TraceSummary]:
+        new: List[TraceSummary] = []
+        offset = 0
+        while True:
+            page = list_trace_summaries(limit=PAGE_SIZE, offset=offset)
+            for summary in page:
+                if str(summary.trace_id) in self._ids:
+                    return new
+                new.append(summary)
+            if len(page) < PAGE_SIZE:
+                return new
+            offset += PAGE_SIZE
+
+    def rebuild(self) -> int:
+        """Forget everything (e.g. after deletions) and index from scratch."""
+        with self._lock:
+            self._summaries = []
+            self._ids = {}
+        return self.refresh(force=True)
+
+    def page(
+        self,
+        where: Callable[[TraceSummary], bool],
+        cursor: Optional[int] = None,
+        limit: int = DEFAULT_PAGE,
+    ) -> Tuple[List[TraceSummary], Optional[int]]:
+        """Up to ``limit`` matching summaries, newest first, starting below
+        position ``cursor``. Returns them and the cursor of the next page."""
+        summaries = self._summaries
+        position = len(summaries) if cursor is None else min(cursor, len(summaries))
+        found = []
+        while position > 0 and len(found) < limit:
+            position -= 1
+            if where(summaries[position]):
+                found.append(summaries[position])
+        return found, (position if position > 0 and len(found) == limit else None)
+
+
+class DocumentCache:
+    """Least recently used parsed trace documents, up to ``max_bytes`` of
+    stored JSON."""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._docs: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def get(self, trace_id: str, size: Optional[int] = None) -> Dict[str, Any]:
+        """The parsed document of a trace, loading it on a miss. ``size`` is
+        its stored size if known."""
+        with self._lock:
+            entry = self._docs.get(trace_id)
+            if entry is not None:
+                self._docs.move_to_end(trace_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        try:
+            doc = load_trace_document(trace_id)
+        except FileNotFoundError:
+            raise NotFound(f"No trace found for '{trace_id}'")
+        size = size or len(dumps(doc))
+        with self._lock:
+            if trace_id not in self._docs and size <= self.max_bytes:
+                self._docs[trace_id] = (doc, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, evicted) = self._docs.popitem(last=False)
+                    self.bytes -= evicted
+        return doc
+
+
+def _param(query: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[-1] if values and values[-1] != "" else None
+
+
+def _int_param(query, name: str, default: Optional[int], low: int = 0, high: Optional[int] = None) -> Optional[int]:
+    value = _param(query, name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an integer")
+    if number < low:
+        raise BadRequest(f"'{name}' must be at least {low}")
+    return min(number, high) if high is not None else number
+
+
+def _datetime_param(query, name: str) -> Optional[datetime]:
+    value = _param(query, name)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise BadRequest(f"'{name}' must be an ISO date or datetime")
+
+
+def _summary_json(summary: TraceSummary) -> Dict[str, Any]:
+    return {**summary.model_dump(mode="json"), "duration_ms": summary.duration_ms}
+
+
+class TraceBrowser:
+    """The JSON API behind ``agent-trace serve``, independent of HTTP.
+
+    ``handle(path, query)`` returns a status, content type and body.
+    """
+
+    def __init__(self, cache_bytes: int = DEFAULT_CACHE_BYTES, refresh_interval_s: float = REFRESH_INTERVAL_S):
+        self.index = SummaryIndex(refresh_interval_s)
+        self.cache = DocumentCache(cache_bytes)
+
+    def handle(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, str, bytes]:
+        try:
+            if path == "/api/traces":
+                return self._json(self.list_traces(query))
+            if path.startswith("/api/traces/"):
+                return self._json(self.get_trace(unquote(path[len("/api/traces/"):]), query))
+            if path == "/api/stats":
+                return self._json(self.stats(query))
+            if path == "/api/reload":
+                return self._json({"indexed": self.index.rebuild()})
+            if path == metrics.METRICS_PATH:
+                return 200, metrics.CONTENT_TYPE, metrics.get_registry().render_prometheus().encode()
+            if path in ("/", "/index.html"):
+                return 200, "text/html; charset=utf-8", (STATIC_DIR / "index.html").read_bytes()
+            raise NotFound(f"No such path '{path}'")
+        except BadRequest as e:
+            return self._json({"error": str(e)}, 400)
+        except NotFound as e:
+            return self._json({"error": str(e)}, 404)
+
+    @staticmethod
+    def _json(body: Any, status: int = 200) -> Tuple[int, str, bytes]:
+        return status, "application/json", dumps(body)
+
+    def list_traces(self, query) -> Dict[str, Any]:
+        """``GET /api/traces?name=&tool=&errors=1&anomalies=1&since=&until=&cursor=&limit=``"""
+        name = _param(query, "name")
+        tool = _param(query, "tool")
+        errors_only = _param(query, "errors") in ("1", "true")
+        anomalies_only = _param(query, "anomalies") in ("1", "true")
+        since = _datetime_param(query, "since")
+        until = _datetime_param(query, "until")
+        cursor = _int_param(query, "cursor", None)
+        limit = _int_param(query, "limit", DEFAULT_PAGE, low=1, high=MAX_PAGE)
+
+        def where(summary: TraceSummary) -> bool:
+            if name and name not in summary.name:
+                return False
+            if tool and tool not in summary.tools:
+                return False
+            if errors_only and not summary.error_count:
+                return False
+            if anomalies_only and not summary.anomaly_count:
+                return False
+            if since and summary.started_at < since:
+                return False
+            if until and summary.started_at > until:
+                return False
+            return True
+
+        if cursor is None:
+            # Only the first page looks for new traces, so later pages of the
+            # same listing are consistent
+            self.index.refresh()
+        summaries, next_cursor = self.index.page(where, cursor, limit)
+        return {
+            "traces": [_summary_json(s) for s in summaries],
+            "next_cursor": next_cursor,
+            "indexed": len(self.index),
+        }
+
+    def get_trace(self, trace_id: str, query) -> Dict[str, Any]:
+        """``GET /api/traces/<id>?start=&limit=``: the trace's header and one
+        window of its steps."""
+        start = _int_param(query, "start", 0)
+        limit = _int_param(query, "limit", DEFAULT_STEP_WINDOW, low=1, high=MAX_STEP_WINDOW)
+        try:
+            # Only IDs: ``load_trace_document`` would also read file paths
+            trace_id = str(UUID(trace_id))
+        except ValueError:
+            raise NotFound(f"No trace found for '{trace_id}'")
+        summary = self.index.get(trace_id)
+        doc = self.cache.get(trace_id, summary.bytes if summary else None)
+        steps = doc.get("steps", [])
+        header = {k: v for k, v in doc.items() if k not in ("steps", "summary")}
+        return {
+            "trace": header,
+            "summary": _summary_json(summary or TraceSummary.from_document(doc)),
+            "steps": steps[start:start + limit],
+            "start": start,
+            "total_steps": len(steps),
+        }
+
+    def stats(self, query) -> Dict[str, Any]:
+        """``GET /api/stats?kind=&trace_name=&since=&until=&limit=``, from the
+        step columns."""
+        kind = _param(query, "kind") or "tool"
+        if kind not in ("tool", "agent", "task"):
+            raise BadRequest("'kind' must be tool, agent or task")
+        limit = _int_param(query, "limit", 50, low=1)
+        columns = open_step_columns()
+        mask = columns.select(
+            kind=kind,
+            trace_name=_param(query, "trace_name"),
+            since=_datetime_param(query, "since"),
+            until=_datetime_param(query, "until"),
+        )
+        return {
+            "kind": kind,
+            "steps": int(mask.sum()),
+            "traces": columns.live_traces,
+            "rows": columns.group_stats(mask)[:limit],
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    browser: TraceBrowser
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            status, content_type, body = self.browser.handle(url.path, parse_qs(url.query))
+        except Exception as e:
+            logger.error(f"Error serving {self.path}: {e}")
+            status, content_type, body = 500, "application/json", dumps({"error": str(e)})
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def make_server(
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    browser: Optional[TraceBrowser] = None,
+) -> ThreadingHTTPServer:
+    """An HTTP server for the trace browser; call ``serve_forever()`` on it.
+    Port 0 picks a free port (see ``server.server_address``)."""
+    handler = type("TraceBrowserHandler", (_Handler,), {"browser": browser or TraceBrowser()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
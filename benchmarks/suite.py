@@ -0,0 +1,343 @@
+"""Benchmarks for tracer overhead and trace store scalability.
+
+Run standalone::
+
+    python -m benchmarks.suite --sizes 1000 10000 --output bench.json
+    python -m benchmarks.suite --baseline bench.json --threshold 0.2
+
+or through pytest (small sizes)::
+
+    pytest benchmarks
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from agent_trace.adapters.base.agents import AgentTrace
+from agent_trace.adapters.base.tasks import TaskTrace
+from agent_trace.adapters.base.tools import ToolTrace
+from agent_trace.core.columns import ColumnStore
+from agent_trace.core.overhead import OVERHEAD_KEY
+from agent_trace.core.schema import ReasoningStep, ToolStep, Trace
+from agent_trace.core.serialize import dumps, snapshot
+from agent_trace.core.store import (
+    iter_trace_documents, list_trace_summaries, list_traces, load_trace, load_trace_lazy,
+    open_step_columns, save_trace, save_traces,
+)
+from agent_trace.core.sidecars import flush_sidecars
+from agent_trace.core.trace import start_run, trace
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_ENGINES = ("files", "segments", "sqlite")
+DEFAULT_THRESHOLD = 0.2
+
+Results = Dict[str, Dict[str, object]]
+
+
+def measure(fn: Callable[[], object], number: int, repeat: int = 3) -> float:
+    """Best-of-``repeat`` seconds per call of ``fn`` over ``number`` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def record(results: Results, name: str, value: float, unit: str, higher_is_better: bool = False) -> None:
+    results[name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+@contextlib.contextmanager
+def trace_env(engine: str = "memory", search: bool = False, **env: str) -> Iterator[Path]:
+    """Point the store at a fresh temporary directory and engine, with any
+    other ``AGENT_TRACE_*`` settings given as keyword arguments."""
+    settings = {"AGENT_TRACE_STORAGE": engine, "AGENT_TRACE_SEARCH": "1" if search else "0"}
+    settings.update({f"AGENT_TRACE_{key.upper()}": value for key, value in env.items()})
+    saved = {k: os.environ.get(k) for k in ("AGENT_TRACE_DIR", *settings)}
+    with tempfile.TemporaryDirectory(prefix="agent-trace-bench-") as tmp:
+        os.environ["AGENT_TRACE_DIR"] = tmp
+        os.environ.update(settings)
+        try:
+            yield Path(tmp)
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+
+
+def make_trace(steps: int, payload_bytes: int = 64, name: str = "bench") -> Trace:
+    """A synthetic trace of alternating tool and reasoning steps."""
+    payload = "x" * payload_bytes
+    return Trace(
+        name=name,
+        steps=[
+            ToolStep(tool_name=f"tool_{i % 5}", inputs={"query": payload}, output=payload, duration_ms=1.0)
+            if i % 2 == 0 else
+            ReasoningStep(thought=payload, agent_name="agent", duration_ms=1.0)
+            for i in range(steps)
+        ],
+        ended_at=datetime.now(),
+    )
+
+
+class _BenchToolTrace(ToolTrace):
+    def get_tool_name(self, tool) -> str:
+        return tool.__name__
+
+    def is_class_based_tool(self, tool) -> bool:
+        return False
+
+    def get_original_execute_method(self, tool):
+        return tool
+
+    def set_execute_method(self, tool, new_method):
+        return new_method
+
+
+class _BenchAgent:
+    role = "bench-agent"
+    description = "bench-task"
+    agent = None
+
+    def execute(self, value):
+        return value
+
+
+_BenchAgent.agent = _BenchAgent()
+
+
+class _BenchAgentTrace(AgentTrace):
+    def get_agent_name(self, agent_instance) -> str:
+        return agent_instance.role
+
+    def get_original_execute_method(self):
+        return _BenchAgent.execute
+
+    def set_execute_method(self, new_method):
+        self.traced = new_method
+
+
+class _BenchTaskTrace(TaskTrace):
+    def get_agent_name(self, task_instance) -> str:
+        return task_instance.agent.role
+
+    def get_task_name(self, task_instance) -> str:
+        return task_instance.description
+
+    def get_original_execute_method(self):
+        return _BenchAgent.execute
+
+    def set_execute_method(self, new_method):
+        self.traced = new_method
+
+
+def bench_tracer_overhead(results: Results, calls: int = 2000) -> None:
+    """Per-call cost of the trace decorator and the base adapter wrappers."""
+    def noop(value):
+        return value
+
+    traced_noop = trace(noop)
+    tool_wrapper = _BenchToolTrace().trace(noop)
+    # Built directly rather than through trace(), which patches a target once per process
+    agent_wrapper = _BenchAgentTrace().create_traced_execute(_BenchAgent.execute)
+    task_wrapper = _BenchTaskTrace().create_traced_execute(_BenchAgent.execute)
+    instance = _BenchAgent()
+
+    wrappers = {
+        "decorator": lambda: traced_noop(1),
+        "tool_wrapper": lambda: tool_wrapper(1),
+        "agent_wrapper": lambda: agent_wrapper(instance, 1),
+        "task_wrapper": lambda: task_wrapper(instance, 1),
+    }
+    baseline = measure(lambda: noop(1), calls)
+    record(results, "overhead.baseline_call", baseline * 1e6, "us/call")
+
+    with trace_env("memory"):
+        for name, call in wrappers.items():
+            record(results, f"overhead.{name}.off", measure(call, calls) * 1e6, "us/call")
+            with start_run("bench-overhead") as run:
+                per_call = measure(call, calls)
+                run.steps.clear()
+            record(results, f"overhead.{name}.on", per_call * 1e6, "us/call")
+
+
+def bench_save_throughput(results: Results, engines: Sequence[str] = DEFAULT_ENGINES, count: int = 200) -> None:
+    """save_trace throughput for small and large traces on each engine."""
+    shapes = {"small": (10, 64), "large": (1000, 1024)}
+    for engine in engines:
+        for shape, (steps, payload) in shapes.items():
+            traces = [make_trace(steps, payload) for _ in range(count if shape == "small" else max(1, count // 20))]
+            with trace_env(engine):
+                start = time.perf_counter()
+                for t in traces:
+                    save_trace(t)
+                elapsed = time.perf_counter() - start
+            record(results, f"save.{engine}.{shape}", len(traces) / elapsed, "traces/s", higher_is_better=True)
+
+
+def bench_sidecars(results: Results, count: int = 200) -> None:
+    """save_trace throughput with the search index, step columns, baselines
+    and overhead ledger off, written on every save, and batched."""
+    modes = {
+        "off": dict(search=False, columns="0", baselines="0", overhead="0"),
+        "sync": dict(search=True, sidecar_interval="0"),
+        "batched": dict(search=True),
+    }
+    for mode, env in modes.items():
+        traces = [make_trace(10, 64) for _ in range(count)]
+        for t in traces:
+            t.metadata[OVERHEAD_KEY] = {"capture_ms": 0.1, "steps_captured": 10}
+        with trace_env("files", **env):
+            open_step_columns()
+            start = time.perf_counter()
+            for t in traces:
+                save_trace(t)
+            # Batched writes count, not just queueing them
+            flush_sidecars()
+            elapsed = time.perf_counter() - start
+        record(results, f"save.sidecars.{mode}", count / elapsed, "traces/s", higher_is_better=True)
+
+
+def bench_store_scaling(results: Results, sizes: Sequence[int] = DEFAULT_SIZES,
+                        engines: Sequence[str] = DEFAULT_ENGINES, batch: int = 1000) -> None:
+    """list_traces/load_trace latency over stores of increasing size."""
+    for engine in engines:
+        for size in sizes:
+            with trace_env(engine):
+                ids = []
+                for start in range(0, size, batch):
+                    chunk = [make_trace(5, name=f"bench-{i}") for i in range(start, min(size, start + batch))]
+                    save_traces(chunk)
+                    ids.append(str(chunk[-1].trace_id))
+                target = ids[len(ids) // 2]
+                record(results, f"list.{engine}.{size}.limit10",
+                       measure(lambda: list_traces(limit=10), 3, repeat=1) * 1e3, "ms")
+                record(results, f"list.{engine}.{size}.summaries",
+                       measure(lambda: list_trace_summaries(limit=10), 3, repeat=1) * 1e3, "ms")
+                record(results, f"list.{engine}.{size}.name_miss",
+                       measure(lambda: list_traces(limit=10, name_filter="no-such-trace"), 1, repeat=1) * 1e3, "ms")
+                record(results, f"scan.{engine}.{size}.all",
+                       measure(lambda: sum(1 for _ in iter_trace_documents()), 1, repeat=1) * 1e3, "ms")
+                record(results, f"load.{engine}.{size}.by_id",
+                       measure(lambda: load_trace(target), 5, repeat=1) * 1e3, "ms")
+
+
+def bench_serialization(results: Results, calls: int = 20) -> None:
+    """Capture-time snapshot cost and stdlib json vs ``dumps`` on a large trace."""
+    payload = {
+        "rows": [{"id": i, "name": f"row-{i}", "score": i / 7, "tags": ["a", "b"]} for i in range(2000)],
+        "text": "x" * 50_000,
+        "nested": {"a": {"b": {"c": {"d": list(range(100))}}}},
+    }
+    record(results, "serialize.snapshot", measure(lambda: snapshot(payload), calls) * 1e3, "ms")
+    data = make_trace(1000, 1024).model_dump()
+    record(results, "serialize.json", measure(lambda: json.dumps(data, default=str), calls) * 1e3, "ms")
+    record(results, "serialize.dumps", measure(lambda: dumps(data), calls) * 1e3, "ms")
+
+
+def bench_loading(results: Results, steps: int = 10000) -> None:
+    """load_trace of one large trace: validated, trusted and lazily."""
+    with trace_env("files"):
+        path = save_trace(make_trace(steps, 256))
+        record(results, "load.large.strict", measure(lambda: load_trace(path, strict=True), 1) * 1e3, "ms")
+        record(results, "load.large.trusted", measure(lambda: load_trace(path), 1) * 1e3, "ms")
+        record(results, "load.large.lazy_window", measure(lambda: load_trace_lazy(path).steps[:50], 1) * 1e3, "ms")
+
+
+def bench_columns(results: Results, steps: int = 100_000) -> None:
+    """Appending to the step columns and a per-tool aggregation over them."""
+    traces = [make_trace(100, 64) for _ in range(steps // 100)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ColumnStore(Path(tmp))
+        start = time.perf_counter()
+        for i in range(0, len(traces), 100):
+            store.append(traces[i:i + 100])
+        record(results, "columns.append", steps / (time.perf_counter() - start), "steps/s", higher_is_better=True)
+        columns = store.open()
+        record(results, "columns.group_stats",
+               measure(lambda: columns.group_stats(columns.select(kind="tool")), 3) * 1e3, "ms")
+
+
+def run_suite(sizes: Sequence[int] = DEFAULT_SIZES, engines: Sequence[str] = DEFAULT_ENGINES,
+              calls: int = 2000, saves: int = 200) -> dict:
+    """Run every benchmark and return the results document."""
+    results: Results = {}
+    bench_tracer_overhead(results, calls=calls)
+    bench_save_throughput(results, engines=engines, count=saves)
+    bench_sidecars(results, count=saves)
+    bench_store_scaling(results, sizes=sizes, engines=engines)
+    bench_serialization(results)
+    bench_loading(results)
+    bench_columns(results)
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "sizes": list(sizes),
+            "engines": list(engines),
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than ``threshold``."""
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = current["results"].get(name)
+        if cur is None or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = -change if base["higher_is_better"] else change
+        if worse > threshold:
+            regressions.append(
+                f"{name}: {base['value']:.3g} → {cur['value']:.3g} {cur['unit']} ({worse:+.0%} worse)"
+            )
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="agent-trace benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="store sizes for list/load benchmarks (e.g. 1000 10000 100000)")
+    parser.add_argument("--engines", nargs="+", default=list(DEFAULT_ENGINES))
+    parser.add_argument("--calls", type=int, default=2000, help="calls per overhead measurement")
+    parser.add_argument("--saves", type=int, default=200, help="small traces per save measurement")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="compare against a previous results JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that counts as a regression (default 0.2)")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.sizes, args.engines, calls=args.calls, saves=args.saves)
+    for name, result in current["results"].items():
+        print(f"{name:<40} {result['value']:>12.3f} {result['unit']}")
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+        print(f"\nSaved results to {args.output}")
+    if args.baseline:
+        regressions = compare_to_baseline(current, json.loads(args.baseline.read_text()), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.suite import compare_to_baseline, main, run_suite
+
+# Small enough to run with the regular suite; use the standalone runner
+# (python -m benchmarks.suite --sizes 1000 10000 100000) for real numbers.
+SIZES = [int(s) for s in os.getenv("AGENT_TRACE_BENCH_SIZES", "200").split(",")]
+
+
+@pytest.fixture(scope="module")
+def results():
+    return run_suite(sizes=SIZES, calls=200, saves=20)
+
+
+def test_suite_covers_every_metric(results):
+    names = set(results["results"])
+    for wrapper in ("decorator", "tool_wrapper", "agent_wrapper", "task_wrapper"):
+        assert f"overhead.{wrapper}.off" in names
+        assert f"overhead.{wrapper}.on" in names
+    for engine in ("files", "segments", "sqlite"):
+        assert {f"save.{engine}.small", f"save.{engine}.large"} <= names
+        for size in SIZES:
+            assert f"list.{engine}.{size}.limit10" in names
+            assert f"load.{engine}.{size}.by_id" in names
+    assert {"serialize.snapshot", "serialize.json", "serialize.dumps"} <= names
+    assert {"load.large.strict", "load.large.trusted", "load.large.lazy_window"} <= names
+    assert {"columns.append", "columns.group_stats"} <= names
+    assert {"save.sidecars.off", "save.sidecars.sync", "save.sidecars.batched"} <= names
+    assert all(r["value"] > 0 for r in results["results"].values())
+
+
+def test_results_against_self_have_no_regressions(results):
+    assert compare_to_baseline(results, results) == []
+
+
+def test_compare_to_baseline_respects_direction():
+    baseline = {"results": {
+        "latency": {"value": 10.0, "unit": "ms", "higher_is_better": False},
+        "throughput": {"value": 100.0, "unit": "traces/s", "higher_is_better": True},
+    }}
+    current = {"results": {
+        "latency": {"value": 11.0, "unit": "ms", "higher_is_better": False},
+        "throughput": {"value": 70.0, "unit": "traces/s", "higher_is_better": True},
+    }}
+    regressions = compare_to_baseline(current, baseline, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("throughput")
+
+
+def test_standalone_runner_writes_and_compares(tmp_path, capsys):
+    output = tmp_path / "bench.json"
+    args = ["--sizes", "50", "--engines", "sqlite", "--calls", "50", "--saves", "5"]
+    assert main(args + ["--output", str(output)]) == 0
+    saved = json.loads(output.read_text())
+    assert "list.sqlite.50.limit10" in saved["results"]
+
+    # A baseline that is impossibly fast flags every latency metric
+    for result in saved["results"].values():
+        result["value"] = result["value"] * 1000 if result["higher_is_better"] else result["value"] / 1000
+    output.write_text(json.dumps(saved))
+    assert main(args + ["--baseline", str(output)]) == 1
+    assert "regression(s)" in capsys.readouterr().out
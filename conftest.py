@@ -0,0 +1,19 @@
+"""Keep the loggers of the code under test out of the working tree."""
+import os
+import shutil
+import tempfile
+
+_log_dir = None
+
+
+def pytest_configure(config):
+    global _log_dir
+    if "AGENT_TRACE_LOG_DIR" not in os.environ:
+        _log_dir = tempfile.mkdtemp(prefix="agent-trace-logs-")
+        os.environ["AGENT_TRACE_LOG_DIR"] = _log_dir
+
+
+def pytest_unconfigure(config):
+    if _log_dir is not None:
+        os.environ.pop("AGENT_TRACE_LOG_DIR", None)
+        shutil.rmtree(_log_dir, ignore_errors=True)
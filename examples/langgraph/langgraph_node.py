@@ -1,14 +1,12 @@
 from typing import TypedDict
 from agent_trace.core.trace import start_run
 from langgraph.graph import StateGraph
-from agent_trace.adapters.langgraph.agents import patch_langgraph_node
-from agent_trace.adapters.langgraph.tools import patch_langgraph_tools
+from agent_trace.adapters.langgraph.graph import patch_langgraph
 from agent_trace.logging.logger import file_logger
 
 logger = file_logger("LANGGRAPH_NODE_EXAMPLE")
-# Patch LangGraph to trace nodes
-patch_langgraph_node()
-patch_langgraph_tools()
+# Patch LangGraph to trace nodes; each invoke/stream outside a run opens one
+patch_langgraph()
 # Define the shared state schema
 class AppState(TypedDict):
     topic: str
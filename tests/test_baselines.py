@@ -0,0 +1,103 @@
+"""Tests for latency baselines and slow-step flagging."""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.cli.main import cli
+from agent_trace.core.baselines import Baseline, BaselineStore
+from agent_trace.core.schema import ANOMALY_KEY, AgentStep, ReasoningStep, ToolStep, Trace
+from agent_trace.core.store import get_baseline_store, list_trace_summaries, load_trace, save_trace, save_traces
+
+
+def make_trace(name: str, durations, agent_ms=None) -> Trace:
+    start = datetime(2025, 1, 1)
+    steps = [
+        ToolStep(tool_name="search", inputs={"i": i}, duration_ms=d, started_at=start + timedelta(seconds=i))
+        for i, d in enumerate(durations)
+    ]
+    steps.append(ReasoningStep(thought="hmm", duration_ms=5000.0))
+    if agent_ms is not None:
+        steps.append(AgentStep(agent_name="planner", duration_ms=agent_ms))
+    return Trace(name=name, started_at=start, steps=steps)
+
+
+@pytest.fixture
+def traces_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    return tmp_path
+
+
+def test_baseline_rolls_over_windows():
+    baseline = Baseline(window=100)
+    for _ in range(150):
+        baseline.add(10.0)
+    assert baseline.count == 150
+    assert 10.0 <= baseline.quantile(0.99) <= 12.0
+    # After two more windows of slow calls the fast ones are forgotten
+    for _ in range(200):
+        baseline.add(1000.0)
+    assert baseline.count == 150
+    assert baseline.quantile(0.01) == pytest.approx(1000.0)
+    restored = Baseline.from_dict(baseline.to_dict(), window=100)
+    assert restored.count == baseline.count and restored.quantile(0.5) == baseline.quantile(0.5)
+
+
+def test_flags_steps_slower_than_p99(tmp_path):
+    store = BaselineStore(tmp_path, min_samples=20)
+    warmup = make_trace("warmup", [50.0 + i % 10 for i in range(19)])
+    assert store.update([warmup]) == 0
+
+    # Not enough samples yet to judge; now there are
+    early = make_trace("early", [900.0])
+    assert store.update([early]) == 0
+    assert ANOMALY_KEY not in early.steps[0].metadata
+
+    run = make_trace("run", [55.0, 4000.0, 3000.0])
+    assert store.update([run]) == 2
+    assert ANOMALY_KEY not in run.steps[0].metadata
+    flagged = run.steps[1].metadata[ANOMALY_KEY]
+    assert 59.0 <= flagged["p99_ms"] <= 900.0
+    assert flagged["ratio"] == pytest.approx(4000.0 / flagged["p99_ms"], rel=0.01)
+    # Reasoning steps have no baseline
+    assert ANOMALY_KEY not in run.steps[-1].metadata
+    assert set(store.load()) == {("tool", "search")}
+
+
+def test_save_trace_annotates_and_summarizes(traces_env):
+    save_traces([make_trace(f"warmup-{i}", [100.0] * 10, agent_ms=500.0) for i in range(30)])
+    assert set(get_baseline_store().load()) == {("tool", "search"), ("agent", "planner")}
+    slow = make_trace("slow-run", [100.0, 2500.0], agent_ms=9000.0)
+    save_trace(slow)
+    save_trace(make_trace("fine-run", [100.0]))
+
+    stored = load_trace(str(slow.trace_id))
+    assert ANOMALY_KEY in stored.steps[1].metadata
+    assert ANOMALY_KEY in stored.steps[-1].metadata
+    summaries = list_trace_summaries(where=lambda s: s.anomaly_count > 0)
+    assert [(s.name, s.anomaly_count) for s in summaries] == [("slow-run", 2)]
+
+
+def test_cli_filters_and_highlights(traces_env):
+    save_traces([make_trace(f"warmup-{i}", [100.0] * 10) for i in range(5)])
+    save_trace(make_trace("slow-run", [2500.0]))
+    save_trace(make_trace("fine-run", [100.0]))
+    runner = CliRunner()
+
+    result = runner.invoke(cli, ["list", "--anomalies"])
+    assert result.exit_code == 0, result.output
+    assert "slow-run" in result.output and "fine-run" not in result.output
+    assert "1 slow" in result.output
+
+    result = runner.invoke(cli, ["view", "--anomalies"])
+    assert result.exit_code == 0, result.output
+    assert "slow-run" in result.output and "warmup" not in result.output
+    assert "slower than p99" in result.output
+
+
+def test_disabled(traces_env, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_BASELINES", "0")
+    save_trace(make_trace("run", [100.0]))
+    assert not get_baseline_store().root.exists()
@@ -0,0 +1,179 @@
+"""Tests for the memoizing tool cache."""
+import pickle
+import sqlite3
+import time
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.cli.main import cli
+from agent_trace.core import cache as cache_module
+from agent_trace.core.cache import CachePolicy, ToolCache, cache_key, set_cache_policy
+from agent_trace.core.trace import start_run, trace
+
+calls = []
+
+
+@trace(cache=True)
+def fetch(url, retries=0):
+    calls.append(url)
+    time.sleep(0.01)
+    return {"url": url, "body": "x" * 100}
+
+
+@trace(tool_name="read_file", cache=CachePolicy(persist=True))
+def read(path):
+    calls.append(path)
+    return f"contents of {path}"
+
+
+@trace(cache=True)
+def broken(x):
+    calls.append(x)
+    raise ValueError("nope")
+
+
+@pytest.fixture
+def traces_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    cache_module._caches.clear()
+    calls.clear()
+    return tmp_path
+
+
+def test_cache_hits_are_recorded_in_steps(traces_env):
+    with start_run("cached") as run:
+        first = fetch("https://a")
+        assert fetch("https://a") == first
+        fetch(url="https://a")  # keyword vs positional is a different call
+        fetch("https://b")
+    assert calls == ["https://a", "https://a", "https://b"]
+
+    miss, hit = run.steps[0], run.steps[1]
+    assert miss.metadata["cache"] == {"hit": False}
+    assert hit.metadata["cache"]["hit"] is True
+    assert hit.metadata["cache"]["tier"] == "memory"
+    assert hit.metadata["cache"]["saved_ms"] > 5
+    assert hit.duration_ms < miss.duration_ms
+    assert run.metadata["tool_cache"]["hits"] == 1
+    assert run.metadata["tool_cache"]["misses"] == 3
+
+
+def test_cache_works_without_active_trace_and_skips_errors(traces_env):
+    fetch("https://c")
+    fetch("https://c")
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            broken(1)
+    assert calls == ["https://c", 1, 1]
+
+
+def test_ttl_and_size_bound():
+    tool_cache = ToolCache(path=None, max_bytes=2000)
+    policy = CachePolicy(ttl_s=0.05)
+    key = cache_key("tool", {"arg_0": 1}, policy)
+    tool_cache.put(key, "tool", "value", policy)
+    assert tool_cache.get(key, policy).value == "value"
+    time.sleep(0.06)
+    assert tool_cache.get(key, policy) is None
+
+    forever = CachePolicy()
+    keys = [cache_key("tool", {"arg_0": i}, forever) for i in range(10)]
+    for k in keys:
+        tool_cache.put(k, "tool", "y" * 500, forever)
+    stats = tool_cache.stats()
+    assert stats["memory_bytes"] <= 2000
+    assert tool_cache.get(keys[0], forever) is None  # least recently used went first
+    assert tool_cache.get(keys[-1], forever) is not None
+
+
+def test_disk_tier_survives_process_cache(traces_env):
+    assert read("/etc/hosts") == "contents of /etc/hosts"
+    cache_module._caches.clear()  # as if in a new process
+    with start_run("second run") as run:
+        assert read("/etc/hosts") == "contents of /etc/hosts"
+    assert calls == ["/etc/hosts"]
+    assert run.steps[0].metadata["cache"]["tier"] == "disk"
+
+    result = CliRunner().invoke(cli, ["cache"])
+    assert result.exit_code == 0, result.output
+    assert "read_file" in result.output
+    cleared = CliRunner().invoke(cli, ["cache", "--clear", "--tool", "read_file"])
+    assert "Removed 1 cached results" in cleared.output
+
+
+def test_per_tool_policy_and_version(traces_env):
+    set_cache_policy("fetch", CachePolicy(version="2"))
+    try:
+        fetch("https://d")
+        fetch("https://d")
+        set_cache_policy("fetch", CachePolicy(version="3"))
+        fetch("https://d")
+    finally:
+        set_cache_policy("fetch", None)
+    assert calls == ["https://d", "https://d"]
+
+
+class Point:
+    def __init__(self, x):
+        self.x = x
+
+    def __eq__(self, other):
+        return isinstance(other, Point) and other.x == self.x
+
+
+def test_disk_tier_only_loads_pickles_when_opted_in(tmp_path):
+    path = tmp_path / "cache.db"
+    json_only, opted_in = CachePolicy(persist=True), CachePolicy(persist=True, pickle=True)
+    key = cache_key("tool", {"arg_0": 1}, json_only)
+
+    # Results that don't round-trip through JSON stay in memory
+    ToolCache(path).put(key, "tool", (1, 2), json_only)
+    assert ToolCache(path).get(key, json_only) is None
+    ToolCache(path).put(key, "tool", {"rows": [1, 2]}, json_only)
+    assert ToolCache(path).get(key, json_only).value == {"rows": [1, 2]}
+
+    ToolCache(path).put(key, "tool", Point(3), opted_in)
+    assert ToolCache(path).get(key, json_only) is None
+    hit = ToolCache(path).get(key, opted_in)
+    assert hit.value == Point(3) and hit.tier == "disk"
+
+
+def test_rows_of_an_older_cache_db_are_pickles(tmp_path):
+    path = tmp_path / "cache.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE cache (key TEXT PRIMARY KEY, tool_name TEXT NOT NULL, value BLOB NOT NULL,"
+        " created_at REAL NOT NULL, expires_at REAL, duration_ms REAL)"
+    )
+    with conn:
+        conn.execute("INSERT INTO cache VALUES ('k', 'tool', ?, 0, NULL, 1.0)", (pickle.dumps("old"),))
+    conn.close()
+    assert ToolCache(path).get("k", CachePolicy(persist=True)) is None
+    assert ToolCache(path).get("k", CachePolicy(persist=True, pickle=True)).value == "old"
+
+
+def test_keys_tell_types_apart():
+    policy = CachePolicy()
+
+    def key(*args):
+        return cache_key("tool", {f"arg_{i}": arg for i, arg in enumerate(args)}, policy)
+
+    assert key(1.0) != key("1.0")
+    assert key(1.0) != key(1)
+    assert key([1, 2]) != key((1, 2))
+    assert key({"list": [1]}) != key([1])
+    assert key({1, 2}) != key(frozenset({1, 2}))
+    assert key([1.5, "a"]) == key([1.5, "a"])
+
+
+def test_float_and_str_calls_are_cached_apart(traces_env):
+    @trace(cache=True)
+    def echo(value):
+        calls.append(value)
+        return type(value).__name__
+
+    assert [echo(1.0), echo("1.0"), echo([1]), echo((1,))] == ["float", "str", "list", "tuple"]
+    assert echo(1.0) == "float" and len(calls) == 4
@@ -0,0 +1,44 @@
+"""Tests for the CLI commands."""
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.cli.main import cli
+from agent_trace.core.schema import ToolStep, Trace
+from agent_trace.core.store import save_trace
+
+
+@pytest.fixture
+def big_trace(tmp_path: Path, monkeypatch) -> Trace:
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    trace = Trace(name="big-run", steps=[
+        ToolStep(tool_name=f"tool_{i}", inputs={"payload": "x" * 5000}, output=i)
+        for i in range(500)
+    ])
+    save_trace(trace)
+    return trace
+
+
+def test_view_pages_and_truncates(big_trace):
+    runner = CliRunner()
+    result = runner.invoke(cli, ["view", "--page", "2", "--page-size", "10", "--max-width", "40"])
+    assert result.exit_code == 0, result.output
+    assert "Steps 10-19 of 500" in result.output
+    assert "tool_10(" in result.output and "tool_19(" in result.output
+    assert "tool_9(" not in result.output and "tool_20(" not in result.output
+    assert "x" * 100 not in result.output
+
+    result = runner.invoke(cli, ["view", "--steps", "-2:"])
+    assert "Steps 498-499 of 500" in result.output
+    assert "tool_499(" in result.output
+
+
+def test_view_pager(big_trace):
+    result = CliRunner().invoke(
+        cli, ["view", "--pager", "--page-size", "100", "--max-width", "40"], input="nnpq"
+    )
+    assert result.exit_code == 0, result.output
+    # next, next, previous, quit
+    pages = [line.split("—")[0].strip() for line in result.output.splitlines() if line.startswith("Page ")]
+    assert pages == ["Page 1/5", "Page 2/5", "Page 3/5", "Page 2/5"]
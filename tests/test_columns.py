@@ -0,0 +1,135 @@
+"""Tests for the columnar step cache."""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.cli.main import cli
+from agent_trace.core.columns import STEP_TYPE_CODES, ColumnStore
+from agent_trace.core.schema import AgentStep, ReasoningStep, ToolStep, Trace
+from agent_trace.core.store import delete_trace, get_column_store, open_step_columns, save_trace
+
+
+def make_trace(name: str, durations, error_at=None) -> Trace:
+    start = datetime(2025, 1, 1, 12, 0)
+    steps = [
+        ToolStep(
+            tool_name="search" if i % 2 == 0 else "fetch",
+            inputs={"q": "x" * i},
+            output="y" * 10,
+            duration_ms=d,
+            error="boom" if i == error_at else None,
+            started_at=start + timedelta(seconds=i),
+        )
+        for i, d in enumerate(durations)
+    ]
+    steps.append(ReasoningStep(thought="hmm", started_at=start))
+    steps.append(AgentStep(agent_name="planner", result="done", duration_ms=None, started_at=start))
+    return Trace(name=name, started_at=start, steps=steps)
+
+
+@pytest.fixture
+def traces_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    return tmp_path
+
+
+def test_built_from_store_then_updated_incrementally(traces_env):
+    first = make_trace("alpha", [10, 20, 30, 40], error_at=1)
+    save_trace(first)
+    assert not get_column_store().exists()
+
+    columns = open_step_columns()
+    assert len(columns) == 6 and columns.traces == 1
+    assert columns.trace_id(0) == first.trace_id
+    tools = columns.select(kind="tool")
+    assert tools.sum() == 4
+    assert columns["duration_ms"][tools].tolist() == [10, 20, 30, 40]
+    assert columns["offset_ms"][tools].tolist() == [0, 1000, 2000, 3000]
+    assert columns["input_bytes"][tools].tolist() == [len('{"q":""}') + i for i in range(4)]
+    assert np.isnan(columns["duration_ms"][columns.select(kind="agent")]).all()
+    assert columns["type"][4] == STEP_TYPE_CODES["reasoning"] and columns["name"][4] == -1
+
+    second = make_trace("beta", [50, 60])
+    save_trace(second)
+    columns = open_step_columns()
+    assert len(columns) == 10 and columns.traces == 2
+    assert columns.select(kind="tool", trace_name="bet").sum() == 2
+    assert columns.select(name="search").sum() == 3
+
+    assert delete_trace(str(first.trace_id))
+    columns = open_step_columns()
+    assert columns.select(kind="tool").sum() == 2 and columns.live_traces == 1
+
+
+def test_group_stats(traces_env):
+    save_trace(make_trace("alpha", [10, 20, 30, 40], error_at=1))
+    columns = open_step_columns()
+    stats = {s["name"]: s for s in columns.group_stats(columns.select(kind="tool"))}
+    assert stats["search"]["count"] == 2
+    assert stats["search"]["p50_ms"] == 20.0
+    assert stats["fetch"]["error_rate"] == 0.5
+    assert stats["fetch"]["mean_output_bytes"] == len('"yyyyyyyyyy"')
+    by_trace = columns.group_stats(columns.select(kind="tool"), by="trace_name")
+    assert [(s["name"], s["count"]) for s in by_trace] == [("alpha", 4)]
+
+
+def test_uncommitted_rows_are_ignored_and_overwritten(tmp_path: Path):
+    store = ColumnStore(tmp_path)
+    store.append([make_trace("a", [1])])
+    # A writer that died after appending to a column but before committing
+    with open(store.open().root / "duration_ms.bin", "ab") as f:
+        f.write(np.array([999.0, 999.0]).tobytes())
+    assert store.open()["duration_ms"][:1].tolist() == [1.0]
+    assert len(store.open()["duration_ms"]) == 3
+
+    store.append([make_trace("b", [2])])
+    assert store.open()["duration_ms"].tolist()[3] == 2.0
+
+
+def test_stats_command(traces_env):
+    save_trace(make_trace("alpha", [10, 20, 30, 40], error_at=1))
+    result = CliRunner().invoke(cli, ["stats", "--json"])
+    assert result.exit_code == 0, result.output
+    assert '"name": "search"' in result.output
+    result = CliRunner().invoke(cli, ["stats", "--kind", "agent"])
+    assert result.exit_code == 0, result.output
+    assert "planner" in result.output
+
+
+def test_saving_a_trace_again_replaces_its_rows(tmp_path: Path):
+    store = ColumnStore(tmp_path)
+    trace = make_trace("a", [1, 2])
+    store.append([trace])
+    trace.steps[0].duration_ms = 100
+    store.append([trace, make_trace("b", [3]), trace])
+    columns = store.open()
+    assert columns.traces == 4 and columns.live_traces == 2
+    stats = {s["name"]: s for s in columns.group_stats(columns.select(kind="tool"))}
+    assert stats["search"]["count"] == 2 and stats["fetch"]["count"] == 1
+    assert sorted(columns["duration_ms"][columns.select(kind="tool", trace_name="a")].tolist()) == [2, 100]
+
+
+def test_rebuild_swaps_in_a_complete_cache(tmp_path: Path):
+    store = ColumnStore(tmp_path)
+    first, second = make_trace("a", [1]), make_trace("b", [2])
+    store.append([first])
+    old = store.open()
+
+    def traces():
+        yield first
+        # Readers still see the old cache while the rebuild runs
+        assert store.open().root == old.root and len(store.open()) == len(old)
+        yield second
+
+    store.rebuild(traces(), batch_size=1)
+    columns = store.open()
+    assert columns.root != old.root and not old.root.exists()
+    assert columns.live_traces == 2 and columns.select(kind="tool").sum() == 2
+
+    # A save that lands after the rebuild, of a trace it already included
+    store.append([second])
+    assert store.open().live_traces == 2
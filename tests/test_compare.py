@@ -0,0 +1,68 @@
+"""Tests for latency comparison between run sets."""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from click.testing import CliRunner
+
+from agent_trace.analysis.compare import (
+    Selection,
+    compare_selections,
+    find_regressions,
+    mann_whitney_p,
+)
+from agent_trace.cli.main import cli
+from agent_trace.core.schema import ToolStep, Trace
+from agent_trace.core.store import save_traces
+
+
+def make_runs(version: str, search_ms: float, errors: int, count: int = 40) -> list:
+    rng = np.random.default_rng(len(version))
+    start = datetime(2025, 4, 7, 12, 0)
+    runs = []
+    for i in range(count):
+        steps = [
+            ToolStep(tool_name="search", inputs={}, duration_ms=float(rng.lognormal(np.log(search_ms), 0.1)),
+                     error="timeout" if i < errors else None),
+            ToolStep(tool_name="email", inputs={}, duration_ms=float(rng.lognormal(np.log(20), 0.1))),
+        ]
+        runs.append(Trace(name="agent", metadata={"version": version}, steps=steps,
+                          started_at=start, ended_at=start + timedelta(milliseconds=search_ms + 20)))
+    return runs
+
+
+def test_mann_whitney_matches_known_values():
+    same = np.arange(20, dtype=float)
+    assert mann_whitney_p(same, same) > 0.9
+    assert mann_whitney_p(same, same + 100) < 1e-6
+
+
+def test_compare_detects_regression(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    save_traces(make_runs("v1", search_ms=100, errors=0) + make_runs("v2", search_ms=160, errors=8))
+
+    results = compare_selections(
+        Selection(tags={"version": "v1"}), Selection(tags={"version": "v2"}), bootstrap=200
+    )
+    by_name = {(r.kind, r.name): r for r in results}
+    search = by_name[("tool", "search")]
+    assert search.n_base == search.n_cand == 40
+    assert 40 < search.delta_pct["p50"] < 80
+    assert search.p_value < 0.001
+    assert search.ci_pct[0] > 0
+    assert search.cand_error_rate == 0.2
+    assert by_name[("tool", "email")].p_value > 0.001
+    assert by_name[("run", "total")].n_base == 40
+
+    regressions = find_regressions(results, threshold_pct=10)
+    assert {(r.kind, r.name) for r in regressions} == {("tool", "search"), ("run", "total")}
+
+    runner = CliRunner()
+    args = ["compare", "--base-tag", "version=v1", "--cand-tag", "version=v2"]
+    assert runner.invoke(cli, args).exit_code == 0
+    result = runner.invoke(cli, args + ["--fail-on-regression", "10"])
+    assert result.exit_code == 1, result.output
+    assert "regression" in result.output
+    flipped = ["compare", "--base-tag", "version=v2", "--cand-tag", "version=v1",
+               "--fail-on-regression", "10", "--fail-on-error-increase", "5", "--json"]
+    assert runner.invoke(cli, flipped).exit_code == 0
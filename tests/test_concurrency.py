@@ -0,0 +1,103 @@
+"""Tests for the concurrency and critical-path analysis."""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.analysis.concurrency import analyze_trace, summarize_reports
+from agent_trace.cli.main import cli
+from agent_trace.core.schema import AgentStep, ReasoningStep, ToolStep, Trace
+from agent_trace.core.store import save_trace
+
+START = datetime(2025, 1, 1, 12, 0)
+
+
+def tool(name: str, start_ms: float, duration_ms: float) -> ToolStep:
+    return ToolStep(
+        tool_name=name, inputs={}, started_at=START + timedelta(milliseconds=start_ms), duration_ms=duration_ms
+    )
+
+
+def agent(name: str, start_ms: float, duration_ms: float) -> AgentStep:
+    return AgentStep(agent_name=name, started_at=START + timedelta(milliseconds=start_ms), duration_ms=duration_ms)
+
+
+def run(steps, wall_ms: float) -> Trace:
+    return Trace(name="parallel", started_at=START, ended_at=START + timedelta(milliseconds=wall_ms), steps=steps)
+
+
+def test_sequential_run():
+    report = analyze_trace(run([tool("a", 0, 100), tool("b", 150, 100), tool("c", 250, 50)], 300))
+    assert report.wall_ms == 300
+    assert report.step_sum_ms == report.work_ms == report.busy_ms == 250
+    assert report.parallelism == 1.0 and report.max_concurrency == 1
+    assert report.idle_ms == 50
+    assert [(g.offset_ms, g.duration_ms) for g in report.idle_gaps] == [(100, 50)]
+    assert [s.name for s in report.critical_path] == ["a", "b", "c"]
+    assert report.critical_path[1].wait_ms == 50
+    shares = {(s.kind, s.name): s.ms for s in report.critical_shares}
+    assert shares == {("tool", "a"): 100, ("tool", "b"): 100, ("tool", "c"): 50, ("idle", "(untraced)"): 50}
+
+
+def test_parallel_fan_out_critical_path_follows_the_slowest_branch():
+    # Three branches in parallel, then a join step
+    steps = [tool("fast", 0, 100), tool("slow", 0, 400), tool("medium", 10, 200), tool("join", 400, 100)]
+    report = analyze_trace(run(steps, 500), buckets=5)
+    assert report.step_sum_ms == 800
+    assert report.busy_ms == 500
+    assert report.work_ms == 800
+    assert report.max_concurrency == 3
+    assert report.parallelism == pytest.approx(1.6)
+    assert report.speedup == pytest.approx(1.6)
+    assert report.timeline[0] == pytest.approx(2.9)
+    assert report.timeline[-1] == 1.0
+    assert [s.name for s in report.critical_path] == ["slow", "join"]
+    assert report.critical_shares[0].name == "slow"
+    assert report.critical_shares[0].share == pytest.approx(0.8)
+
+
+def test_nested_steps_are_not_parallelism():
+    # An agent around two sequential tool calls, with its own time between them
+    steps = [agent("planner", 0, 1000), tool("search", 100, 300), tool("fetch", 600, 300), ReasoningStep(thought="x")]
+    report = analyze_trace(run(steps, 1000))
+    assert report.max_concurrency == 1
+    assert report.busy_ms == report.work_ms == 1000
+    assert report.step_sum_ms == 1600
+    assert [s.name for s in report.critical_path] == ["search", "fetch"]
+    assert report.critical_path[1].waited_in == "agent:planner"
+    shares = {(s.name, s.self_time): s.ms for s in report.critical_shares}
+    # Lead-in, the wait between the tools and the tail are the agent's own time
+    assert shares == {("search", False): 300, ("fetch", False): 300, ("planner", True): 400}
+
+
+def test_empty_trace():
+    report = analyze_trace(run([ReasoningStep(thought="x")], 100))
+    assert report.busy_ms == 0 and report.parallelism is None
+    assert report.critical_path == []
+    assert summarize_reports([report])["parallelism"] is None
+
+
+def test_summary_and_cli(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    first = run([tool("slow", 0, 400), tool("fast", 0, 100)], 400)
+    second = run([tool("slow", 0, 200), tool("fast", 200, 100)], 300)
+    for trace in (first, second):
+        save_trace(trace)
+    summary = summarize_reports([analyze_trace(first), analyze_trace(second)])
+    assert summary["runs"] == 2 and summary["wall_ms"] == 700
+    assert summary["critical_shares"][0]["name"] == "slow"
+    assert summary["critical_shares"][0]["ms"] == 600 and summary["critical_shares"][0]["runs"] == 2
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["analyze"])
+    assert result.exit_code == 0, result.output
+    assert "Critical path time" in result.output and "slow" in result.output
+
+    result = runner.invoke(cli, ["analyze", str(first.trace_id)])
+    assert result.exit_code == 0, result.output
+    assert "Parallelism 1.25" in result.output
+
+    result = runner.invoke(cli, ["analyze", "not-a-trace"])
+    assert result.exit_code == 1
@@ -0,0 +1,168 @@
+"""Tests for the runtime tracing configuration."""
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.adapters.patches import get_patch_registry, patches_enabled, unpatch
+from agent_trace.cli.main import cli
+from agent_trace.core import config, metrics
+from agent_trace.core.config import ConfigWatcher, TracingConfig, get_config, load_config, reload_config, set_config
+from agent_trace.core.store import list_traces
+from agent_trace.core.trace import log_agent_step, log_react_step, start_run, trace, update_agent_step
+
+
+@pytest.fixture
+def traces_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path / "traces"))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    yield tmp_path
+    set_config(TracingConfig())
+
+
+def test_rules_resolve_exact_names_before_patterns():
+    settings = TracingConfig(
+        sample_rate=0.5,
+        tools={"web_*": {"capture": "timing"}, "web_search": {"sample_rate": 0.1}},
+        agents={"*": {"capture": "metadata"}},
+    )
+    assert settings.decide("tool", "web_search") == (0.1, "full")
+    assert settings.decide("tool", "web_fetch") == (0.5, "timing")
+    assert settings.decide("tool", "calculator") == (0.5, "full")
+    assert settings.decide("agent", "planner") == (0.5, "metadata")
+    # Decisions are memoized on the snapshot
+    assert settings.decide("tool", "web_fetch") is settings.decide("tool", "web_fetch")
+
+
+def test_file_overrides_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_CAPTURE", "metadata")
+    monkeypatch.setenv("AGENT_TRACE_SAMPLE_RATE", "0.25")
+    assert load_config() == TracingConfig(capture="metadata", sample_rate=0.25)
+    path = tmp_path / "tracing.json"
+    path.write_text(json.dumps({"capture": "timing", "tools": {"noisy": {"sample_rate": 0}}}))
+    settings = load_config(path)
+    assert settings.capture == "timing" and settings.sample_rate == 0.25
+    assert settings.decide("tool", "noisy").sample_rate == 0
+
+    path.write_text(json.dumps({"capture": "everything"}))
+    with pytest.raises(ValueError):
+        load_config(path)
+
+
+def test_watcher_reloads_changed_file(traces_env, monkeypatch):
+    path = traces_env / "tracing.json"
+    path.write_text(json.dumps({"enabled": True}))
+    monkeypatch.setenv("AGENT_TRACE_CONFIG", str(path))
+    reload_config()
+    watcher = ConfigWatcher(path)
+    assert not watcher.check()
+
+    path.write_text(json.dumps({"enabled": False, "sample_rate": 0.5}))
+    os.utime(path, ns=(0, 1))
+    assert watcher.check()
+    assert not get_config().enabled
+
+    # An invalid edit keeps the last good configuration
+    path.write_text("{not json")
+    assert watcher.check()
+    assert get_config().sample_rate == 0.5
+
+
+@pytest.mark.parametrize("interval", ["soon", "-1", "nan"])
+def test_malformed_check_interval_falls_back_to_default(traces_env, monkeypatch, interval):
+    path = traces_env / "tracing.json"
+    path.write_text(json.dumps({"sample_rate": 0.5}))
+    monkeypatch.setenv("AGENT_TRACE_CONFIG", str(path))
+    monkeypatch.setenv("AGENT_TRACE_CONFIG_INTERVAL", interval)
+    monkeypatch.setattr(config, "_config", None)
+    monkeypatch.setattr(config, "_watcher", None)
+    assert get_config().sample_rate == 0.5
+    assert config._watcher.interval_s == config.DEFAULT_CHECK_INTERVAL_S
+    config._watcher.stop()
+
+
+def test_capture_levels(traces_env):
+    @trace
+    def fetch(url):
+        return "<html>" * 100
+
+    set_config(TracingConfig(tools={"fetch": {"capture": "metadata"}}, agents={"quiet": {"capture": "timing"}}))
+    with start_run("levels") as run:
+        fetch("https://example.com")
+        step = log_agent_step("quiet", started_at="2025-01-01T00:00:00")
+        update_agent_step(step, result={"big": "x" * 1000}, duration_ms=5.0)
+    tool_step, agent_step = run.steps
+    assert tool_step.inputs == {"arg_0": {"__type__": "str", "length": 19}}
+    assert tool_step.output == {"__type__": "str", "length": 600}
+    assert agent_step.result is None and agent_step.duration_ms == 5.0
+
+
+def test_reasoning_steps_follow_agent_rules(traces_env):
+    set_config(TracingConfig(agents={"quiet": {"sample_rate": 0}, "terse": {"capture": "metadata"}}))
+    with start_run("reasoning") as run:
+        log_react_step("quiet", "unrecorded")
+        log_react_step("terse", "secret plan", action="search", observation="found it")
+        log_react_step("chatty", "think aloud")
+    terse, chatty = run.steps
+    assert (terse.thought, terse.action, terse.observation) == ("", "search", None)
+    assert terse.metadata["thought"] == {"__type__": "str", "length": 11}
+    assert chatty.thought == "think aloud"
+
+
+def test_sampling_skips_steps_but_counts_metrics(traces_env):
+    @trace
+    def noisy():
+        return 1
+
+    set_config(TracingConfig(tools={"noisy": {"sample_rate": 0}}))
+    metrics.get_registry().reset()
+    with start_run("sampled") as run:
+        for _ in range(5):
+            noisy()
+    assert run.steps == []
+    assert metrics.get_registry().snapshot()[("tool", "noisy")].count == 5
+
+
+def test_kill_switch(traces_env):
+    calls = []
+
+    @trace
+    def tool():
+        calls.append(1)
+        return 1
+
+    set_config(TracingConfig(enabled=False))
+    with start_run("off") as run:
+        assert tool() == 1
+    assert calls == [1] and run.steps == []
+    assert list_traces() == []
+
+
+def test_kill_switch_restores_patched_methods(traces_env):
+    class Framework:
+        def run(self):
+            return "original"
+
+    original = Framework.__dict__["run"]
+    get_patch_registry().patch_attribute(Framework, "run", lambda f: lambda self: "patched", name="test_config.run")
+    try:
+        assert Framework().run() == "patched"
+        set_config(TracingConfig(enabled=False))
+        assert not patches_enabled() and Framework.__dict__["run"] is original
+        set_config(TracingConfig())
+        assert patches_enabled() and Framework().run() == "patched"
+    finally:
+        unpatch("test_config")
+
+
+def test_cli_shows_effective_config(tmp_path):
+    path = tmp_path / "tracing.json"
+    path.write_text(json.dumps({"tools": {"web_*": {"sample_rate": 0.1, "capture": "timing"}}}))
+    result = CliRunner().invoke(cli, ["config", "--file", str(path), "--tool", "web_search"])
+    assert result.exit_code == 0, result.output
+    assert '"web_*"' in result.output and "web_search: sample rate 0.1, capture timing" in result.output
+
+    path.write_text(json.dumps({"sample_rate": 2}))
+    result = CliRunner().invoke(cli, ["config", "--file", str(path)])
+    assert result.exit_code == 1 and "Invalid configuration" in result.output
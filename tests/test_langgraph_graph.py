@@ -0,0 +1,239 @@
+"""Tests for the unified LangGraph adapter, on stand-in graph classes."""
+import asyncio
+import inspect
+from datetime import datetime, timedelta
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.adapters.patches import unpatch
+from agent_trace.adapters.langgraph.graph import (
+    GRAPHS_KEY,
+    SUPERSTEP_KEY,
+    _patch_add_node,
+    _patch_stream,
+    superstep_timings,
+    wrap_node,
+)
+from agent_trace.cli.main import cli
+from agent_trace.core.schema import AgentStep
+from agent_trace.core.store import list_traces
+from agent_trace.core.trace import current_trace, start_run
+
+
+class FakeStateGraph:
+    def __init__(self):
+        self.nodes = {}
+
+    def add_node(self, node, action=None, **kwargs):
+        if action is None:
+            node, action = node.__name__, node
+        self.nodes[node] = action
+
+
+class FakeRunnable:
+    def invoke(self, state):
+        return state
+
+
+class FakePregel:
+    """Runs nodes one superstep each, passing config like LangGraph does."""
+    name = "fake-graph"
+
+    def __init__(self, graph):
+        self.nodes = graph.nodes
+
+    def stream(self, state):
+        for step, (name, node) in enumerate(self.nodes.items(), 1):
+            config = {"metadata": {"langgraph_step": step, "langgraph_checkpoint_ns": f"{name}:1"}}
+            state = {**state, **node(state, config=config)}
+            yield {name: state}
+
+    def invoke(self, state):
+        for chunk in self.stream(state):
+            pass
+        return [*chunk.values()][0]
+
+    async def astream(self, state):
+        for step, (name, node) in enumerate(self.nodes.items(), 1):
+            config = {"metadata": {"langgraph_step": step, "langgraph_checkpoint_ns": f"{name}:1"}}
+            update = node(state, config=config)
+            state = {**state, **(await update if inspect.isawaitable(update) else update)}
+            yield {name: state}
+
+
+@pytest.fixture
+def graph_classes(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    state_graph = type("StateGraph", (FakeStateGraph,), {})
+    pregel = type("Pregel", (FakePregel,), {})
+    assert _patch_add_node(state_graph) and _patch_stream(pregel)
+    yield state_graph, pregel
+    unpatch(state_graph.__module__)
+
+
+def researcher(state, config):
+    return {"research": f"results for {state['topic']}"}
+
+
+async def writer(state, config):
+    await asyncio.sleep(0)
+    return {"summary": state["research"].upper()}
+
+
+def test_wrap_node_keeps_signature_and_async():
+    wrapped = wrap_node("writer", writer)
+    assert inspect.iscoroutinefunction(wrapped)
+    assert inspect.signature(wrapped) == inspect.signature(writer)
+    assert wrap_node("writer", wrapped) is wrapped
+    # Outside a run nodes just run
+    assert asyncio.run(wrapped({"research": "x"}, config={})) == {"summary": "X"}
+
+
+def test_invoke_opens_one_run_per_invocation(graph_classes):
+    state_graph, pregel = graph_classes
+    graph = state_graph()
+    graph.add_node(researcher)
+    graph.add_node("writer", action=writer)
+    asyncio.run(_consume(pregel(graph).astream({"topic": "ai"})))
+
+    def summarize(state, config):
+        return {"summary": state["research"].upper()}
+
+    sync_graph = state_graph()
+    sync_graph.add_node(researcher)
+    sync_graph.add_node(node="writer", action=summarize)
+    assert pregel(sync_graph).invoke({"topic": "ai"})["summary"] == "RESULTS FOR AI"
+    # Runnables and subgraphs are left alone
+    other = state_graph()
+    other.add_node("passthrough", FakeRunnable())
+    assert isinstance(other.nodes["passthrough"], FakeRunnable)
+
+    traces = list_traces()
+    assert [t.name for t in traces] == ["fake-graph", "fake-graph"]
+    for trace in traces:
+        assert [s.agent_name for s in trace.steps] == ["researcher", "writer"]
+        assert [s.metadata[SUPERSTEP_KEY] for s in trace.steps] == [1, 2]
+        assert trace.steps[0].result["changed"]["research"]["preview"] == '"results for ai"'
+        assert trace.steps[1].metadata["state"]["changed"] == ["research"]
+        [graph_timings] = trace.metadata[GRAPHS_KEY]
+        assert [s["nodes"] for s in graph_timings["supersteps"]] == [["researcher"], ["writer"]]
+
+
+async def _consume(stream):
+    async for _ in stream:
+        pass
+
+
+def test_concurrent_invocations_record_separate_runs(graph_classes):
+    state_graph, pregel = graph_classes
+    graph = state_graph()
+    graph.add_node("a", writer_a)
+    graph.add_node("b", writer_b)
+
+    async def main():
+        await asyncio.gather(*(_consume(pregel(graph).astream({"topic": t})) for t in ["x", "y", "z"]))
+
+    asyncio.run(main())
+    traces = list_traces()
+    assert [t.name for t in traces] == ["fake-graph"] * 3
+    for trace in traces:
+        assert [s.agent_name for s in trace.steps] == ["a", "b"]
+        assert [s.metadata["state"]["changed"] for s in trace.steps] == [["topic"], ["a"]]
+
+
+def test_concurrent_invocations_in_one_run_keep_their_own_state(graph_classes):
+    state_graph, pregel = graph_classes
+    graph = state_graph()
+    graph.add_node("a", writer_a)
+    graph.add_node("b", writer_b)
+
+    async def main():
+        await asyncio.gather(*(_consume(pregel(graph).astream({"topic": t})) for t in ["x", "y", "z"]))
+
+    with start_run("outer") as trace:
+        asyncio.run(main())
+    changed = {name: [s.metadata["state"]["changed"] for s in trace.steps if s.agent_name == name] for name in "ab"}
+    assert changed == {"a": [["topic"]] * 3, "b": [["a"]] * 3}
+
+
+def test_suspended_stream_is_not_the_current_run(graph_classes):
+    state_graph, pregel = graph_classes
+    graph = state_graph()
+    graph.add_node("researcher", researcher)
+    graph.add_node("writer", writer_b)
+    stream = pregel(graph).stream({"topic": "ai"})
+    next(stream)
+    assert current_trace() is None
+    with start_run("caller") as caller:
+        assert [*stream][0]["writer"]["b"] == "done"
+    assert caller.steps == []
+    assert sorted(t.name for t in list_traces()) == ["caller", "fake-graph"]
+
+
+async def writer_a(state, config):
+    await asyncio.sleep(0.01)
+    return {"a": state["topic"]}
+
+
+def writer_b(state, config):
+    return {"b": "done"}
+
+
+def test_invocation_inside_a_run_records_into_it(graph_classes):
+    state_graph, pregel = graph_classes
+    graph = state_graph()
+    graph.add_node("researcher", researcher)
+    with start_run("outer") as trace:
+        pregel(graph).invoke({"topic": "ai"})
+        pregel(graph).invoke({"topic": "ml"})
+    assert [t.name for t in list_traces()] == ["outer"]
+    assert len(trace.steps) == 2 and len(trace.metadata[GRAPHS_KEY]) == 2
+
+
+def test_failing_node_is_recorded(graph_classes):
+    state_graph, pregel = graph_classes
+
+    def broken(state, config):
+        raise ValueError("boom")
+
+    graph = state_graph()
+    graph.add_node("broken", broken)
+    with pytest.raises(ValueError):
+        pregel(graph).invoke({"topic": "ai"})
+    [trace] = list_traces()
+    assert trace.steps[0].result == "boom"
+    assert trace.metadata[GRAPHS_KEY][0]["supersteps"][0]["nodes"] == ["broken"]
+
+
+def test_superstep_timings_and_view(graph_classes):
+    start = datetime(2025, 1, 1)
+
+    def node(name, step, offset_ms, duration_ms, namespace=""):
+        return AgentStep(
+            agent_name=name, started_at=start + timedelta(milliseconds=offset_ms), duration_ms=duration_ms,
+            metadata={SUPERSTEP_KEY: step, "namespace": namespace},
+        )
+
+    steps = [
+        node("plan", 1, 10, 100),
+        node("search_a", 2, 130, 300), node("search_b", 2, 135, 50),
+        node("inner", 1, 140, 20, namespace="search_a:1"),
+        node("write", 3, 450, 40),
+    ]
+    timings = superstep_timings(steps, start, start + timedelta(milliseconds=500))
+    assert [s["step"] for s in timings["supersteps"]] == [1, 2, 3]
+    parallel = timings["supersteps"][1]
+    assert parallel["nodes"] == ["search_a", "search_b"]
+    assert parallel["duration_ms"] == 300 and parallel["node_ms"] == 350
+    assert parallel["slowest"] == "search_a" and parallel["offset_ms"] == 130
+    assert timings["between_ms"] == 500 - 100 - 300 - 40
+
+    state_graph, pregel = graph_classes
+    graph = state_graph()
+    graph.add_node("researcher", researcher)
+    pregel(graph).invoke({"topic": "ai"})
+    result = CliRunner().invoke(cli, ["view", "--latest"])
+    assert result.exit_code == 0, result.output
+    assert "fake-graph: 1 supersteps" in result.output and "slowest: researcher" in result.output
@@ -0,0 +1,70 @@
+"""Tests for recording LangGraph state as deltas."""
+from agent_trace.adapters.langgraph import state as graph_state
+from agent_trace.adapters.langgraph.state import StateTracker, input_delta, output_delta, state_metadata
+from agent_trace.core.trace import start_run
+
+
+def test_input_delta_keeps_only_changed_keys():
+    tracker = StateTracker()
+    first = tracker.input_delta({"topic": "ai", "notes": ["a"] * 100})
+    assert set(first["changed"]) == {"topic", "notes"}
+    assert first["state_keys"] == 2
+    assert first["state_bytes"] == first["changed"]["topic"]["bytes"] + first["changed"]["notes"]["bytes"]
+
+    second = tracker.input_delta({"topic": "ai", "notes": ["a"] * 100, "summary": "short"})
+    assert [*second["changed"]] == ["summary"]
+    assert second["changed"]["summary"] == {"bytes": 7, "preview": '"short"'}
+    assert second["removed"] == []
+
+    third = tracker.input_delta({"topic": "ml"})
+    assert [*third["changed"]] == ["topic"]
+    assert sorted(third["removed"]) == ["notes", "summary"]
+
+
+def test_previews_are_bounded():
+    tracker = StateTracker(preview_chars=10)
+    delta = tracker.input_delta({"text": "x" * 5000, "emoji": "🙂" * 50})
+    assert delta["changed"]["text"]["bytes"] == 5002
+    assert delta["changed"]["text"]["preview"] == '"xxxxxxxxx…'
+    assert len(delta["changed"]["emoji"]["preview"]) == 11
+
+
+def test_output_delta_skips_unchanged_keys():
+    tracker = StateTracker()
+    tracker.input_delta({"topic": "ai", "research": ""})
+    delta = tracker.output_delta({"topic": "ai", "research": "results"})
+    assert [*delta["changed"]] == ["research"]
+    assert delta["update_bytes"] == len('"ai"') + len('"results"')
+    # Anything but a mapping is kept as one bounded value
+    assert tracker.output_delta(["send"])["value"]["preview"] == '["send"]'
+
+
+def test_same_objects_are_serialized_once():
+    tracker = StateTracker()
+    state = {"topic": "ai"}
+    first = tracker.input_delta(state)
+    # A second wrapper around the same call sees the same delta, not an empty one
+    assert tracker.input_delta(state) is first
+    assert tracker.input_delta(dict(state))["changed"] == {}
+
+
+def test_deltas_follow_the_current_run(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    assert input_delta({"topic": "ai"}) is None
+    with start_run("graph") as trace:
+        first = input_delta({"topic": "ai"})
+        update = {"summary": "done"}
+        outputs = output_delta(update)
+        second = input_delta({"topic": "ai", "summary": "done"})
+        assert graph_state.get_tracker() is graph_state._trackers[str(trace.trace_id)]
+    assert [*first["changed"]] == ["topic"] and [*second["changed"]] == ["summary"]
+    assert input_delta("not a mapping") is None
+    assert state_metadata(second, outputs) == {
+        "bytes": second["state_bytes"],
+        "keys": 2,
+        "changed": ["summary"],
+        "removed": [],
+        "update_bytes": len('"done"'),
+        "updated": ["summary"],
+    }
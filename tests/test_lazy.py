@@ -0,0 +1,76 @@
+"""Tests for lazy and trusted trace loading."""
+import json
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from agent_trace.core.lazy import LazyTrace, is_trusted, trace_from_document
+from agent_trace.core.schema import AgentStep, ReasoningStep, TaskStep, ToolStep, Trace
+from agent_trace.core.serialize import iter_trace_json, loads
+from agent_trace.core.store import load_trace, load_trace_lazy, save_trace
+
+
+def make_trace() -> Trace:
+    trace = Trace(name="lazy", metadata={"run": 1}, steps=[
+        ToolStep(tool_name="search", inputs={"q": "x"}, output=[1, 2], duration_ms=1.5),
+        ReasoningStep(thought="think", agent_name="a"),
+        TaskStep(task_name="t", result={"ok": True}),
+        AgentStep(agent_name="a", result="done"),
+    ] * 25)
+    trace.ended_at = trace.started_at
+    return trace
+
+
+def stored(trace: Trace) -> dict:
+    return loads(b"".join(iter_trace_json(trace)))
+
+
+def test_trusted_construction_matches_validation():
+    trace = make_trace()
+    doc = stored(trace)
+    assert is_trusted(doc)
+    fast = trace_from_document(doc)
+    assert fast == trace_from_document(doc, strict=True) == trace
+    assert [type(s) for s in fast.steps] == [type(s) for s in trace.steps]
+    assert fast.duration_ms == 0
+
+
+def test_untrusted_documents_are_validated():
+    doc = json.loads(make_trace().model_dump_json())
+    assert not is_trusted(doc)
+    doc["steps"][0]["started_at"] = "not a date"
+    with pytest.raises(ValidationError):
+        trace_from_document(doc)
+
+    trusted = stored(make_trace())
+    trusted["steps"][0]["duration_ms"] = "slow"
+    assert trace_from_document(trusted).steps[0].duration_ms == "slow"
+    with pytest.raises(ValidationError):
+        trace_from_document(trusted, strict=True)
+
+
+@pytest.mark.parametrize("strict", [False, True])
+def test_lazy_trace_builds_steps_on_demand(strict):
+    trace = make_trace()
+    lazy = LazyTrace(stored(trace), strict=strict)
+    assert lazy.name == "lazy" and lazy.metadata == {"run": 1}
+    assert lazy.trace_id == trace.trace_id
+    assert len(lazy.steps) == 100 and lazy.steps.built == 0
+
+    assert lazy.steps[-1] == trace.steps[-1]
+    assert lazy.steps[10:14] == trace.steps[10:14]
+    assert lazy.steps.built == 5
+    with pytest.raises(IndexError):
+        lazy.steps[100]
+    assert lazy.materialize() == trace
+
+
+def test_store_loading(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    trace = make_trace()
+    path = save_trace(trace)
+    assert load_trace(str(trace.trace_id)) == trace
+    assert load_trace(path, strict=True) == trace
+    assert load_trace_lazy(str(trace.trace_id)).steps[1] == trace.steps[1]
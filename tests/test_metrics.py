@@ -0,0 +1,138 @@
+"""Tests for the in-process metrics registry."""
+import gc
+import threading
+import urllib.request
+
+import pytest
+
+from agent_trace.core import metrics
+from agent_trace.core.metrics import LogHistogram, MetricsRegistry, bucket_index, bucket_upper_ms
+from agent_trace.core.trace import start_run, trace
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, "_registry", registry)
+    monkeypatch.setattr(metrics, "_enabled", True)
+    return registry
+
+
+def test_buckets_bound_relative_error():
+    for value in [0.02, 0.5, 3.7, 120.0, 45_000.0]:
+        upper = bucket_upper_ms(bucket_index(value))
+        assert value <= upper < value * 2 ** (1 / metrics.SUB_BUCKETS) * 1.0001
+    assert bucket_index(0) == 0
+    assert bucket_index(float("inf")) == metrics.BUCKETS - 1
+
+
+def test_histogram_quantiles_and_round_trip():
+    histogram = LogHistogram()
+    for i in range(1, 1001):
+        histogram.add(float(i), error=i % 100 == 0)
+    assert histogram.count == 1000 and histogram.errors == 10
+    assert 500 <= histogram.quantile(0.5) <= 500 * 1.2
+    assert 990 <= histogram.quantile(0.99) <= 1000
+    assert histogram.quantile(1.0) == 1000
+    restored = LogHistogram.from_dict(histogram.to_dict())
+    assert restored.counts == histogram.counts
+    assert restored.quantile(0.95) == histogram.quantile(0.95)
+
+
+def test_thread_churn_keeps_shards_bounded(registry):
+    def work(i):
+        registry.observe("tool", "search", float(i))
+
+    for batch in range(10):
+        threads = [threading.Thread(target=work, args=(batch * 20 + i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    gc.collect()
+    assert registry._threads == {}
+    histogram = registry.snapshot()[("tool", "search")]
+    assert histogram.count == 200 and histogram.max_ms == 199.0
+
+
+def test_threads_record_into_separate_shards(registry):
+    def work():
+        for _ in range(1000):
+            registry.observe("tool", "search", 5.0)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    registry.observe("tool", "search", 50.0, error=True)
+    histogram = registry.snapshot()[("tool", "search")]
+    assert histogram.count == 4001
+    assert histogram.errors == 1
+    # Exited threads' histograms were folded together
+    gc.collect()
+    assert len(registry._threads) == 1 and ("tool", "search") in registry._retired
+    registry.reset()
+    assert registry.snapshot() == {}
+    registry.observe("tool", "search", 1.0)
+    assert registry.snapshot()[("tool", "search")].count == 1
+
+
+def test_decorator_records_with_and_without_a_run(registry):
+    @trace
+    def flaky(fail: bool):
+        if fail:
+            raise ValueError("boom")
+        return "ok"
+
+    flaky(False)
+    with pytest.raises(ValueError):
+        flaky(True)
+    with start_run("metrics-run"):
+        flaky(False)
+    histogram = registry.snapshot()[("tool", "flaky")]
+    assert histogram.count == 3
+    assert histogram.errors == 1
+
+
+def test_disabled_records_nothing(registry, monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+
+    @trace
+    def quiet():
+        return 1
+
+    quiet()
+    assert registry.snapshot() == {}
+
+
+def test_prometheus_text(registry):
+    registry.observe("tool", 'we"ird', 3.0)
+    registry.observe("tool", 'we"ird', 3000.0, error=True)
+    text = registry.render_prometheus()
+    labels = 'kind="tool",name="we\\"ird"'
+    assert f"agent_trace_calls_total{{{labels}}} 2" in text
+    assert f"agent_trace_errors_total{{{labels}}} 1" in text
+    assert f'agent_trace_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"agent_trace_duration_seconds_count{{{labels}}} 2" in text
+    buckets = [line for line in text.splitlines() if line.startswith("agent_trace_duration_seconds_bucket")]
+    counts = [int(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert "# TYPE agent_trace_duration_seconds histogram" in text
+
+
+def test_http_endpoint_and_dump(registry, tmp_path):
+    registry.observe("agent", "planner", 12.0)
+    server = metrics.serve_metrics(0, registry=registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'agent_trace_calls_total{kind="agent",name="planner"} 1' in body
+
+    path = metrics.dump_metrics(tmp_path / "metrics.prom", registry)
+    assert path.read_text() == registry.render_prometheus()
@@ -0,0 +1,111 @@
+"""Tests for tracer self-overhead accounting."""
+import time
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.cli.main import cli
+from agent_trace.core import overhead
+from agent_trace.core.store import list_overhead, load_trace
+from agent_trace.core.trace import log_react_step, log_tool_step, start_run, trace
+
+
+SAVE_KEYS = ("serialize_ms", "write_ms", "index_ms", "bytes")
+
+
+@pytest.fixture
+def traces_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    return tmp_path
+
+
+@trace
+def slow_tool(x):
+    time.sleep(0.01)
+    return x
+
+
+def test_run_records_capture_overhead(traces_env):
+    with start_run("accounted") as run:
+        for i in range(3):
+            slow_tool(i)
+        log_react_step("agent", "thinking")
+
+    totals = run.metadata[overhead.OVERHEAD_KEY]
+    assert totals["steps_captured"] == 4
+    assert 0 < totals["capture_ms"] < totals["run_ms"]
+    assert totals["logging_ms"] <= totals["capture_ms"]
+    # Time spent inside the tool is not tracer overhead
+    assert totals["capture_ms"] < 30
+    # Saving adds its own cost, but the stored document can't contain its size
+    assert {"serialize_ms", "write_ms", "index_ms"} <= set(totals)
+    assert totals["bytes"] > 0 and totals["serialize_ms"] >= 0
+    stored = load_trace(str(run.trace_id)).metadata[overhead.OVERHEAD_KEY]
+    assert stored == {k: v for k, v in totals.items() if k not in SAVE_KEYS}
+
+    first = run.steps[0]
+    assert first.started_at < run.steps[1].started_at
+    assert (run.steps[1].started_at - first.started_at).total_seconds() * 1000 >= first.duration_ms
+
+
+def test_nested_sections_are_counted_once():
+    previous = overhead.start_account()
+    outer = overhead.begin()
+    time.sleep(0.005)
+    # An adapter section calling log_tool_step (itself accounted)
+    log_tool_step("tool", {}, None)
+    time.sleep(0.005)
+    overhead.end(outer)
+    account = overhead.finish_account(previous)
+    assert 0.009 < account.capture_s < 0.05
+    assert overhead.begin() is None
+
+
+def test_failed_capture_closes_its_section(traces_env, monkeypatch):
+    from agent_trace.core import trace as trace_module
+
+    def broken(inputs, level):
+        raise RuntimeError("capture failed")
+
+    with start_run("broken capture"):
+        with monkeypatch.context() as patched:
+            patched.setattr(trace_module, "_capture_inputs", broken)
+            with pytest.raises(RuntimeError):
+                slow_tool(1)
+        assert overhead._local.depth == 0
+        with start_run("next") as run:
+            slow_tool(2)
+    assert run.metadata[overhead.OVERHEAD_KEY]["capture_ms"] > 0
+
+
+def test_save_records_ledger_and_cli_summary(traces_env, monkeypatch):
+    for engine in ("files", "segments"):
+        monkeypatch.setenv("AGENT_TRACE_STORAGE", engine)
+        with start_run(f"ledger-{engine}"):
+            slow_tool(1)
+
+    entries = list_overhead()
+    assert [e["name"] for e in entries] == ["ledger-files", "ledger-segments"]
+    for entry in entries:
+        assert entry["bytes"] > 0
+        assert entry["serialize_ms"] > 0 and entry["write_ms"] >= 0
+    assert len(list_overhead(name_filter="segments")) == 1
+
+    result = CliRunner().invoke(cli, ["overhead"])
+    assert result.exit_code == 0, result.output
+    assert "over 2 runs" in result.output
+    failing = CliRunner().invoke(cli, ["overhead", "--fail-above", "0"])
+    assert failing.exit_code == 1
+
+
+def test_memory_engine_and_opt_out_skip_ledger(traces_env, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", "memory")
+    with start_run("in-memory"):
+        slow_tool(1)
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", "files")
+    monkeypatch.setenv("AGENT_TRACE_OVERHEAD", "0")
+    with start_run("opted-out"):
+        slow_tool(1)
+    assert list_overhead() == []
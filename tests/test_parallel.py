@@ -0,0 +1,65 @@
+"""Tests for parallel, streaming trace loading."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from agent_trace.core import store
+from agent_trace.core.parallel import ordered_map
+from agent_trace.core.schema import ToolStep, Trace
+from agent_trace.core.store import iter_trace_documents, iter_traces, list_trace_documents, save_traces
+
+
+def make_trace(i: int) -> Trace:
+    return Trace(name=f"run-{i}", steps=[
+        ToolStep(tool_name="even" if i % 2 == 0 else "odd", inputs={"i": i}, output=i),
+    ])
+
+
+@pytest.fixture
+def traces_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    return tmp_path
+
+
+def test_ordered_map_keeps_order_and_stops_early():
+    started = []
+    lock = threading.Lock()
+
+    def work(i):
+        with lock:
+            started.append(i)
+        time.sleep(0.01 * (i % 3))
+        return i * 10
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = ordered_map(work, range(100), executor, window=8)
+        assert [next(results) for _ in range(5)] == [0, 10, 20, 30, 40]
+        results.close()
+    # Only the window ahead of what was consumed was ever started
+    assert len(started) <= 5 + 8
+    assert list(ordered_map(work, range(5))) == [0, 10, 20, 30, 40]
+
+
+@pytest.mark.parametrize("engine", ["files", "segments", "sqlite"])
+def test_streaming_matches_listing(traces_env, monkeypatch, engine):
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", engine)
+    monkeypatch.setattr(store, "PAGE_SIZE", 7)
+    save_traces([make_trace(i) for i in range(30)])
+
+    expected = [d["trace_id"] for d in list_trace_documents()]
+    assert [d["trace_id"] for d in iter_trace_documents(workers=4)] == expected
+    assert [d["trace_id"] for d in iter_trace_documents(workers=1, offset=3, limit=4)] == expected[3:7]
+
+    odd = list(iter_traces(limit=5, where=lambda d: d["steps"][0]["tool_name"] == "odd", workers=3))
+    assert len(odd) == 5
+    assert all(t.steps[0].tool_name == "odd" for t in odd)
+
+
+def test_process_pool(traces_env):
+    save_traces([make_trace(i) for i in range(10)])
+    docs = list(iter_trace_documents(workers=2, processes=True, name_filter="run-1"))
+    assert [d["name"] for d in docs] == ["run-1"]
@@ -0,0 +1,134 @@
+"""Tests for the patch registry."""
+import pytest
+
+from agent_trace.adapters.base.agents import AgentTrace
+from agent_trace.adapters.base.tools import ToolTrace
+from agent_trace.adapters.patches import PatchRegistry, is_patched, set_patches_enabled, unpatch
+from agent_trace.core.trace import start_run
+
+
+class Framework:
+    def run(self, value):
+        return value * 2
+
+
+class Child(Framework):
+    pass
+
+
+def counting_wrapper(calls):
+    def make_wrapper(original):
+        def wrapper(self, *args, **kwargs):
+            calls.append(args)
+            return original(self, *args, **kwargs)
+        return wrapper
+    return make_wrapper
+
+
+def test_patching_twice_is_a_no_op_and_unpatch_restores():
+    registry = PatchRegistry()
+    original = Framework.__dict__["run"]
+    calls = []
+    assert registry.patch_attribute(Framework, "run", counting_wrapper(calls), name="fw.run")
+    assert not registry.patch_attribute(Framework, "run", counting_wrapper(calls), name="fw.run")
+    # Patched under another name, the target is still recognized
+    assert not registry.patch_attribute(Framework, "run", counting_wrapper(calls), name="other.run")
+    assert Framework().run(2) == 4 and len(calls) == 1
+    assert is_patched(Framework.run)
+
+    assert registry.unpatch("fw") == ["fw.run"]
+    assert Framework.__dict__["run"] is original
+    assert registry.names() == []
+
+
+def test_inherited_attribute_is_restored_by_deleting_override():
+    registry = PatchRegistry()
+    calls = []
+    registry.patch_attribute(Child, "run", counting_wrapper(calls), name="fw.child.run")
+    assert "run" in Child.__dict__ and Child().run(1) == 2 and calls
+    registry.unpatch()
+    assert "run" not in Child.__dict__
+
+
+def test_disable_restores_originals_and_enable_reinstalls():
+    registry = PatchRegistry()
+    original = Framework.__dict__["run"]
+    calls = []
+    registry.patch_attribute(Framework, "run", counting_wrapper(calls), name="fw.run")
+    registry.set_enabled(False)
+    assert Framework.__dict__["run"] is original
+    Framework().run(1)
+    assert calls == []
+    registry.set_enabled(True)
+    Framework().run(1)
+    assert len(calls) == 1
+    registry.unpatch()
+    assert Framework.__dict__["run"] is original
+
+
+class FrameworkAgent:
+    role = "writer"
+
+    def execute(self):
+        return "done"
+
+
+class FrameworkAgentTrace(AgentTrace):
+    def get_agent_name(self, agent_instance):
+        return agent_instance.role
+
+    def get_original_execute_method(self):
+        return FrameworkAgent.execute
+
+    def set_execute_method(self, new_method):
+        FrameworkAgent.execute = new_method
+
+
+class FunctionToolTrace(ToolTrace):
+    def get_tool_name(self, tool):
+        return tool.__name__
+
+    def is_class_based_tool(self, tool):
+        return False
+
+    def get_original_execute_method(self, tool):
+        return tool
+
+    def set_execute_method(self, tool, new_method):
+        return new_method
+
+
+@pytest.fixture
+def traces_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    yield
+    set_patches_enabled(True)
+    unpatch(__name__)
+
+
+def test_adapters_patch_once_and_toggle(traces_env):
+    assert FrameworkAgentTrace().trace()
+    assert not FrameworkAgentTrace().trace()
+
+    def search(query):
+        return query
+
+    tool = FunctionToolTrace().trace(search)
+    assert FunctionToolTrace().trace(tool) is tool
+
+    with start_run("enabled") as trace:
+        FrameworkAgent().execute()
+        tool("x")
+    assert [s.step_type for s in trace.steps] == ["agent", "tool"]
+
+    set_patches_enabled(False)
+    with start_run("disabled") as trace:
+        assert FrameworkAgent().execute() == "done"
+        assert tool("y") == "y"
+    assert trace.steps == []
+
+    set_patches_enabled(True)
+    with start_run("re-enabled") as trace:
+        FrameworkAgent().execute()
+    assert len(trace.steps) == 1
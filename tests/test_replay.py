@@ -0,0 +1,158 @@
+"""Tests for record/replay of tool outputs."""
+import json
+import runpy
+import sys
+import textwrap
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.adapters.base.tools import ToolTrace
+from agent_trace.cli.main import cli
+from agent_trace.core.replay import (
+    ReplayMismatch,
+    ReplayedToolError,
+    normalize_inputs,
+    replay_trace,
+)
+from agent_trace.core.serialize import snapshot
+from agent_trace.core.store import list_traces
+from agent_trace.core.trace import start_run, trace
+
+calls = []
+
+
+@trace
+def search(query, top_k=3):
+    calls.append(query)
+    return [f"{query}-{i}" for i in range(top_k)]
+
+
+@trace
+def flaky(x):
+    calls.append(x)
+    raise TimeoutError("upstream timed out")
+
+
+@pytest.fixture
+def traces_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    calls.clear()
+    return tmp_path
+
+
+@pytest.fixture
+def recorded(traces_env):
+    with start_run("recording") as run:
+        search("cats")
+        search("cats")
+        search("dogs", top_k=1)
+        with pytest.raises(TimeoutError):
+            flaky(1)
+    calls.clear()
+    return run
+
+
+def test_normalize_inputs_matches_recorded_form():
+    inputs = {"arg_0": ("a", 1), "when": datetime(2024, 1, 1), "b": {"y": 1, "x": 2}}
+    roundtripped = json.loads(json.dumps(snapshot(inputs)))
+    assert normalize_inputs(inputs) == normalize_inputs(roundtripped)
+
+
+def test_strict_replay_serves_recorded_outputs(recorded):
+    with replay_trace(str(recorded.trace_id)) as session:
+        with start_run("replayed") as run:
+            assert search("cats") == ["cats-0", "cats-1", "cats-2"]
+            assert search("cats") == ["cats-0", "cats-1", "cats-2"]
+            assert search("dogs", top_k=1) == ["dogs-0"]
+            with pytest.raises(ReplayedToolError, match="upstream timed out"):
+                flaky(1)
+            with pytest.raises(ReplayMismatch):
+                search("cats")  # only recorded twice
+    assert calls == []
+    report = session.report
+    assert report.hits == 4 and len(report.misses) == 1
+    assert report.misses[0].reason == "exhausted"
+    assert report.unused == 0
+    assert run.steps[0].metadata["replay"]["trace_id"] == str(recorded.trace_id)
+    assert run.steps[3].error == "upstream timed out"
+
+
+def test_lenient_replay_runs_unrecorded_calls(recorded):
+    with replay_trace(recorded, policy="lenient") as session:
+        assert search("birds", top_k=2) == ["birds-0", "birds-1"]
+        assert search("dogs", top_k=1) == ["dogs-0"]
+    assert calls == ["birds"]
+    assert session.report.hits == 1
+    assert session.report.misses[0].reason == "not recorded"
+    assert session.report.unused == 3
+
+
+def test_tool_adapter_replays(recorded):
+    class FunctionToolTrace(ToolTrace):
+        def get_tool_name(self, tool):
+            return "search"
+
+        def is_class_based_tool(self, tool):
+            return False
+
+        def get_original_execute_method(self, tool):
+            return tool
+
+        def set_execute_method(self, tool, new_method):
+            return new_method
+
+    def raw_search(query, top_k=3):
+        calls.append(query)
+        return []
+
+    wrapped = FunctionToolTrace().trace(raw_search)
+    with replay_trace(recorded):
+        assert wrapped("dogs", top_k=1) == ["dogs-0"]
+    assert calls == []
+
+
+def test_replay_command(traces_env, tmp_path):
+    script = tmp_path / "agent.py"
+    script.write_text(textwrap.dedent("""
+        import sys
+        from agent_trace.core.trace import start_run, trace
+
+        @trace
+        def lookup(key):
+            print("EXECUTED", key)
+            return key.upper()
+
+        with start_run("scripted"):
+            for key in sys.argv[1:]:
+                print("RESULT", lookup(key))
+    """))
+    runner = CliRunner()
+    saved = sys.argv
+    sys.argv = [str(script), "a", "b"]
+    try:
+        runpy.run_path(str(script), run_name="__main__")
+    finally:
+        sys.argv = saved
+    recording = list_traces(limit=1)[0]
+
+    listed = runner.invoke(cli, ["replay", str(recording.trace_id)])
+    assert listed.exit_code == 0, listed.output
+    assert "2 recorded tool calls" in listed.output
+
+    result = runner.invoke(cli, ["replay", str(recording.trace_id), str(script), "a", "b"])
+    assert result.exit_code == 0, result.output
+    assert "EXECUTED" not in result.output
+    assert "RESULT A" in result.output and "RESULT B" in result.output
+    assert "2/2 calls" in result.output
+
+    strict = runner.invoke(cli, ["replay", str(recording.trace_id), str(script), "a", "c"])
+    assert strict.exit_code == 1
+    assert "Replay failed" in strict.output
+
+    lenient = runner.invoke(cli, ["replay", "--policy", "lenient", str(recording.trace_id), str(script), "a", "c"])
+    assert lenient.exit_code == 0, lenient.output
+    assert "EXECUTED c" in lenient.output
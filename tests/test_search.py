@@ -0,0 +1,73 @@
+"""Tests for the full-text search index."""
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.cli.main import cli
+from agent_trace.core.search import InvalidSearchQuery
+from agent_trace.core.schema import ReasoningStep, TaskStep, ToolStep, Trace
+from agent_trace.core.backends import filesystem
+from agent_trace.core.store import delete_trace, get_search_index, reindex_search, save_trace
+
+
+def test_search_steps(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    failing = Trace(name="failing-run", steps=[
+        ReasoningStep(thought="Look up customer CUST-4821 orders", agent_name="support"),
+        ToolStep(tool_name="orders_api", inputs={"customer": "CUST-4821"},
+                 error="429: rate limit exceeded"),
+    ])
+    ok = Trace(name="ok-run", steps=[
+        ToolStep(tool_name="orders_api", inputs={"customer": "CUST-1000"}, output=[1, 2]),
+        TaskStep(task_name="report", result="No rate problems, limit not reached"),
+    ])
+    save_trace(failing)
+    save_trace(ok)
+
+    index = get_search_index()
+    hits = index.search("rate limit")
+    assert [(h.trace_name, h.step_index, h.field) for h in hits] == [
+        ("failing-run", 1, "error")
+    ]
+    assert "\x02rate limit\x03" in hits[0].snippet
+
+    thoughts = index.search("CUST-4821", field="thought")
+    assert [(h.trace_id, h.step_name) for h in thoughts] == [
+        (str(failing.trace_id), "support")
+    ]
+    assert len(index.search("CUST-4821")) == 2
+    assert len(index.search("rate OR reached", raw=True)) == 2
+
+    result = CliRunner().invoke(cli, ["search", "rate limit", "--type", "tool"])
+    assert result.exit_code == 0, result.output
+    assert "failing-run" in result.output and "ok-run" not in result.output
+
+    delete_trace(str(failing.trace_id))
+    assert index.search("rate limit") == []
+
+    result = CliRunner().invoke(cli, ["search", "CUST-1000", "--reindex"])
+    assert result.exit_code == 0, result.output
+    assert "Indexed 1 traces" in result.output and "ok-run" in result.output
+
+    for query in ('"unbalanced', "AND"):
+        with pytest.raises(InvalidSearchQuery):
+            index.search(query, raw=True)
+        result = CliRunner().invoke(cli, ["search", query, "--raw"])
+        assert result.exit_code == 2 and "invalid FTS5 query" in result.output
+    # Without --raw the same text is just a phrase
+    assert CliRunner().invoke(cli, ["search", '"unbalanced']).exit_code == 0
+
+
+def test_reindex_reads_each_trace_once(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_LOAD_WORKERS", "1")
+    for i in range(12):
+        save_trace(Trace(name=f"run-{i}", steps=[ToolStep(tool_name="lookup", inputs={}, output=f"needle {i}")]))
+    reads = []
+    original = filesystem.read_trace_document
+    monkeypatch.setattr(filesystem, "read_trace_document", lambda path: reads.append(path) or original(path))
+
+    assert reindex_search(batch_size=5) == 12
+    assert len(reads) == 12
+    assert len(get_search_index().search("needle")) == 12
@@ -0,0 +1,171 @@
+"""Tests for capture-time payload serialization."""
+import json
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from uuid import UUID
+
+import numpy as np
+import pytest
+from pydantic import BaseModel
+
+from agent_trace.core.replay import replay_trace
+from agent_trace.core.schema import ReasoningStep, ToolStep, Trace
+from agent_trace.core.serialize import (
+    TYPE_KEY, Limits, Serializer, dumps, iter_trace_json, snapshot, write_trace,
+)
+from agent_trace.core.serialize import _register_defaults
+from agent_trace.core.trace import start_run, trace
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class Query(BaseModel):
+    text: str
+    tags: list
+
+
+@pytest.fixture
+def serializer():
+    return _register_defaults(Serializer(Limits(max_depth=4, max_items=5, max_string=40)))
+
+
+def test_known_types_are_encoded():
+    serializer = _register_defaults(Serializer())
+    encoded = serializer.encode({
+        "point": Point(1, 2),
+        "color": Color.RED,
+        "query": Query(text="hi", tags=["a"]),
+        "when": datetime(2024, 1, 2, 3, 4),
+        "id": UUID(int=1),
+        "blob": b"\x00\x01",
+        "big_blob": b"x" * 1000,
+        "small_array": np.arange(3),
+        "big_array": np.zeros((100, 100)),
+        "scalar": np.float32(1.5),
+        "nan": float("nan"),
+        1: "int key",
+    })
+    assert encoded["point"] == {"x": 1, "y": 2}
+    assert encoded["color"] == "red"
+    assert encoded["query"] == {"text": "hi", "tags": ["a"]}
+    assert encoded["when"] == "2024-01-02T03:04:00"
+    assert encoded["blob"]["base64"] == "AAE="
+    assert encoded["big_blob"]["length"] == 1000 and "sha256" in encoded["big_blob"]
+    assert encoded["small_array"] == [0, 1, 2]
+    assert encoded["big_array"][TYPE_KEY] == "ndarray"
+    assert encoded["big_array"]["shape"] == [100, 100]
+    assert encoded["scalar"] == 1.5
+    assert encoded["nan"] == "nan"
+    json.dumps(encoded, allow_nan=False)
+
+
+def test_limits_and_idempotence(serializer):
+    value = {
+        "long": "x" * 100,
+        "many": list(range(50)),
+        "deep": {"a": {"b": {"c": {"d": {"e": 1}}}}},
+        "keys": {f"k{i}": i for i in range(20)},
+        "opaque": object(),
+    }
+    encoded = serializer.encode(value)
+    assert len(encoded["long"]) <= 40 and "+" in encoded["long"]
+    assert len(encoded["many"]) == 5 and encoded["many"][-1].startswith("…")
+    assert isinstance(encoded["deep"]["a"]["b"]["c"], str)
+    assert len(encoded["keys"]) == 5
+    assert encoded["opaque"].startswith("<object")
+    assert serializer.encode(encoded) == encoded
+    assert serializer.encode(json.loads(json.dumps(encoded))) == encoded
+
+
+def test_custom_encoders(serializer):
+    class Secret:
+        pass
+
+    serializer.register(Secret, lambda value, s: "***")
+    serializer.register("collections.Counter", lambda value, s: {TYPE_KEY: "Counter", "total": sum(value.values())})
+    from collections import Counter
+    assert serializer.encode([Secret(), Counter("aab")]) == ["***", {TYPE_KEY: "Counter", "total": 3}]
+
+
+def test_inputs_are_snapshotted_at_capture(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+
+    @trace
+    def append(items):
+        items.append("added by tool")
+        return items
+
+    payload = ["original"]
+    with start_run("snapshots") as run:
+        append(payload)
+        payload.append("mutated later")
+    step = run.steps[0]
+    assert step.inputs == {"arg_0": ["original"]}
+    assert step.output == ["original", "added by tool"]
+
+
+def test_replay_matches_inputs_mutated_by_the_tool(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    calls = []
+
+    @trace
+    def add(items):
+        calls.append(1)
+        items.append("x")
+        return len(items)
+
+    with start_run("recorded") as recorded:
+        add(["a"])
+    with replay_trace(recorded) as session:
+        with start_run("replayed"):
+            assert add(["a"]) == 2
+    assert calls == [1] and session.report.hits == 1
+
+
+def test_dumps_matches_stdlib():
+    value = {"a": [1, 2.5, None, True], "b": {"c": "é"}, "when": datetime(2024, 1, 1)}
+    assert json.loads(dumps(value)) == json.loads(json.dumps(snapshot(value)))
+    assert json.loads(dumps(value, indent=True)) == json.loads(dumps(value))
+
+
+def test_streamed_trace_matches_model_dump():
+    trace = Trace(name="stream", metadata={"k": [1, 2]}, steps=[
+        ToolStep(tool_name="t", inputs={"q": "x"}, output={"a": 1}),
+        ReasoningStep(thought="hmm"),
+    ])
+    data = b"".join(iter_trace_json(trace))
+    assert data.index(b'"name"') < data.index(b'"steps"')
+    assert Trace.model_validate_json(data) == trace
+    assert b"".join(iter_trace_json(Trace(name="empty"))).endswith(b'"steps":[]}')
+
+
+def test_streaming_write_memory_is_bounded(tmp_path):
+    step = ToolStep(tool_name="search", inputs={"query": "q" * 100}, output="r" * 200)
+    trace = Trace(name="huge", steps=[step] * 100_000)
+    path = tmp_path / "huge.json"
+
+    tracemalloc.start()
+    try:
+        with open(path, "wb") as f:
+            written = write_trace(trace, f)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert written == path.stat().st_size > 30_000_000
+    # A full model_dump of this trace alone takes well over 100MB
+    assert peak < 1_000_000
+    with open(path, "rb") as f:
+        assert f.read(100).startswith(b'{"summary":')
@@ -0,0 +1,153 @@
+"""Tests for the local trace browser server."""
+import json
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from agent_trace.core.schema import ToolStep, Trace
+from agent_trace.core.store import save_trace
+from agent_trace.server.app import TraceBrowser, make_server
+
+
+def make_trace(i: int, steps: int = 3, error: bool = False) -> Trace:
+    start = datetime(2025, 1, 1) + timedelta(minutes=i)
+    return Trace(
+        name=f"run-{i % 3}",
+        started_at=start,
+        ended_at=start + timedelta(seconds=1),
+        steps=[
+            ToolStep(
+                tool_name="search" if j % 2 == 0 else "fetch",
+                inputs={"j": j},
+                output=j,
+                error="boom" if error and j == 0 else None,
+                duration_ms=10.0,
+                started_at=start + timedelta(milliseconds=100 * j),
+            )
+            for j in range(steps)
+        ],
+    )
+
+
+@pytest.fixture(params=["files", "sqlite"])
+def traces(tmp_path: Path, monkeypatch, request):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", request.param)
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    saved = [make_trace(i, error=i % 4 == 0) for i in range(12)]
+    for trace in saved:
+        save_trace(trace)
+    return saved
+
+
+def get(browser: TraceBrowser, path: str, **params):
+    status, _, body = browser.handle(path, {k: [str(v)] for k, v in params.items()})
+    return status, json.loads(body)
+
+
+def test_cursor_pagination_is_stable_while_traces_arrive(traces):
+    browser = TraceBrowser(refresh_interval_s=0)
+    status, first = get(browser, "/api/traces", limit=5)
+    assert status == 200
+    assert first["indexed"] == 12
+    assert [t["trace_id"] for t in first["traces"]] == [str(t.trace_id) for t in traces[::-1][:5]]
+
+    save_trace(make_trace(99))
+    _, second = get(browser, "/api/traces", limit=5, cursor=first["next_cursor"])
+    assert [t["trace_id"] for t in second["traces"]] == [str(t.trace_id) for t in traces[::-1][5:10]]
+    _, third = get(browser, "/api/traces", limit=5, cursor=second["next_cursor"])
+    assert len(third["traces"]) == 2 and third["next_cursor"] is None
+
+    # A fresh first page picks up the new trace
+    _, fresh = get(browser, "/api/traces", limit=5)
+    assert fresh["indexed"] == 13
+    assert fresh["traces"][0]["name"] == "run-0" and fresh["traces"][0]["started_at"].startswith("2025-01-01T01:39")
+
+
+def test_filters(traces):
+    browser = TraceBrowser()
+    _, errors = get(browser, "/api/traces", errors=1)
+    assert {t["trace_id"] for t in errors["traces"]} == {str(t.trace_id) for t in traces[::4]}
+    _, named = get(browser, "/api/traces", name="run-1", since="2025-01-01T00:05")
+    assert [t["started_at"][:16] for t in named["traces"]] == ["2025-01-01T00:10", "2025-01-01T00:07"]
+    _, none = get(browser, "/api/traces", tool="missing")
+    assert none["traces"] == []
+    status, bad = get(browser, "/api/traces", since="yesterday")
+    assert status == 400 and "since" in bad["error"]
+
+
+def test_trace_windows_are_served_from_cache(traces, monkeypatch):
+    big = make_trace(50, steps=30)
+    save_trace(big)
+    browser = TraceBrowser()
+    status, window = get(browser, f"/api/traces/{big.trace_id}", start=10, limit=5)
+    assert status == 200
+    assert window["total_steps"] == 30
+    assert [s["inputs"] for s in window["steps"]] == [{"j": j} for j in range(10, 15)]
+    assert window["trace"]["name"] == big.name
+    assert window["summary"]["step_count"] == 30
+
+    def fail(ref):
+        raise AssertionError("document should be cached")
+
+    monkeypatch.setattr("agent_trace.server.app.load_trace_document", fail)
+    _, again = get(browser, f"/api/traces/{big.trace_id}", start=25)
+    assert len(again["steps"]) == 5
+    assert browser.cache.hits == 1 and browser.cache.misses == 1
+
+
+def test_cache_evicts_least_recently_used(traces):
+    browser = TraceBrowser(cache_bytes=1)
+    get(browser, f"/api/traces/{traces[0].trace_id}")
+    assert len(browser.cache) == 0  # larger than the whole cache
+
+    browser = TraceBrowser()
+    sizes = []
+    for trace in traces[:3]:
+        get(browser, f"/api/traces/{trace.trace_id}")
+        sizes.append(browser.cache.bytes - sum(sizes))
+    browser.cache.max_bytes = sizes[1] + sizes[2]
+    get(browser, f"/api/traces/{traces[1].trace_id}")  # most recent now
+    get(browser, f"/api/traces/{traces[3].trace_id}")
+    assert [*browser.cache._docs] == [str(traces[1].trace_id), str(traces[3].trace_id)]
+
+
+def test_unknown_and_invalid_traces(traces, tmp_path):
+    browser = TraceBrowser()
+    status, body = get(browser, "/api/traces/00000000-0000-0000-0000-000000000000")
+    assert status == 404
+    # Paths are never read as trace files
+    (tmp_path / "secret.json").write_text("{}")
+    status, _ = get(browser, f"/api/traces/{tmp_path / 'secret.json'}")
+    assert status == 404
+
+
+def test_stats(traces):
+    status, stats = get(TraceBrowser(), "/api/stats", kind="tool")
+    assert status == 200
+    rows = {row["name"]: row for row in stats["rows"]}
+    assert rows["search"]["count"] == 24 and rows["fetch"]["count"] == 12
+    assert rows["search"]["error_rate"] == pytest.approx(3 / 24)
+    assert get(TraceBrowser(), "/api/stats", kind="bogus")[0] == 400
+
+
+def test_http_server(traces):
+    server = make_server(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/api/traces?limit=2") as response:
+            assert response.headers["Content-Type"] == "application/json"
+            assert len(json.loads(response.read())["traces"]) == 2
+        with urllib.request.urlopen(f"{base}/") as response:
+            assert b"agent-trace" in response.read()
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{base}/nope")
+        assert e.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,45 @@
+"""Tests for batched search index, column, baseline and ledger updates."""
+from agent_trace.core.baselines import BASELINES_DIRNAME, BaselineStore
+from agent_trace.core.overhead import OVERHEAD_KEY, read_ledger
+from agent_trace.core.schema import ANOMALY_KEY, ToolStep, Trace
+from agent_trace.core.search import SEARCH_DB_FILENAME, SearchIndex
+from agent_trace.core.sidecars import get_writer
+from agent_trace.core.store import get_search_index, get_traces_dir, list_overhead, save_trace
+
+
+def make_trace(duration_ms, output="ok"):
+    trace = Trace(name="batched", steps=[ToolStep(tool_name="search", inputs={}, output=output, duration_ms=duration_ms)])
+    trace.metadata[OVERHEAD_KEY] = {"capture_ms": 0.1}
+    return trace
+
+
+def test_saves_are_batched_until_read(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SIDECAR_INTERVAL", "3600")
+    monkeypatch.setenv("AGENT_TRACE_SIDECAR_BATCH", "1000")
+    traces_dir = get_traces_dir()
+    for _ in range(40):
+        save_trace(make_trace(10.0))
+    slow = make_trace(500.0, output="needle")
+    save_trace(slow)
+
+    # Nothing written yet, but anomalies were flagged against the baseline in memory
+    assert get_writer(traces_dir).pending()
+    assert BaselineStore(traces_dir / BASELINES_DIRNAME).load() == {}
+    assert [*read_ledger(traces_dir)] == []
+    assert ANOMALY_KEY in slow.steps[0].metadata
+
+    # Readers flush first
+    assert len(get_search_index().search("needle")) == 1
+    assert len(list_overhead()) == 41
+    assert not get_writer(traces_dir).pending()
+    assert BaselineStore(traces_dir / BASELINES_DIRNAME).load()[("tool", "search")].count == 41
+
+
+def test_full_batch_is_written_by_the_saver(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SIDECAR_INTERVAL", "3600")
+    monkeypatch.setenv("AGENT_TRACE_SIDECAR_BATCH", "3")
+    for _ in range(3):
+        save_trace(make_trace(10.0))
+    assert SearchIndex(get_traces_dir() / SEARCH_DB_FILENAME).count() == 3
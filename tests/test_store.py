@@ -0,0 +1,198 @@
+"""Tests for trace storage layouts."""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from agent_trace.core.backends.base import TraceStore
+from agent_trace.core.backends import filesystem
+from agent_trace.core.backends.filesystem import FileSystemTraceStore
+from agent_trace.core.backends.memory import InMemoryTraceStore
+from agent_trace.core.backends.sqlite import SQLiteTraceStore
+from agent_trace.core.schema import ToolStep, Trace
+from agent_trace.core.store import (
+    compact_traces,
+    list_trace_summaries,
+    get_filesystem_store,
+    get_store,
+    list_traces,
+    load_trace,
+    save_trace,
+)
+
+
+def make_trace(name: str, steps: int = 1) -> Trace:
+    return Trace(
+        name=name,
+        steps=[
+            ToolStep(tool_name="tool", inputs={"i": i}, output=f"out {i}")
+            for i in range(steps)
+        ],
+    )
+
+
+@pytest.fixture
+def traces_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_segment_roundtrip(traces_env, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", "segments")
+    saved = [make_trace(f"run-{i}", steps=i + 1) for i in range(5)]
+    for trace in saved:
+        save_trace(trace)
+
+    traces = list_traces()
+    assert [t.name for t in traces] == [f"run-{i}" for i in reversed(range(5))]
+    loaded = load_trace(str(saved[2].trace_id))
+    assert loaded.trace_id == saved[2].trace_id
+    assert len(loaded.steps) == 3
+
+
+def test_segment_rotation_and_compaction(traces_env, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", "segments")
+    monkeypatch.setenv("AGENT_TRACE_SEGMENT_MAX_BYTES", "200")
+    for i in range(6):
+        save_trace(make_trace(f"run-{i}"))
+    assert len(get_filesystem_store().segments.segments()) > 1
+
+    # A loose file from the one-file-per-trace layout gets folded in too.
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", "files")
+    loose = make_trace("loose")
+    save_trace(loose)
+    assert len(list_traces()) == 7
+
+    result = compact_traces()
+    assert result["traces"] == 7
+    assert result["files_migrated"] == 1
+    assert not list((traces_env / "traces").glob("*.json"))
+    assert load_trace(str(loose.trace_id)).name == "loose"
+    assert sorted(t.name for t in list_traces()) == sorted(
+        ["loose"] + [f"run-{i}" for i in range(6)]
+    )
+
+
+def test_mixed_layouts_limit_and_filter(traces_env, monkeypatch):
+    save_trace(make_trace("file-alpha"))
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", "segments")
+    save_trace(make_trace("segment-alpha"))
+    save_trace(make_trace("segment-beta"))
+
+    assert [t.name for t in list_traces(limit=2)] == ["segment-beta", "segment-alpha"]
+    assert {t.name for t in list_traces(name_filter="alpha")} == {
+        "file-alpha", "segment-alpha"
+    }
+
+
+@pytest.fixture(params=["files", "segments", "sqlite", "memory"])
+def backend(request, tmp_path: Path) -> TraceStore:
+    if request.param == "sqlite":
+        return SQLiteTraceStore(tmp_path / "traces.db")
+    if request.param == "memory":
+        return InMemoryTraceStore()
+    return FileSystemTraceStore(tmp_path, layout=request.param)
+
+
+def test_backend_contract(backend: TraceStore):
+    assert isinstance(backend, TraceStore)
+    base = datetime(2025, 4, 7, 12, 0)
+    traces = [make_trace(f"run-{i}") for i in range(10)]
+    for i, trace in enumerate(traces):
+        trace.started_at = base + timedelta(minutes=i)
+    assert backend.put_many(traces[:9]) == 9
+    backend.put(traces[9])
+
+    assert backend.get(traces[3].trace_id).name == "run-3"
+    assert backend.get("00000000-0000-0000-0000-000000000000") is None
+
+    newest = backend.query(limit=3)
+    assert [t.name for t in newest][0] == "run-9"
+    assert len(newest) == 3
+    page = backend.query(limit=3, offset=3)
+    assert len(page) == 3
+    assert not {t.trace_id for t in page} & {t.trace_id for t in newest}
+
+    window = backend.query(
+        since=base + timedelta(minutes=2), until=base + timedelta(minutes=4)
+    )
+    assert sorted(t.name for t in window) == ["run-2", "run-3", "run-4"]
+    assert [t.name for t in backend.query(name="run-7")] == ["run-7"]
+
+    summaries = backend.query_summaries(name="run-", limit=3)
+    assert [s.trace_id for s in summaries] == [t.trace_id for t in newest]
+    assert summaries[0].step_count == 1 and summaries[0].tools == ["tool"]
+
+    assert backend.delete(traces[7].trace_id)
+    assert not backend.delete(traces[7].trace_id)
+    assert backend.get(traces[7].trace_id) is None
+    assert backend.query(name="run-7") == []
+
+
+def test_store_selected_by_config(traces_env, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", "memory")
+    assert isinstance(get_store(), InMemoryTraceStore)
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", "sqlite")
+    save_trace(make_trace("in-sqlite"))
+    assert isinstance(get_store(), SQLiteTraceStore)
+    assert [t.name for t in list_traces()] == ["in-sqlite"]
+
+
+def test_summaries_read_only_the_header(traces_env, monkeypatch):
+    trace = make_trace("huge", steps=2000)
+    trace.steps[5].error = "boom"
+    path = save_trace(trace)
+    # Pre-summary trace files are still listed, from their full document
+    legacy = make_trace("legacy", steps=3)
+    (path.parent / f"legacy_{legacy.trace_id}.json").write_text(legacy.model_dump_json(indent=2))
+
+    read_in_full = []
+    real_read = filesystem.read_trace_document
+    monkeypatch.setattr(filesystem, "read_trace_document", lambda p: read_in_full.append(p) or real_read(p))
+    summaries = {s.name: s for s in list_trace_summaries()}
+
+    huge = summaries["huge"]
+    assert (huge.step_count, huge.error_count, huge.tools) == (2000, 1, ["tool"])
+    assert huge.bytes == path.stat().st_size > 100_000
+    assert summaries["legacy"].step_count == 3
+    assert summaries["legacy"].trace_id == legacy.trace_id
+    # Only the legacy file needed a full read
+    assert [p.name for p in read_in_full] == [f"legacy_{legacy.trace_id}.json"]
+
+
+def test_sqlite_summaries_migrate_old_databases(tmp_path: Path):
+    import sqlite3
+    db = tmp_path / "traces.db"
+    conn = sqlite3.connect(db)
+    conn.executescript(
+        "CREATE TABLE traces (trace_id TEXT PRIMARY KEY, name TEXT NOT NULL, "
+        "started_at REAL NOT NULL, ended_at REAL, saved_at REAL NOT NULL, data TEXT NOT NULL);"
+    )
+    old = make_trace("old", steps=2)
+    conn.execute(
+        "INSERT INTO traces VALUES (?, ?, ?, NULL, 0, ?)",
+        (str(old.trace_id), old.name, old.started_at.timestamp(), old.model_dump_json()),
+    )
+    conn.commit()
+    conn.close()
+
+    store = SQLiteTraceStore(db)
+    store.put(make_trace("new", steps=4))
+    summaries = {s.name: s for s in store.query_summaries()}
+    assert summaries["old"].step_count == 2 and summaries["old"].bytes
+    assert summaries["new"].step_count == 4 and summaries["new"].bytes
+
+
+def test_offset_is_skipped_without_reading(traces_env, monkeypatch):
+    store = FileSystemTraceStore(traces_env)
+    for i in range(10):
+        store.put(make_trace(f"run-{i}"))
+    reads = []
+    original = filesystem.read_trace_document
+    monkeypatch.setattr(filesystem, "read_trace_document", lambda path: reads.append(path) or original(path))
+
+    assert len(store.query_raw(limit=2, offset=8)) == 2
+    assert len(reads) == 2
+    # A name filter needs the document to know what to skip
+    assert [d["name"] for d in store.query_raw(name="run-1", offset=0)] == ["run-1"]
+    assert store.query_raw(name="run-1", offset=1) == []
@@ -0,0 +1,64 @@
+"""Stress test: many processes saving traces while the CLI lists them."""
+import multiprocessing
+import stat
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.cli.main import cli
+from agent_trace.core import fileio
+from agent_trace.core.schema import ToolStep, Trace
+from agent_trace.core.store import get_traces_dir, list_traces, save_trace
+
+WORKERS = 8
+BATCHES = 40
+TRACES_PER_BATCH = 50
+
+
+def write_batch(batch: int) -> list:
+    ids = []
+    for i in range(TRACES_PER_BATCH):
+        # Names taken from CrewAI task descriptions contain spaces and slashes.
+        trace = Trace(
+            name=f"Research task {batch}/{i}: summarize the news",
+            steps=[ToolStep(tool_name="search", inputs={"q": i}, output="ok")],
+        )
+        save_trace(trace)
+        ids.append(str(trace.trace_id))
+    return ids
+
+
+@pytest.mark.parametrize("layout", ["files", "segments"])
+def test_concurrent_writers_and_readers(tmp_path: Path, monkeypatch, layout):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", layout)
+    monkeypatch.setenv("AGENT_TRACE_SEGMENT_MAX_BYTES", "65536")
+    runner = CliRunner()
+
+    with multiprocessing.Pool(WORKERS) as pool:
+        pending = pool.map_async(write_batch, range(BATCHES))
+        listings = 0
+        while not pending.ready() or listings == 0:
+            result = runner.invoke(cli, ["list", "--limit", "50"])
+            assert result.exit_code == 0, result.output
+            listings += 1
+        written = [trace_id for batch in pending.get() for trace_id in batch]
+
+    assert len(written) == BATCHES * TRACES_PER_BATCH
+    traces = list_traces()
+    assert sorted(str(t.trace_id) for t in traces) == sorted(written)
+    assert not list(get_traces_dir().glob(".*.tmp"))
+    if layout == "files":
+        assert len(list(get_traces_dir().glob("*.json"))) == len(written)
+
+
+def test_atomic_writes_keep_the_usual_file_mode(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    path = save_trace(Trace(name="mode"))
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~fileio._UMASK
+
+    # Replacing a file keeps the mode it was given
+    path.chmod(0o640)
+    fileio.atomic_write(path, b"{}")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
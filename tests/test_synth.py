@@ -0,0 +1,76 @@
+"""Tests for the synthetic trace generator."""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from agent_trace.cli.main import cli
+from agent_trace.core.store import list_trace_documents, list_traces
+from agent_trace.core.synth import SynthConfig, TraceGenerator, write_synthetic_traces
+
+
+@pytest.fixture
+def traces_env(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("AGENT_TRACE_DIR", str(tmp_path))
+    monkeypatch.setenv("AGENT_TRACE_SEARCH", "0")
+    return tmp_path
+
+
+def test_generation_is_deterministic():
+    config = SynthConfig(count=20, seed=7, until=datetime(2024, 1, 1))
+    first = [t.model_dump() for t in TraceGenerator(config).iter_traces()]
+    second = [t.model_dump() for t in TraceGenerator(config).iter_traces(10, 20)]
+    assert first[10:] == second
+    other = TraceGenerator(config.model_copy(update={"seed": 8})).generate(0)
+    assert other.trace_id != TraceGenerator(config).generate(0).trace_id
+
+
+def test_generation_follows_config():
+    config = SynthConfig(
+        count=300, min_steps=4, max_steps=8, tools=3, error_rate=0.25,
+        step_mix={"tool": 1.0}, latency="constant", latency_median_ms=10.0,
+        payload_bytes=100, tags={"env": "test"},
+    )
+    traces = list(TraceGenerator(config).iter_traces())
+    steps = [s for t in traces for s in t.steps]
+    assert all(4 <= len(t.steps) <= 8 for t in traces)
+    assert {s.step_type for s in steps} == {"tool"}
+    assert {s.tool_name for s in steps} <= {"tool_0", "tool_1", "tool_2"}
+    assert 0.18 < sum(bool(s.error) for s in steps) / len(steps) < 0.32
+    assert all(t.metadata["env"] == "test" for t in traces)
+    # Steps run back to back, so the run ends when the last step does
+    trace = traces[0]
+    last = trace.steps[-1]
+    assert trace.ended_at == last.started_at + timedelta(milliseconds=last.duration_ms)
+    assert trace.duration_ms == pytest.approx(sum(s.duration_ms for s in trace.steps), rel=1e-3)
+
+
+@pytest.mark.parametrize("engine", ["segments", "sqlite"])
+def test_parallel_bulk_write(traces_env, monkeypatch, engine):
+    monkeypatch.setenv("AGENT_TRACE_STORAGE", engine)
+    written = write_synthetic_traces(
+        SynthConfig(count=120, max_steps=10), workers=2, batch_size=25
+    )
+    assert written == 120
+    docs = list_trace_documents()
+    assert len(docs) == 120
+    assert sorted(d["metadata"]["synth_index"] for d in docs) == list(range(120))
+
+
+def test_synth_command(traces_env):
+    result = CliRunner().invoke(cli, [
+        "synth", "30", "--no-bulk", "--names", "3", "--mix", "reasoning=1",
+        "--mix", "tool=1", "--max-steps", "6", "--tag", "run=synthetic",
+    ])
+    assert result.exit_code == 0, result.output
+    assert "Wrote 30 synthetic traces" in result.output
+    traces = list_traces()
+    assert len(traces) == 30
+    assert {t.name for t in traces} <= {"synthetic_0", "synthetic_1", "synthetic_2"}
+
+    listed = CliRunner().invoke(cli, ["list", "--limit", "5"])
+    assert listed.exit_code == 0, listed.output
+
+    bad = CliRunner().invoke(cli, ["synth", "5", "--mix", "thinking=1"])
+    assert bad.exit_code != 0